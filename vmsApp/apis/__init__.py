@@ -1,4 +1,7 @@
 # import apis
-from .vendorAPI import VendorViewsAPI, VendorListAPI, VendorPerformanceView
-from .purchaseOrderAPI import PurchaseOrderAPI, PurchasedOrderViewAPI
-from .commonAPI import OrderAcknowledgeAPI, CompletePurchaseOrderAPI, UpdatePurchaseOrderQualityRatingAPI
+from .vendorAPI import VendorViewsAPI, VendorListAPI, VendorLeaderboardAPI, VendorSearchAPI, VendorPerformanceView, VendorPerformanceHistoryView
+from .purchaseOrderAPI import PurchaseOrderAPI, PurchasedOrderViewAPI, PurchaseOrderBulkAPI, PurchaseOrderLineAPI, PurchaseOrderLineSummaryAPI
+from .commonAPI import OrderAcknowledgeAPI, CompletePurchaseOrderAPI, UpdatePurchaseOrderQualityRatingAPI, PurchaseOrderTransitionsAPI
+from .exportAPI import PurchaseOrderExportAPI, VendorExportAPI
+from .monitoringAPI import CacheStatsAPI, MetricsAPI
+from .asyncAPI import AsyncVendorListAPI, AsyncVendorViewsAPI, AsyncVendorPerformanceView, AsyncPurchaseOrderAPI, AsyncPurchasedOrderViewAPI
@@ -0,0 +1,182 @@
+# import file modules
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from ..services.vendorServices import VendorService
+from ..services.purchaseOrderServices import PurhaseOrderService
+from ..instrumentation import serialization_timer
+from .conditional import aconditional_get
+
+
+class AsyncReadBaseView(View):
+    """
+    Base class for the native async read endpoints.
+
+    Under ASGI (`vmsProject.asgi`) these views run on the event loop and read through the
+    async services, so a worker is not tied to a thread while a read waits on the database
+    or the cache. They mirror the GET endpoints of the sync API under `/api/async/`, with
+    the same query parameters, responses and conditional request headers.
+    """
+    http_method_names = ['get', 'head', 'options']
+    renderer = JSONRenderer()
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.vendor_service = VendorService()
+        self.po_service = PurhaseOrderService()
+
+    def respond(self, data, status_code=status.HTTP_200_OK):
+        with serialization_timer():
+            content = self.renderer.render(data)
+        return HttpResponse(content, status=status_code, content_type=self.renderer.media_type)
+
+    def invalid_query(self, error):
+        return self.respond(
+            {'message': 'Invalid query parameters', 'errors': error.detail, 'status': 400},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class AsyncVendorListAPI(AsyncReadBaseView):
+
+    @aconditional_get(lambda view, request: view.vendor_service.aget_vendors_last_modified())
+    async def get(self, request):
+        """
+        Retrieves a page of vendors.
+
+        ** GET http://127.0.0.1:8000/api/async/vendors/?cursor=&page_size=&fields=&exclude= **
+        """
+        try:
+            all_vendors = await self.vendor_service.aget_all_vendors(
+                cursor=request.GET.get('cursor'),
+                page_size=request.GET.get('page_size'),
+                fields=request.GET.get('fields'),
+                exclude=request.GET.get('exclude'),
+            )
+        except ValidationError as e:
+            return self.invalid_query(e)
+        if all_vendors is None:
+            return self.respond(
+                {'message': 'An error occurred: Failed to fetch all vendors', 'status': 500},
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return self.respond({
+            'message': 'Successfully fetched all vendor records',
+            'status': 200,
+            "data": {
+                "vendor": all_vendors['results'],
+                "next": all_vendors['next'],
+                "prev": all_vendors['prev'],
+            },
+        })
+
+
+class AsyncVendorViewsAPI(AsyncReadBaseView):
+
+    @aconditional_get(lambda view, request, vendor_id: view.vendor_service.aget_vendor_state(vendor_id), versioned=True)
+    async def get(self, request, vendor_id):
+        """
+        Retrieves a specific vendor's details.
+
+        ** GET http://127.0.0.1:8000/api/async/vendors/{vendor_id}/?fields=&exclude= **
+        """
+        try:
+            vendor = await self.vendor_service.aget_vendor_details(
+                vendor_id,
+                fields=request.GET.get('fields'),
+                exclude=request.GET.get('exclude'),
+            )
+        except ValidationError as e:
+            return self.invalid_query(e)
+        if vendor is None:
+            return self.respond(
+                {'message': f'An error occurred: Vendor with ID {vendor_id} not found.', 'status': 404},
+                status.HTTP_404_NOT_FOUND,
+            )
+        return self.respond({'message': 'Successfully fetched vendor record', 'status': 200, "data": {"vendor": vendor}})
+
+
+class AsyncVendorPerformanceView(AsyncReadBaseView):
+
+    @aconditional_get(lambda view, request, vendor_id: view.vendor_service.aget_vendor_performance_last_modified(
+        vendor_id, request.GET.get('window'),
+    ))
+    async def get(self, request, vendor_id):
+        """
+        Retrieves a specific vendor's performance data.
+
+        ** GET http://127.0.0.1:8000/api/async/vendors/{vendor_id}/performance/?window=&fields=&exclude= **
+        """
+        try:
+            vendor = await self.vendor_service.aget_vendor_performance(
+                vendor_id,
+                fields=request.GET.get('fields'),
+                exclude=request.GET.get('exclude'),
+                window=request.GET.get('window'),
+            )
+        except ValidationError as e:
+            return self.invalid_query(e)
+        if vendor is None:
+            return self.respond(
+                {'message': f'An error occurred: Vendor with ID {vendor_id} not found.', 'status': 404},
+                status.HTTP_404_NOT_FOUND,
+            )
+        return self.respond({'message': 'Vendor performance fetched successfully', 'status': 200, "data": {"vendor": vendor}})
+
+
+class AsyncPurchaseOrderAPI(AsyncReadBaseView):
+
+    @aconditional_get(lambda view, request: view.po_service.aget_orders_last_modified(request.GET.dict()))
+    async def get(self, request):
+        """
+        Retrieves a page of purchase orders, with the filters and sorting of the sync list.
+
+        ** GET http://127.0.0.1:8000/api/async/purchase_orders/?cursor=&page_size= **
+        """
+        try:
+            po_list = await self.po_service.aget_all_orders(
+                filters=request.GET.dict(),
+                cursor=request.GET.get('cursor'),
+                page_size=request.GET.get('page_size'),
+                fields=request.GET.get('fields'),
+                exclude=request.GET.get('exclude'),
+            )
+        except ValidationError as e:
+            return self.invalid_query(e)
+        if po_list is None:
+            return self.respond(
+                {'message': 'An error occurred: failed to fetch purchase orders', 'status': 500},
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return self.respond({
+            'message': 'Successfully fetched purchased order records',
+            'status': 200,
+            "data": {"po": po_list['results'], "next": po_list['next'], "prev": po_list['prev']},
+        })
+
+
+class AsyncPurchasedOrderViewAPI(AsyncReadBaseView):
+
+    @aconditional_get(lambda view, request, po_id: view.po_service.aget_order_state(po_id), versioned=True)
+    async def get(self, request, po_id):
+        """
+        Retrieves a specific purchase order.
+
+        ** GET http://127.0.0.1:8000/api/async/purchase_orders/{po_id}/?fields=&exclude= **
+        """
+        try:
+            po_details = await self.po_service.aget_purchase_order_detail(
+                po_id,
+                fields=request.GET.get('fields'),
+                exclude=request.GET.get('exclude'),
+            )
+        except ValidationError as e:
+            return self.invalid_query(e)
+        if po_details is None:
+            return self.respond(
+                {'message': f'An error occurred: Purchased Order with ID {po_id} not found.', 'status': 500},
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        return self.respond({'message': 'Successfully fetched order record', 'status': 200, "data": {"po": po_details}})
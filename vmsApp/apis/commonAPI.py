@@ -2,7 +2,8 @@
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from ..services.commonServices import CommonService
+from rest_framework.exceptions import ValidationError
+from ..services.commonServices import CommonService, TransitionConflictError
 
 class CommonBaseView(APIView):
     """
@@ -44,6 +45,8 @@ class OrderAcknowledgeAPI(CommonBaseView):
                 return Response({'message': 'Purchase order acknowledged successfully', 'status': 200}, status=status.HTTP_200_OK)
             
             return ack_status
+        except TransitionConflictError as e:
+            return Response({'message': str(e), 'status': 409}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({'message': 'failed to acknowledged purchase order', 'status': 404}, status=status.HTTP_404_NOT_FOUND)
 
@@ -67,6 +70,8 @@ class CompletePurchaseOrderAPI(CommonBaseView):
                 return Response({'message': 'Purchase order completed successfully'}, status=status.HTTP_200_OK)
             
             return po_complete_status
+        except TransitionConflictError as e:
+            return Response({'message': str(e), 'status': 409}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({'message': 'failed to complete purchase order', 'status': 404}, status=status.HTTP_404_NOT_FOUND)
 
@@ -86,7 +91,52 @@ class UpdatePurchaseOrderQualityRatingAPI(CommonBaseView):
             po_quality_rating_status = self.common_service.update_quality_rating(po_id, request.data)
             if not po_quality_rating_status:
                 raise Exception(f"failed to update quality rating of purchase order id: {po_id}")
-            return Response({'message': 'Purchase order quality rating updated successfully'}, status=status.HTTP_200_OK)
+            if po_quality_rating_status == 1:
+                return Response({'message': 'Purchase order quality rating updated successfully'}, status=status.HTTP_200_OK)
+            return po_quality_rating_status
+        except ValidationError as e:
+            return Response({'message': 'Validation errors occurred', 'errors': e.detail, 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
+        except TransitionConflictError as e:
+            return Response({'message': str(e), 'status': 409}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({'message': 'failed to update quality rating to vendors on item purchased', 'status': 404}, status=status.HTTP_404_NOT_FOUND)
 
+
+
+class PurchaseOrderTransitionsAPI(CommonBaseView):
+    def post(self, request):
+        """
+        Applies a batch of acknowledge / complete / rate transitions.
+
+        ** POST http://127.0.0.1:8000/api/purchase_orders/transitions/ **
+
+        The body is a list of `{"po_id", "action", "payload"}` entries, or
+        `{"transitions": [...], "atomic": true}` to reject the whole batch on any error.
+        The response reports the outcome of every entry.
+        """
+        try:
+            payload = request.data
+            atomic = request.query_params.get('atomic', '').lower() in ('1', 'true')
+            if isinstance(payload, dict):
+                atomic = atomic or payload.get('atomic') in (True, 'true', '1', 1)
+                payload = payload.get('transitions')
+            outcomes = self.common_service.apply_transitions(payload, atomic=atomic)
+        except ValidationError as e:
+            return Response({'message': 'Validation errors occurred', 'errors': e.detail, 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
+        except TransitionConflictError as e:
+            return Response({'message': str(e), 'status': 409}, status=status.HTTP_409_CONFLICT)
+
+        applied = sum(outcome['status'] == 'ok' for outcome in outcomes)
+        failed = sum(outcome['status'] == 'error' for outcome in outcomes)
+        if not applied:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif failed:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({
+            'message': f'{applied} transitions applied, {failed} failed',
+            'status': response_status,
+            'data': {'transitions': outcomes},
+        }, status=response_status)
+
@@ -0,0 +1,104 @@
+# import modules
+import hashlib
+import re
+from functools import wraps
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, parse_etags
+
+_VERSION_TAG = re.compile(r'^"v(\d+)\.')
+
+
+def conditional_get(state_func, versioned=False):
+    """
+    Adds ETag / Last-Modified headers to an APIView `get` method and answers
+    `If-None-Match` / `If-Modified-Since` with a 304 before the view runs.
+
+    `state_func(view, request, *args, **kwargs)` must cheaply return the resource state:
+    its last modification datetime, or a `(last_modified, count)` tuple for collections.
+    When it returns None (e.g. unknown resource) the view runs unconditionally.
+    Collections only get an ETag: deleting a row does not move their last modification,
+    so `If-Modified-Since` alone would keep answering 304.
+
+    With `versioned`, the state is the `(last_modified, version)` of a versioned row and
+    the ETag starts with the version, for `if_match_version()` to read it back.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            state = state_func(self, request, *args, **kwargs)
+            if state is None:
+                return view_method(self, request, *args, **kwargs)
+
+            etag, timestamp, response = _conditional_response(request, state, versioned)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+            return _add_validators(response, etag, timestamp)
+        return wrapper
+    return decorator
+
+
+def aconditional_get(state_func, versioned=False):
+    """
+    Same as `conditional_get()` for an async `get` method, `state_func` being a
+    coroutine function.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        async def wrapper(self, request, *args, **kwargs):
+            state = await state_func(self, request, *args, **kwargs)
+            if state is None:
+                return await view_method(self, request, *args, **kwargs)
+
+            etag, timestamp, response = _conditional_response(request, state, versioned)
+            if response is None:
+                response = await view_method(self, request, *args, **kwargs)
+            return _add_validators(response, etag, timestamp)
+        return wrapper
+    return decorator
+
+
+def entity_tag(path, query, state, versioned=False):
+    """
+    Returns the ETag of the representation of `path?query` in `state`.
+    """
+    digest = hashlib.md5(repr([path, query, state]).encode()).hexdigest()
+    return quote_etag(f'v{state[1]}.{digest}' if versioned else digest)
+
+
+def if_match_version(request):
+    """
+    Returns the version named by the `If-Match` header of a write: None without the
+    header or with `*`, 0 (no version matches it) when no entity tag carries one.
+    """
+    header = request.headers.get('If-Match')
+    if header is None or header.strip() == '*':
+        return None
+    for etag in parse_etags(header):
+        match = _VERSION_TAG.match(etag)
+        if match:
+            return int(match.group(1))
+    return 0
+
+
+def _conditional_response(request, state, versioned=False):
+    """
+    Returns the ETag and Last-Modified timestamp of `state`, and the 304 response when
+    the request's validators still match (None otherwise).
+    """
+    if not isinstance(state, tuple):
+        last_modified = state
+    else:
+        # A versioned row, or a collection, see conditional_get().
+        last_modified = state[0] if versioned else None
+    etag = entity_tag(request.path, request.GET.urlencode(), state, versioned)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _add_validators(response, etag, timestamp):
+    if response.status_code not in (200, 304):
+        return response
+    response.headers.setdefault('ETag', etag)
+    if timestamp is not None:
+        response.headers.setdefault('Last-Modified', http_date(timestamp))
+    return response
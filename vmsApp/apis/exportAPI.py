@@ -0,0 +1,86 @@
+# import file modules
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from ..renderers import NDJSONRenderer, CSVRenderer
+from ..services.exportServices import ExportService
+
+
+class ExportBaseView(APIView):
+    """
+    Base class for the bulk export endpoints.
+
+    The output format is chosen by content negotiation: `Accept: application/x-ndjson`
+    (the default) or `Accept: text/csv`, or the `?format=ndjson|csv` override. Errors
+    are JSON documents whatever the requested format.
+    """
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    def __init__(self) -> None:
+        self.export_service = ExportService()
+
+    def handle_exception(self, exc):
+        # e.g. an unknown ?format= (404) or an unsupported Accept header (406)
+        response = super().handle_exception(exc)
+        detail = response.data.get('detail', response.data) if isinstance(response.data, dict) else response.data
+        response.data = {'message': str(detail), 'status': response.status_code, 'data': None}
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code >= 400:
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = JSONRenderer.media_type
+        return response
+
+    def invalid_params(self, error):
+        return Response(
+            {'message': 'Invalid query parameters', 'errors': error.detail, 'status': 400, 'data': None},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def stream(self, request, export, filename):
+        fieldnames, rows = export
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(rows, fieldnames),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{renderer.format}"'
+        return response
+
+
+class PurchaseOrderExportAPI(ExportBaseView):
+    def get(self, request):
+        """
+        Streams every purchase order matching the filters.
+
+        ** GET http://127.0.0.1:8000/api/purchase_orders/export/ **
+
+        Accepts the purchase order list filters, `updated_since`, and `fields` / `exclude`.
+        """
+        try:
+            export = self.export_service.export_purchase_orders(request.query_params.dict())
+            return self.stream(request, export, 'purchase_orders')
+        except ValidationError as e:
+            return self.invalid_params(e)
+
+
+class VendorExportAPI(ExportBaseView):
+    def get(self, request):
+        """
+        Streams every vendor.
+
+        ** GET http://127.0.0.1:8000/api/vendors/export/ **
+
+        Accepts `updated_since` to only export vendors changed since then, and `fields` /
+        `exclude` to choose the exported columns.
+        """
+        try:
+            export = self.export_service.export_vendors(request.query_params.dict())
+            return self.stream(request, export, 'vendors')
+        except ValidationError as e:
+            return self.invalid_params(e)
@@ -0,0 +1,37 @@
+# import file modules
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from ..readCache import read_cache
+from ..instrumentation import endpoint_metrics
+
+
+class CacheStatsAPI(APIView):
+    """
+    Internal endpoint exposing the read cache hit/miss counters of this process.
+    """
+
+    def get(self, request):
+        """
+        ** GET http://127.0.0.1:8000/api/_cache/stats/ **
+        """
+        return Response(
+            {'message': 'Cache statistics fetched successfully', 'status': 200, 'data': read_cache.stats()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class MetricsAPI(APIView):
+    """
+    Internal endpoint exposing the per-endpoint request metrics of this process in the
+    Prometheus text format.
+    """
+
+    def get(self, request):
+        """
+        ** GET http://127.0.0.1:8000/api/_metrics/ **
+        """
+        return HttpResponse(
+            endpoint_metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
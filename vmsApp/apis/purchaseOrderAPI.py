@@ -1,10 +1,11 @@
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound
-from ..models import PurchaseOrder
+from rest_framework.exceptions import NotFound, ValidationError
+from ..models import PurchaseOrder, VersionConflict
 from django.utils import timezone
 from ..services.purchaseOrderServices import PurhaseOrderService
+from .conditional import conditional_get, entity_tag, if_match_version
 
 class POBaseModel(APIView):
     """
@@ -25,16 +26,37 @@ class PurchaseOrderAPI(POBaseModel):
     This class handles GET requests to retrieve a list of all purchase orders.
     """
   
+    @conditional_get(lambda view, request: view.po_service.get_orders_last_modified(request.query_params.dict()))
     def get(self, request):
         """
-        Retrieves a list of all purchase orders.
+        Retrieves a page of purchase orders.
         
-        **GET http://127.0.0.1:8000/api/purchase_orders/ **
-        This function handles GET requests to retrieve all purchase orders.
+        **GET http://127.0.0.1:8000/api/purchase_orders/?cursor=&page_size= **
+        This function handles GET requests to retrieve purchase orders one page at a time.
+        Follow the `next`/`prev` cursors of the response to fetch the other pages.
+
+        Optional filters: `vendor`, `status`, `acknowledged`, `order_date_from/_to`,
+        `issue_date_from/_to`, `delivery_date_from/_to`, and `sort` (e.g. `-issue_date`).
+        `fields` / `exclude` take comma separated field names to include / leave out,
+        e.g. `?fields=uid,status,vendor`.
         """
         try:
-            po_list = self.po_service.get_all_orders()
-            return Response({'message': 'Successfully fetched purchased order records', 'status': 200, "data": {"po": po_list}}, status=status.HTTP_200_OK)
+            po_list = self.po_service.get_all_orders(
+                filters=request.query_params.dict(),
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size'),
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+            )
+            if po_list is None:
+                raise Exception("failed to fetch purchase orders")
+            return Response({
+                'message': 'Successfully fetched purchased order records',
+                'status': 200,
+                "data": {"po": po_list['results'], "next": po_list['next'], "prev": po_list['prev']},
+            }, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:  # Catch any exceptions during retrieval
             return Response({'message': f'An error occurred: {str(e)}', 'status': 500}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -63,6 +85,109 @@ class PurchaseOrderAPI(POBaseModel):
             
 
 
+class PurchaseOrderBulkAPI(POBaseModel):
+    """
+    API endpoint for creating many purchase orders in one request.
+    """
+
+    def post(self, request):
+        """
+        Creates a batch of purchase orders.
+
+        **POST http://127.0.0.1:8000/api/purchase_orders/bulk/ **
+
+        The body is either a list of purchase orders or `{"orders": [...], "atomic": true}`.
+        Invalid orders are reported per index while the valid ones are created, unless
+        atomic mode is requested, in which case any error rejects the whole batch.
+        """
+        try:
+            payload = request.data
+            atomic = request.query_params.get('atomic', '').lower() in ('1', 'true')
+            if isinstance(payload, dict):
+                atomic = atomic or payload.get('atomic') in (True, 'true', '1', 1)
+                payload = payload.get('orders')
+            result = self.po_service.bulk_create_orders(payload, atomic=atomic)
+        except ValidationError as e:
+            return Response({'message': 'Validation errors occurred', 'errors': e.detail, 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
+
+        created, errors = result['created'], result['errors']
+        if not created:
+            return Response({
+                'message': 'No purchase order created',
+                'status': 400,
+                'data': {'po': [], 'errors': errors},
+            }, status=status.HTTP_400_BAD_REQUEST)
+        response_status = status.HTTP_207_MULTI_STATUS if errors else status.HTTP_201_CREATED
+        return Response({
+            'message': f'{len(created)} purchase orders created successfully',
+            'status': response_status,
+            'data': {'po': created, 'errors': errors},
+        }, status=response_status)
+
+
+class PurchaseOrderLineAPI(POBaseModel):
+    """
+    API endpoint for querying the normalized line items of the purchase orders.
+    """
+
+    def get(self, request):
+        """
+        Retrieves a page of purchase order lines.
+
+        ** GET http://127.0.0.1:8000/api/purchase_orders/lines/?sku=&vendor=&purchase_order=&status=&cursor=&page_size= **
+        `status` filters on the purchase order status, e.g. `?sku=SKU-1&status=pending`
+        lists the lines of the open orders containing SKU-1.
+        """
+        try:
+            lines = self.po_service.get_order_lines(
+                filters=request.query_params.dict(),
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size'),
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+            )
+        except ValidationError as e:
+            return Response({'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
+        if lines is None:
+            return Response({'message': 'An error occurred: failed to fetch purchase order lines', 'status': 500}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'message': 'Successfully fetched purchase order lines',
+            'status': 200,
+            "data": {"lines": lines['results'], "next": lines['next'], "prev": lines['prev']},
+        }, status=status.HTTP_200_OK)
+
+
+class PurchaseOrderLineSummaryAPI(POBaseModel):
+    """
+    API endpoint for aggregating the purchase order lines per SKU and/or vendor.
+    """
+
+    def get(self, request):
+        """
+        Retrieves the line totals per group.
+
+        ** GET http://127.0.0.1:8000/api/purchase_orders/lines/summary/?group_by=vendor&sku=SKU-1&sort=-total_quantity **
+        `group_by` is `sku` (default), `vendor` or `vendor,sku`. Each group has its number
+        of lines and orders, total quantity and value and average unit price. The
+        `page_size` first groups in `sort` order are returned, the filters are the ones
+        of the line list.
+        """
+        try:
+            summary = self.po_service.get_order_line_summary(
+                params=request.query_params.dict(),
+                page_size=request.query_params.get('page_size'),
+            )
+        except ValidationError as e:
+            return Response({'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
+        if summary is None:
+            return Response({'message': 'An error occurred: failed to summarize purchase order lines', 'status': 500}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'message': 'Successfully summarized purchase order lines',
+            'status': 200,
+            "data": {"group_by": summary['group_by'], "summary": summary['results']},
+        }, status=status.HTTP_200_OK)
+
+
 class PurchasedOrderViewAPI(POBaseModel):
     """
     API endpoint for retrieving, updating, and deleting a specific purchase order.
@@ -70,18 +195,25 @@ class PurchasedOrderViewAPI(POBaseModel):
     It inherits from `POBaseModel` to access the `po_service` instance.
     """
 
+    @conditional_get(lambda view, request, po_id: view.po_service.get_order_state(po_id), versioned=True)
     def get(self, request, po_id):
         """
         Retrieves a specific purchase order.
 
-        **GET http://127.0.0.1:8000/api/purchase_orders/{po_id}/ **
+        **GET http://127.0.0.1:8000/api/purchase_orders/{po_id}/?fields=&exclude= **
         """
         try:
-            po_details = self.po_service.get_purchase_order_detail(po_id)
-            if not po_details:
+            po_details = self.po_service.get_purchase_order_detail(
+                po_id,
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+            )
+            if po_details is None:
                 raise NotFound('Purchased Order with ID {} not found.'.format(po_id))
             
             return Response({'message': 'Successfully fetched order record', 'status': 200, "data": {"po": po_details}})
+        except ValidationError as e:
+            return Response({'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:  # Catch any exceptions during retrieval
             return Response({'message': f'An error occurred: {str(e)}', 'status': 500}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -95,11 +227,21 @@ class PurchasedOrderViewAPI(POBaseModel):
         This function handles PUT requests to update a purchase order with the provided `po_id`.
         It expects the update details in the request body.
         """
+        expected_version = if_match_version(request)
         try:
-            update_po = self.po_service.update_order(po_id, request.data)
+            update_po = self.po_service.update_order(po_id, request.data, expected_version)
             if not update_po:
                 raise NotFound('Purchased Order with ID {} not found.'.format(po_id))
-            return Response({'message': 'order information updated successfully', 'status': 200, "data": {"po": update_po}})
+            po = update_po.instance
+            return Response(
+                {'message': 'order information updated successfully', 'status': 200, "data": {"po": update_po.data}},
+                headers={'ETag': entity_tag(request.path, '', (po.updated_at, po.version), versioned=True)},
+            )
+        except VersionConflict as e:
+            # A failed If-Match is a precondition failure, a write lost to a concurrent one a conflict.
+            if expected_version is None:
+                return Response({'message': str(e), 'status': 409}, status=status.HTTP_409_CONFLICT)
+            return Response({'message': str(e), 'status': 412}, status=status.HTTP_412_PRECONDITION_FAILED)
         except Exception as e:  # Catch any exceptions during update
             return Response({'message': f'An error occurred: {e}', 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -2,8 +2,10 @@
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from ..services.vendorServices import VendorService
+from ..models import VersionConflict
+from .conditional import conditional_get, entity_tag, if_match_version
 
 class VendorBaseView(APIView):
     """
@@ -26,26 +28,43 @@ class VendorListAPI(VendorBaseView):
     It inherits from the `VendorBaseView` class to access the `vendor_service` instance.
     """
 
+    @conditional_get(lambda view, request: view.vendor_service.get_vendors_last_modified())
     def get(self, request):
         """
-        Retrieves a list of all vendors.
+        Retrieves a page of vendors.
         
-        **GET http://127.0.0.1:8000/api/vendors/**
+        **GET http://127.0.0.1:8000/api/vendors/?cursor=&page_size=&fields=&exclude=**
 
-        This function retrieves a list of all vendors available in the application.
+        This function retrieves a page of the vendors available in the application.
+        Follow the `next`/`prev` cursors of the response to fetch the other pages.
+        `fields` / `exclude` take comma separated field names to include / leave out.
         """
         try:
-            all_vendors = self.vendor_service.get_all_vendors()
-            if not all_vendors:
+            all_vendors = self.vendor_service.get_all_vendors(
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size'),
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+            )
+            if all_vendors is None:
                 raise Exception("Failed to fetch all vendors")
             return Response(
                 {
                     'message': 'Successfully fetched all vendor records',
                     'status': 200,
-                    "data": {"vendor": all_vendors.data},
+                    "data": {
+                        "vendor": all_vendors['results'],
+                        "next": all_vendors['next'],
+                        "prev": all_vendors['prev'],
+                    },
                 },
                 status=status.HTTP_200_OK,
             )
+        except ValidationError as e:
+            return Response(
+                {'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Exception as e:
             return Response(
                 {'message': f'An error occurred: {str(e)}', 'status': 500},
@@ -77,19 +96,125 @@ class VendorListAPI(VendorBaseView):
             )
 
 
+class VendorLeaderboardAPI(VendorBaseView):
+    """
+    API endpoint for ranking vendors by performance.
+    """
+
+    @conditional_get(lambda view, request: view.vendor_service.get_vendors_last_modified())
+    def get(self, request):
+        """
+        Retrieves a page of vendors ranked by a performance metric.
+
+        **GET http://127.0.0.1:8000/api/vendors/leaderboard/?sort=-on_time_delivery_rate&total_pos_min=100**
+
+        `sort` is one of `on_time_delivery_rate`, `quality_rating_avg`, `average_response_time`,
+        `fulfillment_rate` and `total_pos`, prefixed with '-' for descending order. Each of them
+        can be filtered with the `_min`, `_max`, `_gt` and `_lt` suffixes, e.g.
+        `?fulfillment_rate_lt=80`. Accepts `cursor`, `page_size`, `fields` and `exclude`.
+        """
+        try:
+            leaderboard = self.vendor_service.get_vendor_leaderboard(
+                filters=request.query_params.dict(),
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size'),
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+            )
+            if leaderboard is None:
+                raise Exception("Failed to fetch the vendor leaderboard")
+            return Response(
+                {
+                    'message': 'Successfully fetched vendor leaderboard',
+                    'status': 200,
+                    "data": {
+                        "vendor": leaderboard['results'],
+                        "next": leaderboard['next'],
+                        "prev": leaderboard['prev'],
+                    },
+                },
+                status=status.HTTP_200_OK,
+            )
+        except ValidationError as e:
+            return Response(
+                {'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {'message': f'An error occurred: {str(e)}', 'status': 500},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class VendorSearchAPI(VendorBaseView):
+    """
+    API endpoint for the full-text search of vendors.
+    """
+
+    @conditional_get(lambda view, request: view.vendor_service.get_vendors_last_modified())
+    def get(self, request):
+        """
+        Retrieves a page of the vendors matching a search query, best matches first.
+
+        **GET http://127.0.0.1:8000/api/vendors/search/?q=acme sup**
+
+        Every word of `q` must match the start of a word of the vendor name, address or
+        contact details, e.g. `sup` matches "Supplies". Name matches rank first. Each vendor
+        carries its `rank` (lower is better). Accepts `cursor`, `page_size`, `fields` and `exclude`.
+        """
+        try:
+            search = self.vendor_service.search_vendors(
+                params={'q': request.query_params.get('q', '')},
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size'),
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+            )
+            if search is None:
+                raise Exception("Failed to search vendors")
+            return Response(
+                {
+                    'message': 'Successfully searched vendors',
+                    'status': 200,
+                    "data": {
+                        "vendor": search['results'],
+                        "next": search['next'],
+                        "prev": search['prev'],
+                    },
+                },
+                status=status.HTTP_200_OK,
+            )
+        except ValidationError as e:
+            return Response(
+                {'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {'message': f'An error occurred: {str(e)}', 'status': 500},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class VendorViewsAPI(VendorBaseView):
     """
     API endpoint for retrieving, updating, and deleting a specific vendor.
     """
 
+    @conditional_get(lambda view, request, vendor_id: view.vendor_service.get_vendor_state(vendor_id), versioned=True)
     def get(self, request, vendor_id):
         """
         Retrieves a specific vendor's details.
-        ** GET http://127.0.0.1:8000/api/vendors/{vendor_id}/ **
+        ** GET http://127.0.0.1:8000/api/vendors/{vendor_id}/?fields=&exclude= **
         This function retrieves a vendor's details using the provided vendor ID.
         """
         try:
-            vendor = self.vendor_service.get_vendor_details(vendor_id)
+            vendor = self.vendor_service.get_vendor_details(
+                vendor_id,
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+            )
             if vendor is None:
                 raise NotFound(f"Vendor with ID {vendor_id} not found.")
 
@@ -97,10 +222,15 @@ class VendorViewsAPI(VendorBaseView):
                 {
                     'message': 'Successfully fetched vendor record',
                     'status': 200,
-                    "data": {"vendor": vendor.data},
+                    "data": {"vendor": vendor},
                 },
                 status=status.HTTP_200_OK,
             )
+        except ValidationError as e:
+            return Response(
+                {'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Exception as e:
             return Response(
                 {'message': f'An error occurred: {str(e)}', 'status': 404},
@@ -114,14 +244,21 @@ class VendorViewsAPI(VendorBaseView):
         This function updates a vendor's details using the provided vendor ID
         and data from the request body.
         """
+        expected_version = if_match_version(request)
         try:
-            vendor = self.vendor_service.update_vendor(vendor_id, request.data)
+            vendor = self.vendor_service.update_vendor(vendor_id, request.data, expected_version)
             if not vendor:
                 raise NotFound(f"Vendor with ID {vendor_id} not found.")
 
             return Response(
                 {'message': 'Vendor information updated successfully', 'status': 200, "data": {"vendor": vendor.data}},
+                headers={'ETag': entity_tag(request.path, '', (vendor.instance.updated_at, vendor.instance.version), versioned=True)},
             )
+        except VersionConflict as e:
+            # A failed If-Match is a precondition failure, a write lost to a concurrent one a conflict.
+            if expected_version is None:
+                return Response({'message': str(e), 'status': 409}, status=status.HTTP_409_CONFLICT)
+            return Response({'message': str(e), 'status': 412}, status=status.HTTP_412_PRECONDITION_FAILED)
         except Exception as e:
             return Response(
                 {'message': f'An error occurred: {str(e)}', 'status': 400},
@@ -149,14 +286,24 @@ class VendorPerformanceView(VendorBaseView):
     API endpoint for retrieving vendor performance.
     """
 
+    @conditional_get(lambda view, request, vendor_id: view.vendor_service.get_vendor_performance_last_modified(
+        vendor_id, request.query_params.get('window'),
+    ))
     def get(self, request, vendor_id):
         """
         Retrieves a specific vendor's performance data.
-        ** GET http://127.0.0.1:8000/api/vendors/{vendor_id}/performance/ **
+        ** GET http://127.0.0.1:8000/api/vendors/{vendor_id}/performance/?window=&fields=&exclude= **
         This function retrieves a vendor's performance data using the provided vendor ID.
+        `window` (30d, 90d or 365d) restricts the metrics to the purchase orders issued
+        in that many last days, lifetime metrics are returned without it.
         """
         try:
-            vendor = self.vendor_service.get_vendor_performance(vendor_id)
+            vendor = self.vendor_service.get_vendor_performance(
+                vendor_id,
+                fields=request.query_params.get('fields'),
+                exclude=request.query_params.get('exclude'),
+                window=request.query_params.get('window'),
+            )
             if vendor is None:
                 raise NotFound(f"Vendor with ID {vendor_id} not found.")
 
@@ -164,13 +311,69 @@ class VendorPerformanceView(VendorBaseView):
                 {
                     'message': 'Vendor performance fetched successfully',
                     'status': 200,
-                    "data": {"vendor": vendor.data},
+                    "data": {"vendor": vendor},
                 },
                 status=status.HTTP_200_OK,
             )
+        except ValidationError as e:
+            return Response(
+                {'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Exception as e:
             return Response(
                 {'message': f'An error occurred: {str(e)}', 'status': 404},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+
+
+class VendorPerformanceHistoryView(VendorBaseView):
+    """
+    API endpoint for retrieving a vendor's performance history.
+    """
+
+    def get(self, request, vendor_id):
+        """
+        Retrieves a page of a vendor's performance history.
+        ** GET http://127.0.0.1:8000/api/vendors/{vendor_id}/performance/history/?from=&to=&bucket=day **
+        `bucket` is `raw` (the snapshots themselves), `hour`, `day` (default) or `month`
+        (average, min and max of each metric per period). `from` / `to` bound the range.
+        Follow the `next`/`prev` cursors of the response to fetch the other pages.
+        """
+        try:
+            history = self.vendor_service.get_vendor_performance_history(
+                vendor_id,
+                params=request.query_params.dict(),
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size'),
+            )
+            if history is None:
+                return Response(
+                    {'message': f"Vendor with ID {vendor_id} not found.", 'status': 404},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+            return Response(
+                {
+                    'message': 'Vendor performance history fetched successfully',
+                    'status': 200,
+                    "data": {
+                        "bucket": history['bucket'],
+                        "history": history['results'],
+                        "next": history['next'],
+                        "prev": history['prev'],
+                    },
+                },
+                status=status.HTTP_200_OK,
+            )
+        except ValidationError as e:
+            return Response(
+                {'message': 'Invalid query parameters', 'errors': e.detail, 'status': 400},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {'message': f'An error occurred: {str(e)}', 'status': 500},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VmsappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vmsApp'
+
+    def ready(self):
+        from . import instrumentation, readCache, signals  # noqa: F401
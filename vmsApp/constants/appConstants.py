@@ -2,4 +2,128 @@ STATUS_CHOICES = (
     ('pending', 'Pending'),
     ('completed', 'Completed'),
     ('canceled', 'Canceled'),
-)
\ No newline at end of file
+)
+
+# Vendor performance metrics derived from the vendor's purchase orders.
+PERFORMANCE_METRIC_FIELDS = (
+    'on_time_delivery_rate',
+    'quality_rating_avg',
+    'average_response_time',
+    'fulfillment_rate',
+)
+
+# Running aggregates kept on the vendor, the metrics above are computed from these.
+PERFORMANCE_AGGREGATE_FIELDS = (
+    'total_pos',
+    'completed_pos',
+    'on_time_pos',
+    'quality_rating_sum',
+    'quality_rating_count',
+    'response_time_sum',
+    'response_time_count',
+)
+
+# Tolerance used when comparing stored float aggregates against a full scan.
+PERFORMANCE_VERIFY_TOLERANCE = 1e-6
+
+# Keyset pagination of list endpoints, overridable with VMS_PAGE_SIZE / VMS_MAX_PAGE_SIZE.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Sort keys accepted by the purchase order list (?sort=), '-' for descending order.
+PURCHASE_ORDER_SORT_FIELDS = (
+    'created_at', '-created_at',
+    'updated_at', '-updated_at',
+    'order_date', '-order_date',
+    'issue_date', '-issue_date',
+)
+
+# Rows fetched per database round trip by the streaming exports (VMS_EXPORT_CHUNK_SIZE).
+EXPORT_CHUNK_SIZE = 2000
+
+# Groupings (?group_by=) and sort keys (?sort=) of the purchase order line summary.
+PURCHASE_ORDER_LINE_GROUPS = (
+    ('sku', 'SKU'),
+    ('vendor', 'Vendor'),
+    ('vendor,sku', 'Vendor and SKU'),
+)
+PURCHASE_ORDER_LINE_SUMMARY_SORT_FIELDS = (
+    'total_quantity', '-total_quantity',
+    'total_value', '-total_value',
+    'lines', '-lines',
+    'orders', '-orders',
+)
+
+# Purchase orders whose lines are rewritten per transaction by backfill_order_lines.
+LINE_BACKFILL_CHUNK_SIZE = 1000
+
+# bm25 weight of each column of the vendor search index, a match in the name counts most.
+VENDOR_SEARCH_WEIGHTS = {
+    'name': 10.0,
+    'contact_details': 4.0,
+    'address': 2.0,
+}
+
+# Largest number of purchase orders accepted by one bulk create (VMS_BULK_MAX_ITEMS).
+BULK_MAX_ITEMS = 10000
+
+# Vendors whose aggregate deltas are applied by one UPDATE, bounds the statement parameters.
+PERFORMANCE_DELTA_BATCH_SIZE = 100
+
+# Actions accepted by the batch purchase order transition endpoint.
+PURCHASE_ORDER_TRANSITIONS = (
+    ('acknowledge', 'Acknowledge'),
+    ('complete', 'Complete'),
+    ('cancel', 'Cancel'),
+    ('rate', 'Rate'),
+)
+
+# Granularities of the vendor performance history rollups.
+PERFORMANCE_ROLLUP_BUCKETS = (
+    ('hour', 'Hour'),
+    ('day', 'Day'),
+    ('month', 'Month'),
+)
+
+# Buckets accepted by the performance history endpoint, 'raw' returns the snapshots themselves.
+PERFORMANCE_HISTORY_BUCKETS = (('raw', 'Raw'),) + PERFORMANCE_ROLLUP_BUCKETS
+
+# Days of performance history kept by compact_performance_history, overridable with
+# VMS_HISTORY_RAW_RETENTION_DAYS / VMS_HISTORY_HOURLY_RETENTION_DAYS / VMS_HISTORY_DAILY_RETENTION_DAYS.
+# None keeps the rows forever, monthly rollups are always kept.
+HISTORY_RAW_RETENTION_DAYS = 30
+HISTORY_HOURLY_RETENTION_DAYS = 180
+HISTORY_DAILY_RETENTION_DAYS = None
+
+# Rolling windows of the vendor performance metrics (?window=), in days. Purchase orders
+# count in the window containing the UTC day they were issued.
+PERFORMANCE_WINDOWS = {
+    '30d': 30,
+    '90d': 90,
+    '365d': 365,
+}
+
+# Sort keys accepted by the vendor leaderboard (?sort=), '-' for descending order.
+VENDOR_LEADERBOARD_SORT_FIELDS = (
+    'on_time_delivery_rate', '-on_time_delivery_rate',
+    'quality_rating_avg', '-quality_rating_avg',
+    'average_response_time', '-average_response_time',
+    'fulfillment_rate', '-fulfillment_rate',
+    'total_pos', '-total_pos',
+)
+
+# Upper bounds, in seconds, of the request latency histogram buckets exposed at /api/_metrics/.
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Repetitions of one query shape from one line of code within a request logged as a
+# possible N+1 query by NPlusOneMiddleware (VMS_NPLUSONE_THRESHOLD).
+NPLUSONE_THRESHOLD = 5
+
+# Write operations committed by one transaction of the write coordinator, and the time in
+# milliseconds it waits for more once it has one (VMS_WRITE_BATCH_SIZE / VMS_WRITE_BATCH_WAIT_MS).
+WRITE_BATCH_SIZE = 64
+WRITE_BATCH_WAIT_MS = 2
+
+# Seconds a caller waits for the writer thread to run its write operation before giving
+# up (VMS_WRITE_RESULT_TIMEOUT_SECONDS).
+WRITE_RESULT_TIMEOUT = 30
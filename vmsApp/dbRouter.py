@@ -0,0 +1,142 @@
+"""
+Primary / read-replica database routing.
+
+Writes always go to the `default` (primary) database. Reads go to one of the
+`VMS_READ_REPLICAS` aliases only inside the read-only service methods decorated with
+`replica_read`, and never:
+
+- inside a transaction on the primary, which must see its own uncommitted writes;
+- once the current request wrote something, or when the client wrote recently
+  (read-your-writes). `ReplicaPinningMiddleware` remembers a client's writes with a
+  cookie for `VMS_REPLICA_STICKY_SECONDS`, longer than the expected replication lag.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'vms_primary'
+
+_replica = ContextVar('vms_replica', default=None)
+_pinned = ContextVar('vms_pinned_to_primary', default=False)
+_wrote = ContextVar('vms_wrote', default=False)
+
+
+def read_replicas():
+    return list(getattr(settings, 'VMS_READ_REPLICAS', ()))
+
+
+@contextmanager
+def use_replica():
+    """
+    Lets the reads of the block be served by a replica, the same one for the whole
+    block so that its queries see a single state of the data.
+    """
+    replicas = read_replicas()
+    token = _replica.set(_replica.get() or (random.choice(replicas) if replicas else None))
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def replica_read(method):
+    """
+    Decorates a read-only service method whose queries may be served by a replica.
+    Async methods keep the replica for all of their awaited queries.
+    """
+    if iscoroutinefunction(method):
+        @wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            with use_replica():
+                return await method(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return method(*args, **kwargs)
+    return wrapper
+
+
+def routes_to_replica():
+    """
+    True when the reads of the current context are served by a replica.
+    """
+    return (
+        _replica.get() is not None
+        and not _pinned.get()
+        and not _wrote.get()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router sending writes to the primary and the reads of `replica_read`
+    methods to a random replica, see the module docstring.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica.get() if routes_to_replica() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Every later read of this request must see the write.
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from replication.
+        return db not in read_replicas()
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins the reads of a request to the primary when its client wrote recently, and
+    remembers the writes of the request for the following ones.
+
+    Runs natively in both modes, so the async views are not pushed to a thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pinned = _pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote = _wrote.set(False)
+        try:
+            return self._remember_writes(self.get_response(request))
+        finally:
+            _wrote.reset(wrote)
+            _pinned.reset(pinned)
+
+    async def __acall__(self, request):
+        pinned = _pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote = _wrote.set(False)
+        try:
+            return self._remember_writes(await self.get_response(request))
+        finally:
+            _wrote.reset(wrote)
+            _pinned.reset(pinned)
+
+    @staticmethod
+    def _remember_writes(response):
+        if _wrote.get() and read_replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'VMS_REPLICA_STICKY_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,387 @@
+"""
+Per-endpoint request instrumentation.
+
+`InstrumentationMiddleware` measures every request and records it under the name of the
+URL pattern it resolved to (`vmsProject/urls.py`), with the request method:
+
+- the latency, as a histogram with `REQUEST_LATENCY_BUCKETS`;
+- the number and the total duration of the database queries, counted by an execute
+  wrapper installed on every database connection (replicas and async ORM threads included);
+- the time spent rendering the response body, and its size.
+
+Every thread records into its own shard, which no other thread writes, so recording a
+request only takes a lock the first time a thread records one. The shards are only summed when `/api/_metrics/` renders them
+in the Prometheus text format. Turn it off with `VMS_INSTRUMENTATION_ENABLED = False`.
+
+`NPlusOneMiddleware` (on with `VMS_NPLUSONE_DETECTION`, DEBUG by default) logs the
+queries a request ran `VMS_NPLUSONE_THRESHOLD` times or more with the same shape from
+the same line of code, the typical N+1 pattern of a lazy relation read in a loop.
+"""
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from .constants.appConstants import REQUEST_LATENCY_BUCKETS, NPLUSONE_THRESHOLD
+
+UNMATCHED_ENDPOINT = 'unmatched'
+
+_current = ContextVar('vms_request_stats', default=None)
+_query_log = ContextVar('vms_query_log', default=None)
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# `IN (%s, %s, ...)` and multi-row `VALUES (...), (...)` only differ by their length.
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_VALUES_LIST = re.compile(r'(\(%s\.\.\.\))(?:\s*,\s*\(%s\.\.\.\))+')
+
+
+class RequestStats:
+    """
+    What one request spent, filled in while it runs.
+    """
+    __slots__ = ('queries', 'db_time', 'serialization_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+
+
+class _Series:
+    """
+    The aggregates of one `(endpoint, method)` in one shard.
+    """
+    __slots__ = ('count', 'latency_sum', 'latency_buckets', 'queries', 'db_time', 'serialization_time', 'response_bytes', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        # One slot per bucket plus +Inf, not cumulative until exported.
+        self.latency_buckets = [0] * (len(REQUEST_LATENCY_BUCKETS) + 1)
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class EndpointMetrics:
+    """
+    Per-process request aggregates, sharded per thread.
+
+    Shards are keyed by thread ident. The shards of the threads that exited are folded
+    into a retired total when a new thread registers and on every snapshot, so a
+    thread-per-request server keeps one shard per live thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+
+    def record(self, endpoint, method, status_code, latency, stats, response_bytes):
+        shard = self._shard()
+        series = shard.get((endpoint, method))
+        if series is None:
+            series = shard[(endpoint, method)] = _Series()
+        series.count += 1
+        series.latency_sum += latency
+        series.latency_buckets[bisect_left(REQUEST_LATENCY_BUCKETS, latency)] += 1
+        series.queries += stats.queries
+        series.db_time += stats.db_time
+        series.serialization_time += stats.serialization_time
+        series.response_bytes += response_bytes
+        series.statuses[status_code] = series.statuses.get(status_code, 0) + 1
+
+    def snapshot(self):
+        """
+        Returns `{(endpoint, method): _Series}` summed over all the shards.
+        """
+        totals = {}
+        with self._shards_lock:
+            self._retire_dead_shards()
+            _merge_shard(totals, self._retired)
+            shards = [shard for _, shard in self._shards.values()]
+        for shard in shards:
+            _merge_shard(totals, shard)
+        return totals
+
+    def reset(self):
+        with self._shards_lock:
+            self._shards.clear()
+            self._retired = {}
+        self._local = threading.local()
+
+    def render_prometheus(self):
+        """
+        Renders the aggregates in the Prometheus text exposition format (version 0.0.4).
+        """
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        family('vms_http_request_duration_seconds', 'histogram', 'Request latency per endpoint.')
+        for (endpoint, method), series in snapshot:
+            labels = _labels(endpoint=endpoint, method=method)
+            cumulative = 0
+            for bound, count in zip(REQUEST_LATENCY_BUCKETS + (float('inf'),), series.latency_buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'vms_http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'vms_http_request_duration_seconds_sum{{{labels}}} {series.latency_sum!r}')
+            lines.append(f'vms_http_request_duration_seconds_count{{{labels}}} {series.count}')
+
+        family('vms_http_responses_total', 'counter', 'Responses per endpoint and status code.')
+        for (endpoint, method), series in snapshot:
+            for status_code, count in sorted(series.statuses.items()):
+                lines.append(f'vms_http_responses_total{{{_labels(endpoint=endpoint, method=method, status=status_code)}}} {count}')
+
+        counters = (
+            ('vms_db_queries_total', 'Database queries run by the requests of an endpoint.', 'queries'),
+            ('vms_db_query_duration_seconds_total', 'Time spent in database queries.', 'db_time'),
+            ('vms_serialization_duration_seconds_total', 'Time spent rendering response bodies.', 'serialization_time'),
+            ('vms_http_response_size_bytes_total', 'Bytes of the response bodies, streamed responses excluded.', 'response_bytes'),
+        )
+        for name, help_text, attribute in counters:
+            family(name, 'counter', help_text)
+            for (endpoint, method), series in snapshot:
+                value = getattr(series, attribute)
+                lines.append(f'{name}{{{_labels(endpoint=endpoint, method=method)}}} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            thread = threading.current_thread()
+            with self._shards_lock:
+                self._retire_dead_shards()
+                self._shards[thread.ident] = (thread, shard)
+        return shard
+
+    def _retire_dead_shards(self):
+        """
+        Folds the shards of the threads that exited into the retired total. A dead
+        thread no longer writes its shard. Called with `_shards_lock` held.
+        """
+        for ident, (thread, shard) in list(self._shards.items()):
+            if not thread.is_alive():
+                _merge_shard(self._retired, shard)
+                del self._shards[ident]
+
+
+def _merge_shard(totals, shard):
+    """
+    Adds the series of `shard` to the `{(endpoint, method): _Series}` of `totals`.
+    """
+    for key, series in list(shard.items()):
+        total = totals.setdefault(key, _Series())
+        total.count += series.count
+        total.latency_sum += series.latency_sum
+        total.latency_buckets = [a + b for a, b in zip(total.latency_buckets, series.latency_buckets)]
+        total.queries += series.queries
+        total.db_time += series.db_time
+        total.serialization_time += series.serialization_time
+        total.response_bytes += series.response_bytes
+        for status_code, count in list(series.statuses.items()):
+            total.statuses[status_code] = total.statuses.get(status_code, 0) + count
+
+
+endpoint_metrics = EndpointMetrics()
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def instrumentation_enabled():
+    return getattr(settings, 'VMS_INSTRUMENTATION_ENABLED', True)
+
+
+def _record_query(execute, sql, params, many, context):
+    query_log = _query_log.get()
+    if query_log is not None:
+        query_log.append((sql, _query_location()))
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def _query_location():
+    """
+    Returns `path:line in function` of the innermost project frame running the query.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = Path(frame.f_code.co_filename)
+        if filename.is_relative_to(PROJECT_ROOT) and filename != Path(__file__) and 'site-packages' not in filename.parts:
+            return f'{filename.relative_to(PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def query_shape(sql):
+    """
+    Returns `sql` with its placeholder lists collapsed, so that queries differing only
+    by the number of values they take have the same shape.
+    """
+    return _VALUES_LIST.sub(r'\1', _PLACEHOLDER_LIST.sub('(%s...)', sql))
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Counts the queries of every new connection towards the request running them.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def serialization_timer():
+    """
+    Counts the time spent in the block as serialization of the current request.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialization_time += time.perf_counter() - start
+
+
+class InstrumentationMiddleware:
+    """
+    Records the latency, database and serialization costs of every request, see the
+    module docstring. Runs natively in both sync and async mode.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not instrumentation_enabled():
+            return self.get_response(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        if not instrumentation_enabled():
+            return await self.get_response(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook, time the rendering.
+        stats = _current.get()
+        if stats is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                stats.serialization_time += time.perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def _record(request, response, latency, stats):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.url_name if match is not None and match.url_name else UNMATCHED_ENDPOINT
+        size = 0 if response.streaming else len(response.content)
+        endpoint_metrics.record(endpoint, request.method, response.status_code, latency, stats, size)
+
+
+class NPlusOneMiddleware:
+    """
+    Logs the queries of a request repeated with the same shape from the same place, see
+    the module docstring. Meant for development, it inspects the stack of every query.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'VMS_NPLUSONE_DETECTION', settings.DEBUG)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled():
+            return self.get_response(request)
+        queries = []
+        token = _query_log.set(queries)
+        try:
+            return self.get_response(request)
+        finally:
+            _query_log.reset(token)
+            self.report(request, queries)
+
+    async def __acall__(self, request):
+        if not self.enabled():
+            return await self.get_response(request)
+        queries = []
+        token = _query_log.set(queries)
+        try:
+            return await self.get_response(request)
+        finally:
+            _query_log.reset(token)
+            self.report(request, queries)
+
+    @staticmethod
+    def report(request, queries):
+        threshold = getattr(settings, 'VMS_NPLUSONE_THRESHOLD', NPLUSONE_THRESHOLD)
+        repeated = Counter((query_shape(sql), location) for sql, location in queries)
+        for (shape, location), count in repeated.most_common():
+            if count < threshold:
+                break
+            logger.warning(
+                'Possible N+1 query on %s %s: %d x %s at %s', request.method, request.path, count, shape, location,
+            )
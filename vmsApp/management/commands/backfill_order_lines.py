@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...constants.appConstants import LINE_BACKFILL_CHUNK_SIZE
+from ...services.purchaseOrderServices import PurhaseOrderService
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the purchase order lines from the `items` of every purchase order, streaming "
+        "the orders in primary key order one chunk per transaction. Safe to run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=LINE_BACKFILL_CHUNK_SIZE, help='Purchase orders rewritten per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        service = PurhaseOrderService()
+        orders = lines = 0
+        after = None
+        while True:
+            chunk_orders, chunk_lines, after = service.backfill_order_lines(options['chunk_size'], after)
+            if after is None:
+                break
+            orders += chunk_orders
+            lines += chunk_lines
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{orders} purchase orders, {lines} lines')
+
+        self.stdout.write(self.style.SUCCESS(f'{lines} lines written for {orders} purchase orders'))
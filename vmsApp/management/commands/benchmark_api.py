@@ -0,0 +1,402 @@
+import json
+import math
+import platform
+import random
+import sqlite3
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+from ...constants.appConstants import PERFORMANCE_METRIC_FIELDS
+from ...models import Vendor, PurchaseOrder, PurchaseOrderLine, HistoricalPerformance
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Scenario:
+    """
+    One timed request kind: `build(context)` returns the `(path, body)` of the next request,
+    creating whatever it needs (outside of the timing).
+    """
+
+    def __init__(self, name, url_name, method, build, expected=200):
+        self.name = name
+        self.url_name = url_name
+        self.method = method
+        self.build = build
+        self.expected = expected
+
+
+class SeedContext:
+    """
+    The seeded rows the scenarios pick their targets from, with the same vendor skew
+    as the seeded purchase orders.
+    """
+
+    def __init__(self, rng, vendors, vendor_weights, orders):
+        self.rng = rng
+        self.vendors = vendors
+        self.vendor_weights = vendor_weights
+        self.orders = orders
+
+    def vendor(self):
+        return self.rng.choices(self.vendors, cum_weights=self.vendor_weights)[0]
+
+    def order(self):
+        return self.rng.choice(self.orders)
+
+    def new_vendor(self):
+        return Vendor.objects.create(name='Benchmark vendor', address='1 Bench Street', contact_details='bench@example.com')
+
+    def new_order(self, **fields):
+        return PurchaseOrder.objects.create(vendor=self.vendor(), items=self.items(), quantity=1, **fields)
+
+    def items(self):
+        count = min(50, max(1, int(self.rng.lognormvariate(1.0, 0.9))))
+        return [
+            {'sku': f'SKU-{self.rng.randrange(5000):05d}', 'qty': self.rng.randint(1, 20), 'price': round(self.rng.uniform(1, 500), 2)}
+            for _ in range(count)
+        ]
+
+    def order_payload(self, vendor=None):
+        issue_date = timezone.now() - timedelta(days=self.rng.uniform(0, 30))
+        return {
+            'vendor': str(vendor or self.vendor().pk),
+            'items': self.items(),
+            'quantity': self.rng.randint(1, 100),
+            'issue_date': issue_date.isoformat(),
+        }
+
+
+def seed_data(rng, vendor_count, order_count, skew=1.1):
+    """
+    Seeds the vendors, their purchase orders and a few months of performance history.
+
+    Purchase orders are spread over the vendors following a Zipf law, with mixed
+    statuses, per-vendor delivery reliability and quality, and `items` lists of
+    log-normally distributed length, normalized into their lines. The vendor aggregates
+    are then applied in one delta per vendor, as the bulk create endpoint does.
+    """
+    now = timezone.now()
+
+    def uid():
+        return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+    vendors = Vendor.objects.bulk_create([
+        Vendor(uid=uid(), name=f'Vendor {i}', address=f'{i} Market Street', contact_details=f'vendor{i}@example.com')
+        for i in range(vendor_count)
+    ])
+    reliability = {vendor.pk: rng.uniform(0.6, 0.99) for vendor in vendors}
+    quality = {vendor.pk: rng.uniform(2.5, 4.8) for vendor in vendors}
+    weights, total = [], 0.0
+    for rank in range(1, vendor_count + 1):
+        total += 1 / rank ** skew
+        weights.append(total)
+    context = SeedContext(rng, vendors, weights, [])
+
+    orders = []
+    for vendor in rng.choices(vendors, cum_weights=weights, k=order_count):
+        issue_date = now - timedelta(days=rng.uniform(0, 365))
+        roll = rng.random()
+        status = 'completed' if roll < 0.6 else 'pending' if roll < 0.9 else 'canceled'
+        acknowledged = rng.random() < (0.9 if status == 'completed' else 0.5)
+        delivery_date = None
+        if status == 'completed':
+            late = rng.random() > reliability[vendor.pk]
+            delivery_date = issue_date + (-timedelta(hours=rng.uniform(1, 48)) if late else timedelta(days=rng.uniform(1, 14)))
+        rated = status == 'completed' and rng.random() < 0.85
+        items = context.items()
+        orders.append(PurchaseOrder(
+            uid=uid(),
+            vendor=vendor,
+            order_date=issue_date - timedelta(hours=rng.uniform(0, 48)),
+            issue_date=issue_date,
+            items=items,
+            quantity=sum(item['qty'] for item in items),
+            status=status,
+            acknowledgment_date=issue_date + timedelta(hours=rng.expovariate(1 / 36)) if acknowledged else None,
+            delivery_date=delivery_date,
+            quality_rating=round(min(5.0, max(1.0, rng.gauss(quality[vendor.pk], 0.7))), 1) if rated else None,
+        ))
+    context.orders = PurchaseOrder.objects.bulk_create(orders, batch_size=2000)
+    PurchaseOrderLine.replace(((order.pk, order.vendor_id, order.items) for order in orders), created=True)
+
+    deltas = PurchaseOrder.combined_performance_deltas((None, order.performance_state()) for order in orders)
+    Vendor.apply_performance_deltas(deltas)
+
+    metrics = list(Vendor.objects.filter(pk__in=[vendor.pk for vendor in vendors]).values('uid', *PERFORMANCE_METRIC_FIELDS))
+    for weeks_ago in range(12, 0, -1):
+        HistoricalPerformance.record([
+            {'vendor_id': row['uid'], **{field: max(0.0, row[field] * rng.uniform(0.9, 1.1)) for field in PERFORMANCE_METRIC_FIELDS}}
+            for row in metrics
+        ], date=now - timedelta(weeks=weeks_ago))
+    return context
+
+
+def _scenarios():
+    vendor_body = {'name': 'Benchmark vendor', 'address': '1 Bench Street', 'contact_details': 'bench@example.com'}
+
+    def vendor_path(suffix=''):
+        return lambda ctx: (f'/api/vendors/{ctx.vendor().pk}/{suffix}', None)
+
+    def order_path(prefix='/api/'):
+        return lambda ctx: (f'{prefix}purchase_orders/{ctx.order().pk}/', None)
+
+    def order_sku(ctx):
+        return ctx.order().items[0]['sku']
+
+    def update_order(ctx):
+        po = ctx.order()
+        return f'/api/purchase_orders/{po.pk}/', ctx.order_payload(vendor=po.vendor_id)
+
+    return [
+        # Vendors
+        Scenario('vendor_list', 'create_new_vendor & list_all_vendors', 'GET', lambda ctx: ('/api/vendors/', None)),
+        Scenario('vendor_create', 'create_new_vendor & list_all_vendors', 'POST', lambda ctx: ('/api/vendors/', vendor_body), 201),
+        Scenario('vendor_export', 'export_vendors', 'GET', lambda ctx: ('/api/vendors/export/', None)),
+        Scenario('vendor_leaderboard', 'vendor_leaderboard', 'GET', lambda ctx: ('/api/vendors/leaderboard/?total_pos_min=10', None)),
+        Scenario('vendor_search', 'search_vendors', 'GET', lambda ctx: (
+            f'/api/vendors/search/?q=vendor+{ctx.vendor().name.split()[-1][:2]}', None,
+        )),
+        Scenario('vendor_detail', "retrieve_update_and_delete_vendor's_details", 'GET', vendor_path()),
+        Scenario('vendor_update', "retrieve_update_and_delete_vendor's_details", 'PUT', lambda ctx: (
+            f'/api/vendors/{ctx.vendor().pk}/', {**vendor_body, 'address': f'{ctx.rng.randrange(1000)} Bench Street'},
+        )),
+        Scenario('vendor_delete', "retrieve_update_and_delete_vendor's_details", 'DELETE', lambda ctx: (
+            f'/api/vendors/{ctx.new_vendor().pk}/', None,
+        ), 204),
+        Scenario('vendor_performance', 'get_vendor_performance', 'GET', vendor_path('performance/')),
+        Scenario('vendor_performance_window', 'get_vendor_performance', 'GET', lambda ctx: (
+            f'/api/vendors/{ctx.vendor().pk}/performance/?window=90d', None,
+        )),
+        Scenario('vendor_performance_history', 'get_vendor_performance_history', 'GET', vendor_path('performance/history/?bucket=day')),
+
+        # Purchase orders
+        Scenario('po_list', 'create_new_order & list_all_purchase_orders', 'GET', lambda ctx: ('/api/purchase_orders/', None)),
+        Scenario('po_list_filtered', 'create_new_order & list_all_purchase_orders', 'GET', lambda ctx: (
+            f'/api/purchase_orders/?vendor={ctx.vendor().pk}&status=completed&sort=-issue_date', None,
+        )),
+        Scenario('po_create', 'create_new_order & list_all_purchase_orders', 'POST', lambda ctx: (
+            '/api/purchase_orders/', ctx.order_payload(),
+        ), 201),
+        Scenario('po_bulk_create', 'bulk_create_purchase_orders', 'POST', lambda ctx: (
+            '/api/purchase_orders/bulk/', [ctx.order_payload() for _ in range(50)],
+        ), 201),
+        Scenario('po_export', 'export_purchase_orders', 'GET', lambda ctx: (
+            f'/api/purchase_orders/export/?vendor={ctx.vendor().pk}', None,
+        )),
+        Scenario('po_lines', 'list_purchase_order_lines', 'GET', lambda ctx: (
+            f'/api/purchase_orders/lines/?sku={order_sku(ctx)}&status=pending', None,
+        )),
+        Scenario('po_line_summary', 'summarize_purchase_order_lines', 'GET', lambda ctx: (
+            f'/api/purchase_orders/lines/summary/?sku={order_sku(ctx)}&group_by=vendor', None,
+        )),
+        Scenario('po_detail', 'retrieve_update_and_delete_purchase_orders', 'GET', order_path()),
+        Scenario('po_update', 'retrieve_update_and_delete_purchase_orders', 'PUT', update_order),
+        Scenario('po_delete', 'retrieve_update_and_delete_purchase_orders', 'DELETE', lambda ctx: (
+            f'/api/purchase_orders/{ctx.new_order().pk}/', None,
+        ), 204),
+
+        # Purchase order transitions
+        Scenario('po_acknowledge', 'acknowledge_purchase_orders', 'POST', lambda ctx: (
+            f'/api/purchase_orders/{ctx.new_order().pk}/acknowledge/', None,
+        )),
+        Scenario('po_complete', 'complete_purchase_order', 'POST', lambda ctx: (
+            f'/api/purchase_orders/{ctx.new_order().pk}/complete/', None,
+        )),
+        Scenario('po_quality_rating', 'give_quality_rating_on_purchased_order', 'PATCH', lambda ctx: (
+            f"/api/purchase_orders/{ctx.new_order(status='completed').pk}/quality_rating/",
+            {'quality_rating': round(ctx.rng.uniform(1, 5), 1)},
+        )),
+        Scenario('po_transitions', 'batch_purchase_order_transitions', 'POST', lambda ctx: (
+            '/api/purchase_orders/transitions/',
+            [
+                {'po_id': str(po.pk), 'action': action}
+                for po in (ctx.new_order() for _ in range(10)) for action in ('acknowledge', 'complete')
+            ],
+        )),
+
+        # Async read API
+        Scenario('async_vendor_list', 'async_list_all_vendors', 'GET', lambda ctx: ('/api/async/vendors/', None)),
+        Scenario('async_vendor_detail', 'async_retrieve_vendor', 'GET', lambda ctx: (f'/api/async/vendors/{ctx.vendor().pk}/', None)),
+        Scenario('async_vendor_performance', 'async_get_vendor_performance', 'GET', lambda ctx: (
+            f'/api/async/vendors/{ctx.vendor().pk}/performance/', None,
+        )),
+        Scenario('async_po_list', 'async_list_all_purchase_orders', 'GET', lambda ctx: ('/api/async/purchase_orders/', None)),
+        Scenario('async_po_detail', 'async_retrieve_purchase_order', 'GET', order_path('/api/async/')),
+
+        # Internal monitoring
+        Scenario('cache_stats', 'cache_stats', 'GET', lambda ctx: ('/api/_cache/stats/', None)),
+        Scenario('metrics', 'metrics', 'GET', lambda ctx: ('/api/_metrics/', None)),
+    ]
+
+
+SCENARIOS = _scenarios()
+
+
+def uncovered_url_names():
+    """
+    Names of the API URL patterns no scenario requests.
+    """
+    covered = {scenario.url_name for scenario in SCENARIOS}
+    names = {
+        pattern.name for pattern in get_resolver().url_patterns
+        if isinstance(pattern, URLPattern) and str(pattern.pattern).startswith('api/')
+    }
+    return sorted(names - covered)
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds vendors and purchase orders with realistic distributions, sends requests to every API "
+        "endpoint through the in-process test client and reports their latency percentiles and "
+        "throughput. Everything runs in a transaction rolled back afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=200, help='Vendors to seed.')
+        parser.add_argument('--orders', type=int, default=20000, help='Purchase orders to seed.')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario before the timed ones.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, the same seed reproduces the same data and requests.')
+        parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of the purchase orders per vendor.')
+        parser.add_argument('--scenario', action='append', dest='scenarios', metavar='NAME', help='Only run this scenario, can be given several times.')
+        parser.add_argument('--cache', action='store_true', help='Keep the read cache on (off by default).')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Compare the results with those of an earlier --output file.')
+        parser.add_argument(
+            '--max-regression', type=float, metavar='PERCENT',
+            help='With --baseline, fail when the p95 latency of a scenario grew by more than this.',
+        )
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded rows instead of rolling them back.')
+
+    def handle(self, *args, **options):
+        if min(options['vendors'], options['orders'], options['requests']) < 1 or options['warmup'] < 0:
+            raise CommandError('--vendors, --orders and --requests must be positive integers, --warmup not negative')
+        scenarios = SCENARIOS
+        if options['scenarios']:
+            unknown = set(options['scenarios']).difference(scenario.name for scenario in SCENARIOS)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in SCENARIOS if scenario.name in options['scenarios']]
+        for name in uncovered_url_names():
+            self.stderr.write(f'No scenario for the URL pattern {name!r}')
+        baseline = self._load_baseline(options['baseline']) if options['baseline'] else None
+
+        overrides = {
+            'VMS_CACHE_ENABLED': options['cache'],
+            'VMS_METRICS_DEFERRED': False,
+            'VMS_READ_REPLICAS': [],
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+        }
+        try:
+            with override_settings(**overrides), transaction.atomic():
+                rng = random.Random(options['seed'])
+                start = time.perf_counter()
+                context = seed_data(rng, options['vendors'], options['orders'], options['skew'])
+                self.stdout.write(f"Seeded {options['vendors']} vendors and {options['orders']} purchase orders in {time.perf_counter() - start:.1f}s")
+                results = {scenario.name: self._run(scenario, context, options['requests'], options['warmup']) for scenario in scenarios}
+                if not options['keep']:
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'database': settings.DATABASES['default']['ENGINE'],
+                **{key: options[key] for key in ('vendors', 'orders', 'requests', 'warmup', 'seed', 'skew', 'cache')},
+            },
+            'scenarios': results,
+        }
+        self._print(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None and options['max_regression'] is not None:
+            regressed = [
+                name for name, result in results.items()
+                if self._p95_change(result, baseline.get(name)) is not None
+                and self._p95_change(result, baseline.get(name)) > options['max_regression']
+            ]
+            if regressed:
+                raise CommandError(f"p95 latency regressed by more than {options['max_regression']}%: {', '.join(regressed)}")
+
+    def _run(self, scenario, context, requests, warmup):
+        client = Client()
+        send = getattr(client, scenario.method.lower())
+        latencies, statuses = [], Counter()
+        for index in range(warmup + requests):
+            path, body = scenario.build(context)
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'} if body is not None else {}
+            start = time.perf_counter()
+            response = send(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+            if index >= warmup:
+                latencies.append(elapsed)
+                statuses[response.status_code] += 1
+
+        latencies.sort()
+        return {
+            'url_name': scenario.url_name,
+            'method': scenario.method,
+            'requests': requests,
+            'errors': requests - statuses[scenario.expected],
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+            'throughput': requests / sum(latencies),
+            'mean_ms': sum(latencies) / requests * 1000,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+        }
+
+    @staticmethod
+    def _load_baseline(path):
+        try:
+            with open(path) as baseline:
+                return json.load(baseline)['scenarios']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read the baseline {path}: {e}')
+
+    @staticmethod
+    def _p95_change(result, baseline):
+        if not baseline or not baseline.get('p95_ms'):
+            return None
+        return (result['p95_ms'] / baseline['p95_ms'] - 1) * 100
+
+    def _print(self, results, baseline):
+        header = f"{'scenario':<28}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+        self.stdout.write(header + ('   p95 vs baseline' if baseline is not None else ''))
+        for name, result in results.items():
+            line = (
+                f"{name:<28}{result['throughput']:>9.1f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['errors']:>8}"
+            )
+            if baseline is not None:
+                change = self._p95_change(result, baseline.get(name))
+                line += '   n/a' if change is None else f'   {change:+.1f}%'
+            self.stdout.write(line)
@@ -0,0 +1,152 @@
+import asyncio
+import statistics
+import time
+from datetime import timedelta
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.utils import timezone
+from ...models import Vendor, PurchaseOrder
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the sync read endpoints (/api/...) with the native async ones (/api/async/...) "
+        "under concurrency, through the ASGI application. The seeded rows are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=50, help='Vendors to seed.')
+        parser.add_argument('--orders', type=int, default=2000, help='Purchase orders to seed.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests sent per mode.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once.')
+        parser.add_argument(
+            '--query-delay', type=float, default=0.0,
+            help='Seconds added to every query, to stand for a slow or remote database.',
+        )
+        parser.add_argument('--cache', action='store_true', help='Keep the read cache on (off by default).')
+
+    def handle(self, *args, **options):
+        if min(options['vendors'], options['orders'], options['requests'], options['concurrency']) < 1:
+            raise CommandError('--vendors, --orders, --requests and --concurrency must be positive integers')
+        if options['query_delay'] < 0:
+            raise CommandError('--query-delay must not be negative')
+
+        vendors, orders = self._seed(options['vendors'], options['orders'])
+        delay = options['query_delay']
+
+        def slow_down(sender, connection, **kwargs):
+            connection.execute_wrappers.append(lambda execute, *args: (time.sleep(delay), execute(*args))[1])
+
+        if delay:
+            connection_created.connect(slow_down)
+        try:
+            paths = self._paths(vendors, orders)
+            with override_settings(VMS_CACHE_ENABLED=options['cache']):
+                application = get_asgi_application()
+                results = {
+                    mode: asyncio.run(self._run(application, prefix, paths, options['requests'], options['concurrency']))
+                    for mode, prefix in (('sync', '/api/'), ('async', '/api/async/'))
+                }
+        finally:
+            connection_created.disconnect(slow_down)
+            Vendor.objects.filter(pk__in=[vendor.pk for vendor in vendors]).delete()
+
+        for mode, (elapsed, latencies, failures) in results.items():
+            self.stdout.write(
+                f'{mode:<6} {len(latencies) / elapsed:8.1f} req/s   p50 {statistics.median(latencies) * 1000:7.1f} ms   '
+                f'p95 {self._percentile(latencies, 0.95) * 1000:7.1f} ms   errors {failures}'
+            )
+        sync_rate = options['requests'] / results['sync'][0]
+        async_rate = options['requests'] / results['async'][0]
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['requests']} requests at concurrency {options['concurrency']}, "
+            f'async throughput {async_rate / sync_rate:.2f}x the sync one'
+        ))
+
+    def _seed(self, vendor_count, order_count):
+        now = timezone.now()
+        vendors = Vendor.objects.bulk_create([
+            Vendor(name=f'Benchmark vendor {i}', address=f'{i} Street', contact_details=f'vendor{i}@example.com')
+            for i in range(vendor_count)
+        ])
+        orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                vendor=vendors[i % vendor_count],
+                items=[{'sku': f'SKU-{i % 97}', 'qty': i % 7 + 1, 'price': 9.5}],
+                quantity=i % 7 + 1,
+                issue_date=now - timedelta(days=2),
+            )
+            for i in range(order_count)
+        ], batch_size=2000)
+        return vendors, orders
+
+    @staticmethod
+    def _paths(vendors, orders):
+        """
+        One path of every read endpoint per vendor, cycled through by the requests.
+        """
+        paths = []
+        for index, vendor in enumerate(vendors):
+            paths += [
+                'vendors/',
+                f'vendors/{vendor.pk}/',
+                f'vendors/{vendor.pk}/performance/',
+                f'purchase_orders/?vendor={vendor.pk}',
+                f'purchase_orders/{orders[index % len(orders)].pk}/',
+            ]
+        return paths
+
+    async def _run(self, application, prefix, paths, requests, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, failures = [], 0
+
+        async def request(path):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                status_code = await self._get(application, prefix + path)
+                latencies.append(time.perf_counter() - start)
+                failures += status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request(paths[i % len(paths)]) for i in range(requests)))
+        return time.perf_counter() - start, latencies, failures
+
+    @staticmethod
+    async def _get(application, url):
+        """
+        Sends a GET through the ASGI application like a server would, returns the status code.
+        """
+        path, _, query = url.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        received, disconnect = False, asyncio.Event()
+        status_code = None
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The handler listens for a disconnect until the response is sent.
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+        await application(scope, receive, send)
+        return status_code
+
+    @staticmethod
+    def _percentile(values, fraction):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * fraction))]
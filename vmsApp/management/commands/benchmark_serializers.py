@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from ...models import Vendor, PurchaseOrder
+from ...serializers import PurchaseOrderSerializer, FastPurchaseOrderSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares PurchaseOrderSerializer with the values() based FastPurchaseOrderSerializer on "
+        "seeded rows. The rows are inserted in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Purchase orders to seed.')
+        parser.add_argument('--vendors', type=int, default=100, help='Vendors the purchase orders are spread over.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per serializer, the best one is kept.')
+
+    def handle(self, *args, **options):
+        if min(options['rows'], options['vendors'], options['repeat']) < 1:
+            raise CommandError('--rows, --vendors and --repeat must be positive integers')
+        try:
+            with transaction.atomic():
+                self._seed(options['rows'], options['vendors'])
+                self._run(options['rows'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, rows, vendors):
+        now = timezone.now()
+        vendors = Vendor.objects.bulk_create([
+            Vendor(name=f'Vendor {i}', address=f'{i} Street', contact_details=f'vendor{i}@example.com')
+            for i in range(vendors)
+        ])
+        orders = []
+        for i in range(rows):
+            completed = i % 3 == 0
+            orders.append(PurchaseOrder(
+                vendor=vendors[i % len(vendors)],
+                items=[{'sku': f'SKU-{i % 97}', 'qty': i % 7 + 1, 'price': 9.5}],
+                quantity=i % 7 + 1,
+                status='completed' if completed else 'pending',
+                quality_rating=(i % 5) + 0.5 if completed else None,
+                issue_date=now - timedelta(days=2),
+                acknowledgment_date=now - timedelta(days=1) if i % 2 else None,
+                delivery_date=now if completed else None,
+            ))
+        PurchaseOrder.objects.bulk_create(orders, batch_size=2000)
+
+    def _run(self, rows, repeat):
+        queryset = PurchaseOrder.objects.order_by('created_at', 'uid')
+        renderer = JSONRenderer()
+        model_data, model_time = self._time(lambda: PurchaseOrderSerializer(queryset, many=True).data, repeat)
+        fast_data, fast_time = self._time(
+            lambda: FastPurchaseOrderSerializer.serialize(FastPurchaseOrderSerializer.values(queryset)), repeat
+        )
+        model_output, render_time = self._time(lambda: renderer.render(model_data), repeat)
+        if renderer.render(fast_data) != model_output:
+            raise CommandError('FastPurchaseOrderSerializer output differs from PurchaseOrderSerializer')
+
+        self.stdout.write(f'PurchaseOrderSerializer:     {model_time:.3f}s ({rows / model_time:,.0f} rows/s)')
+        self.stdout.write(f'FastPurchaseOrderSerializer: {fast_time:.3f}s ({rows / fast_time:,.0f} rows/s)')
+        self.stdout.write(f'JSON rendering (both):       {render_time:.3f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} rows, identical output, serialization {model_time / fast_time:.1f}x faster, '
+            f'end to end {(model_time + render_time) / (fast_time + render_time):.1f}x faster'
+        ))
+
+    @staticmethod
+    def _time(func, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
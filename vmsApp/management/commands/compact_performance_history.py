@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ...constants.appConstants import HISTORY_RAW_RETENTION_DAYS, HISTORY_HOURLY_RETENTION_DAYS, HISTORY_DAILY_RETENTION_DAYS
+from ...services.vendorServices import VendorService
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes raw performance snapshots and hourly/daily rollups past their retention. "
+        "Snapshots are summarized into the rollups when recorded, so the remaining coarser "
+        "buckets still cover the deleted range. Also expires the rolling window buckets "
+        "older than the longest window."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--raw-days', type=int, default=getattr(settings, 'VMS_HISTORY_RAW_RETENTION_DAYS', HISTORY_RAW_RETENTION_DAYS),
+            help='Days of raw snapshots to keep.',
+        )
+        parser.add_argument(
+            '--hourly-days', type=int,
+            default=getattr(settings, 'VMS_HISTORY_HOURLY_RETENTION_DAYS', HISTORY_HOURLY_RETENTION_DAYS),
+            help='Days of hourly rollups to keep.',
+        )
+        parser.add_argument(
+            '--daily-days', type=int,
+            default=getattr(settings, 'VMS_HISTORY_DAILY_RETENTION_DAYS', HISTORY_DAILY_RETENTION_DAYS),
+            help='Days of daily rollups to keep, all of them when not set.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting it.')
+
+    def handle(self, *args, **options):
+        retention = {name: options[f'{name}_days'] for name in ('raw', 'hourly', 'daily')}
+        if any(days is not None and days < 0 for days in retention.values()):
+            raise CommandError('retention days must not be negative')
+
+        report = VendorService().compact_performance_history(
+            raw_days=retention['raw'],
+            hourly_days=retention['hourly'],
+            daily_days=retention['daily'],
+            dry_run=options['dry_run'],
+        )
+
+        action = 'would be deleted' if options['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['raw']} snapshots, {report['hour']} hourly and {report['day']} daily rollups, "
+            f"{report['window']} window buckets {action}"
+        ))
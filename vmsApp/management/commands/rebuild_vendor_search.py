@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from ...repository.vendorSearchRepo import VendorSearchRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the full-text vendor search index from the vendor table and optimizes it. "
+        "The index is kept in sync by triggers, run this after loading vendors with the triggers "
+        "bypassed or if the index ever drifts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database whose index to rebuild.')
+
+    def handle(self, *args, **options):
+        repo = VendorSearchRepository()
+        using = options['database']
+        if not repo.fts_available(using):
+            raise CommandError(
+                f'No vendor search index on database "{using}": it needs SQLite with FTS5, '
+                'other backends search with the fallback filters.'
+            )
+        with transaction.atomic(using=using):
+            count = repo.rebuild(using)
+        self.stdout.write(self.style.SUCCESS(f'{count} vendors indexed'))
@@ -0,0 +1,51 @@
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from ...services.vendorServices import VendorService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes on_time_delivery_rate, quality_rating_avg, average_response_time and "
+        "fulfillment_rate for all vendors from grouped aggregate queries, one transaction per "
+        "batch of locked vendors, and repairs the rolling window buckets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vendor', action='append', dest='vendors', metavar='VENDOR_ID',
+            help='Only recompute this vendor, can be given several times.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Vendors locked and recomputed per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the differences without writing them.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        vendor_ids = None
+        if options['vendors'] is not None:
+            try:
+                vendor_ids = [uuid.UUID(vendor_id) for vendor_id in options['vendors']]
+            except ValueError:
+                raise CommandError(f"--vendor must be a vendor UUID, got {', '.join(options['vendors'])}")
+
+        report = VendorService().recompute_all_performance_metrics(
+            vendor_ids=vendor_ids,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run'] or options['verbosity'] > 1:
+            for diff in report['diffs']:
+                self.stdout.write(f"vendor {diff['vendor']}:")
+                for field, (stored, expected) in diff['changes'].items():
+                    self.stdout.write(f"    {field}: {stored} -> {expected}")
+            for (vendor_id, day), changes in sorted(report['buckets'].items(), key=lambda bucket: (str(bucket[0][0]), bucket[0][1])):
+                self.stdout.write(f"vendor {vendor_id} on {day}:")
+                for field, (stored, expected) in changes.items():
+                    self.stdout.write(f"    {field}: {stored} -> {expected}")
+
+        action = 'would be updated' if options['dry_run'] else 'updated'
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['scanned']} vendors scanned, {report['changed']} {action}, "
+            f"{len(report['buckets'])} daily buckets {action}"
+        ))
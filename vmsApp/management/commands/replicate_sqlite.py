@@ -0,0 +1,59 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from ...dbRouter import read_replicas
+
+
+def _database_path(alias):
+    # Replicas are opened read-only through a `file:<path>?mode=ro` URI.
+    name = str(settings.DATABASES[alias]['NAME'])
+    if name.startswith('file:'):
+        name = name[len('file:'):].split('?', 1)[0]
+    return name
+
+
+class Command(BaseCommand):
+    help = (
+        "Replication stand-in for local SQLite replicas: copies a consistent snapshot of the "
+        "primary database into every VMS_READ_REPLICAS file with the SQLite backup API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Keep replicating every INTERVAL seconds instead of copying once.',
+        )
+
+    def handle(self, *args, **options):
+        replicas = read_replicas()
+        if not replicas:
+            raise CommandError('No read replica configured, set VMS_SQLITE_REPLICAS')
+        if settings.DATABASES[DEFAULT_DB_ALIAS]['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('replicate_sqlite only copies SQLite databases')
+        if options['interval'] is not None and options['interval'] <= 0:
+            raise CommandError('--interval must be positive')
+
+        self.verbosity = options['verbosity']
+        while True:
+            started = time.monotonic()
+            self.replicate(replicas)
+            if options['interval'] is None:
+                self.stdout.write(self.style.SUCCESS(f"{len(replicas)} replicas synced with {DEFAULT_DB_ALIAS}"))
+                break
+            time.sleep(max(0.0, options['interval'] - (time.monotonic() - started)))
+
+    def replicate(self, replicas):
+        source = sqlite3.connect(_database_path(DEFAULT_DB_ALIAS))
+        try:
+            for alias in replicas:
+                target = sqlite3.connect(_database_path(alias))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                if self.verbosity > 1:
+                    self.stdout.write(f'{DEFAULT_DB_ALIAS} -> {alias}')
+        finally:
+            source.close()
@@ -0,0 +1,138 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from ...models import Vendor, PurchaseOrder
+from ...services.commonServices import CommonService
+from ...services.purchaseOrderServices import PurhaseOrderService
+from ...writeCoordinator import get_write_coordinator
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs concurrent purchase order writes (create, acknowledge, complete) from many threads, "
+        "directly and through the write coordinator, and compares their throughput and errors. "
+        "The seeded rows are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=20, help='Vendors to seed.')
+        parser.add_argument('--threads', type=int, default=32, help='Threads writing at once.')
+        parser.add_argument('--operations', type=int, default=50, help='Writes per thread and mode.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the operation mix.')
+
+    def handle(self, *args, **options):
+        if min(options['vendors'], options['threads'], options['operations']) < 1:
+            raise CommandError('--vendors, --threads and --operations must be positive integers')
+
+        vendors = Vendor.objects.bulk_create([
+            Vendor(name=f'Stress vendor {i}', address=f'{i} Street', contact_details=f'vendor{i}@example.com')
+            for i in range(options['vendors'])
+        ])
+        try:
+            results = {}
+            for mode, coordinated in (('direct', False), ('coordinated', True)):
+                plan = self._plan(vendors, options['threads'], options['operations'], random.Random(options['seed']))
+                with override_settings(VMS_WRITE_COORDINATOR=coordinated):
+                    coordinator = get_write_coordinator()
+                    batches, operations = coordinator.batches, coordinator.operations
+                    results[mode] = self._run(plan)
+                    coordinator.stop()
+                if coordinated:
+                    batches, operations = coordinator.batches - batches, coordinator.operations - operations
+                    self.stdout.write(f'writer committed {operations} operations in {batches} transactions')
+        finally:
+            Vendor.objects.filter(pk__in=[vendor.pk for vendor in vendors]).delete()
+
+        throughput = {
+            mode: (len(latencies) - sum(errors.values())) / elapsed for mode, (elapsed, latencies, errors) in results.items()
+        }
+        for mode, (elapsed, latencies, errors) in results.items():
+            self.stdout.write(
+                f'{mode:<12} {throughput[mode]:8.1f} writes/s   p50 {statistics.median(latencies) * 1000:7.1f} ms   '
+                f'p95 {self._percentile(latencies, 0.95) * 1000:7.1f} ms   errors {sum(errors.values())}'
+            )
+            for error, count in errors.most_common():
+                self.stdout.write(f'    {count:6} x {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['threads']} threads x {options['operations']} writes, coordinated throughput of "
+            f"successful writes {throughput['coordinated'] / max(throughput['direct'], 1e-9):.2f}x the direct one"
+        ))
+
+    @staticmethod
+    def _plan(vendors, threads, operations, rng):
+        """
+        Seeds one pending purchase order per planned transition and returns the operations
+        of every thread: creates, acknowledgements and completions in random order.
+        """
+        actions = [rng.choice(('create', 'acknowledge', 'complete')) for _ in range(threads * operations)]
+        now = timezone.now()
+        orders = iter(PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                vendor=rng.choice(vendors),
+                items=[{'sku': 'SKU-1', 'qty': 1, 'price': 9.5}],
+                quantity=1,
+                issue_date=now - timedelta(days=2),
+                delivery_date=now + timedelta(days=rng.choice((-1, 1))),
+            )
+            for action in actions if action != 'create'
+        ]))
+        plan = []
+        for action in actions:
+            if action == 'create':
+                plan.append((action, {
+                    'vendor': str(rng.choice(vendors).pk),
+                    'items': [{'sku': 'SKU-1', 'qty': 1, 'price': 9.5}],
+                    'quantity': 1,
+                    'issue_date': (now - timedelta(days=1)).isoformat(),
+                }))
+            else:
+                plan.append((action, next(orders).pk))
+        return [plan[index::threads] for index in range(threads)]
+
+    def _run(self, plan):
+        latencies, errors = [], Counter()
+        lock = threading.Lock()
+        start_line = threading.Barrier(len(plan) + 1)
+
+        def write(operations):
+            common_service, po_service = CommonService(), PurhaseOrderService()
+            start_line.wait()
+            try:
+                for action, argument in operations:
+                    started = time.perf_counter()
+                    error = None
+                    try:
+                        if action == 'create':
+                            if po_service.create_order(argument) is None:
+                                error = 'create_order failed'
+                        else:
+                            common_service.transition(argument, action)
+                    except Exception as e:
+                        error = f'{type(e).__name__}: {e}'
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                        if error is not None:
+                            errors[error] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=write, args=(operations,)) for operations in plan]
+        for thread in threads:
+            thread.start()
+        start_line.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, errors
+
+    @staticmethod
+    def _percentile(values, fraction):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * fraction))]
@@ -0,0 +1,273 @@
+"""
+Deferred vendor performance recalculation.
+
+When `VMS_METRICS_DEFERRED` is enabled, purchase order changes do not update the
+vendor aggregates in the request. They mark the vendor dirty instead, and an
+in-process thread pool applies the accumulated change once the vendor has been
+quiet for `VMS_METRICS_DEBOUNCE_SECONDS`, or at the latest
+`VMS_METRICS_MAX_STALENESS_SECONDS` after it was first marked. A burst of writes
+on one vendor therefore collapses into a single recompute. A recompute that fails
+(e.g. "database is locked") is logged and put back, merged with the changes marked
+since, and retried with an exponential backoff starting at
+`VMS_METRICS_RETRY_BACKOFF_SECONDS`. With `VMS_WRITE_COORDINATOR` the updates are
+committed by the writer thread too.
+"""
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from .constants.appConstants import PERFORMANCE_METRIC_FIELDS, PERFORMANCE_AGGREGATE_FIELDS
+from .writeCoordinator import coordinated_write
+
+logger = logging.getLogger(__name__)
+
+
+def empty_performance_delta():
+    """
+    A vendor performance delta: the change of every running aggregate, plus the same
+    change per UTC issue day under `days` for the rolling window buckets.
+    """
+    delta = dict.fromkeys(PERFORMANCE_AGGREGATE_FIELDS, 0)
+    delta['days'] = {}
+    return delta
+
+
+def merge_performance_delta(target, delta):
+    """
+    Adds `delta` into `target` in place.
+    """
+    for field in PERFORMANCE_AGGREGATE_FIELDS:
+        target[field] += delta.get(field, 0)
+    for day, day_delta in delta.get('days', {}).items():
+        target_day = target['days'].setdefault(day, dict.fromkeys(PERFORMANCE_AGGREGATE_FIELDS, 0))
+        for field, value in day_delta.items():
+            target_day[field] += value
+    return target
+
+
+class _DirtyVendor:
+    __slots__ = ('delta', 'snapshot', 'first_marked', 'last_marked', 'failures', 'retry_at')
+
+    def __init__(self, now):
+        self.delta = empty_performance_delta()
+        self.snapshot = False
+        self.first_marked = now
+        self.last_marked = now
+        self.failures = 0
+        self.retry_at = None
+
+    def due_at(self, debounce, max_staleness):
+        due_at = min(self.last_marked + debounce, self.first_marked + max_staleness)
+        return due_at if self.retry_at is None else max(due_at, self.retry_at)
+
+
+class VendorMetricsWorker:
+    """
+    Coalesces vendor metric recalculations and runs them on a thread pool.
+    """
+
+    def __init__(self, debounce=0.5, max_staleness=5.0, workers=2, retry_backoff=1.0, max_retry_backoff=60.0):
+        self.debounce = debounce
+        self.max_staleness = max(max_staleness, debounce)
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max(max_retry_backoff, retry_backoff)
+        self._condition = threading.Condition()
+        self._dirty = {}
+        self._futures = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vendor-metrics')
+        self._scheduler = None
+
+    def mark_dirty(self, vendor_id, delta=None, snapshot=False):
+        """
+        Schedules a recalculation of `vendor_id`, adding `delta` to the aggregate change
+        already pending for it. `snapshot` requests a HistoricalPerformance row afterwards.
+        """
+        now = time.monotonic()
+        with self._condition:
+            entry = self._dirty.get(vendor_id)
+            if entry is None:
+                entry = self._dirty[vendor_id] = _DirtyVendor(now)
+            if delta:
+                merge_performance_delta(entry.delta, delta)
+            entry.snapshot = entry.snapshot or snapshot
+            entry.last_marked = now
+            self._start_scheduler()
+            self._condition.notify()
+
+    def flush(self):
+        """
+        Applies every pending recalculation in the calling thread and waits for the
+        ones already running. Mostly useful in tests.
+
+        A failed recalculation is put back for a retry and the others still run, the
+        first error is raised once they all did.
+        """
+        with self._condition:
+            dirty, self._dirty = self._dirty, {}
+            running = list(self._futures)
+        error = None
+        for vendor_id, entry in dirty.items():
+            try:
+                self._apply(vendor_id, entry)
+            except Exception as e:
+                self._retry_later(vendor_id, entry, e)
+                error = error or e
+        wait(running)
+        if error is not None:
+            raise error
+
+    def pending(self):
+        with self._condition:
+            return len(self._dirty)
+
+    def _start_scheduler(self):
+        if self._scheduler is None or not self._scheduler.is_alive():
+            self._scheduler = threading.Thread(target=self._schedule, name='vendor-metrics-scheduler', daemon=True)
+            self._scheduler.start()
+
+    def _schedule(self):
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                due, next_due = [], None
+                for vendor_id, entry in self._dirty.items():
+                    due_at = entry.due_at(self.debounce, self.max_staleness)
+                    if due_at <= now:
+                        due.append(vendor_id)
+                    elif next_due is None or due_at < next_due:
+                        next_due = due_at
+                if not due:
+                    self._condition.wait(None if next_due is None else next_due - now)
+                    continue
+                for vendor_id in due:
+                    future = self._executor.submit(self._run, vendor_id, self._dirty.pop(vendor_id))
+                    self._futures.add(future)
+                    future.add_done_callback(self._futures.discard)
+
+    def _run(self, vendor_id, entry):
+        try:
+            self._apply(vendor_id, entry)
+        except Exception as e:
+            # Nobody waits on the future, the change must not be lost silently.
+            self._retry_later(vendor_id, entry, e)
+        finally:
+            # Worker threads own their database connections, do not leak them.
+            connections.close_all()
+
+    def _retry_later(self, vendor_id, entry, error):
+        """
+        Puts back a recalculation that failed, merged with the changes marked for the
+        vendor in the meantime, to be retried after an exponential backoff.
+        """
+        now = time.monotonic()
+        with self._condition:
+            pending = self._dirty.get(vendor_id)
+            if pending is not None:
+                merge_performance_delta(entry.delta, pending.delta)
+                entry.snapshot = entry.snapshot or pending.snapshot
+                entry.last_marked = pending.last_marked
+            entry.failures += 1
+            backoff = min(self.retry_backoff * 2 ** (entry.failures - 1), self.max_retry_backoff)
+            entry.retry_at = now + backoff
+            self._dirty[vendor_id] = entry
+            self._start_scheduler()
+            self._condition.notify()
+        logger.error(
+            'Recalculating the metrics of vendor %s failed (attempt %d), retrying in %.1fs: %s',
+            vendor_id, entry.failures, backoff, error, exc_info=error,
+        )
+
+    @coordinated_write
+    def _apply(self, vendor_id, entry):
+        from .models import Vendor
+
+        with transaction.atomic():
+            Vendor.apply_performance_delta(vendor_id, entry.delta)
+            if entry.snapshot:
+                vendor = Vendor.objects.filter(pk=vendor_id).first()
+                if vendor is not None:
+                    vendor.save_performance_history()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def metrics_deferred():
+    return getattr(settings, 'VMS_METRICS_DEFERRED', False)
+
+
+def get_metrics_worker():
+    """
+    Returns the process wide VendorMetricsWorker, created from settings on first use.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = VendorMetricsWorker(
+                debounce=getattr(settings, 'VMS_METRICS_DEBOUNCE_SECONDS', 0.5),
+                max_staleness=getattr(settings, 'VMS_METRICS_MAX_STALENESS_SECONDS', 5.0),
+                workers=getattr(settings, 'VMS_METRICS_WORKERS', 2),
+                retry_backoff=getattr(settings, 'VMS_METRICS_RETRY_BACKOFF_SECONDS', 1.0),
+                max_retry_backoff=getattr(settings, 'VMS_METRICS_MAX_RETRY_BACKOFF_SECONDS', 60.0),
+            )
+            atexit.register(_worker.flush)
+        return _worker
+
+
+def submit_performance_delta(vendor_id, delta):
+    """
+    Applies an aggregate delta to a vendor now, or hands it to the worker once the
+    surrounding transaction commits when deferred mode is enabled.
+    """
+    if not metrics_deferred():
+        from .models import Vendor
+        return Vendor.apply_performance_delta(vendor_id, delta)
+    transaction.on_commit(lambda: get_metrics_worker().mark_dirty(vendor_id, delta))
+
+
+def submit_performance_deltas(deltas):
+    """
+    Same as `submit_performance_delta()` for `{vendor_id: delta}`, applied together
+    with a fixed number of statements.
+    """
+    if not metrics_deferred():
+        from .models import Vendor
+        return Vendor.apply_performance_deltas(deltas)
+    for vendor_id, delta in deltas.items():
+        transaction.on_commit(lambda vendor_id=vendor_id, delta=delta: get_metrics_worker().mark_dirty(vendor_id, delta))
+
+
+def refresh_vendor_performance(vendor, snapshot=False):
+    """
+    Brings `vendor`'s metrics up to date after its purchase orders changed and
+    optionally records a HistoricalPerformance snapshot.
+    """
+    if metrics_deferred():
+        transaction.on_commit(lambda: get_metrics_worker().mark_dirty(vendor.pk, snapshot=snapshot))
+        return
+    # The purchase order save already applied its delta, only reload the result.
+    vendor.refresh_from_db(fields=PERFORMANCE_METRIC_FIELDS)
+    if snapshot:
+        vendor.save_performance_history()
+
+
+def record_performance_snapshots(vendor_ids):
+    """
+    Writes one HistoricalPerformance row per vendor with its current metrics and folds
+    them into the rollups, with a fixed number of queries. Deferred mode attaches the
+    snapshots to the pending recompute.
+    """
+    if metrics_deferred():
+        for vendor_id in vendor_ids:
+            transaction.on_commit(lambda vendor_id=vendor_id: get_metrics_worker().mark_dirty(vendor_id, snapshot=True))
+        return
+    from .models import Vendor, HistoricalPerformance
+
+    rows = Vendor.objects.filter(pk__in=vendor_ids).values(*PERFORMANCE_METRIC_FIELDS, vendor_id=F('pk'))
+    HistoricalPerformance.record(rows)
+
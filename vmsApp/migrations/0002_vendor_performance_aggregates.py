@@ -0,0 +1,77 @@
+# Generated by Django 5.0.4 on 2024-05-02 10:12
+
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, Q, Sum
+
+
+def backfill_performance_aggregates(apps, schema_editor):
+    Vendor = apps.get_model('vmsApp', 'Vendor')
+    PurchaseOrder = apps.get_model('vmsApp', 'PurchaseOrder')
+    rows = PurchaseOrder.objects.values('vendor').annotate(
+        total=Count('pk'),
+        completed=Count('pk', filter=Q(status='completed')),
+        on_time=Count('pk', filter=Q(status='completed', delivery_date__gte=F('issue_date'))),
+        quality_sum=Sum('quality_rating'),
+        quality_count=Count('quality_rating'),
+        response_sum=Sum(
+            ExpressionWrapper(F('acknowledgment_date') - F('issue_date'), output_field=models.DurationField()),
+            filter=Q(acknowledgment_date__isnull=False),
+        ),
+        response_count=Count('acknowledgment_date'),
+    )
+    for row in rows:
+        Vendor.objects.filter(pk=row['vendor']).update(
+            total_pos=row['total'],
+            completed_pos=row['completed'],
+            on_time_pos=row['on_time'],
+            quality_rating_sum=row['quality_sum'] or 0.0,
+            quality_rating_count=row['quality_count'],
+            response_time_sum=row['response_sum'].total_seconds() / 86400 if row['response_sum'] else 0.0,
+            response_time_count=row['response_count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='completed_pos',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='on_time_pos',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='quality_rating_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='quality_rating_sum',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='response_time_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='response_time_sum',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='total_pos',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_performance_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.4 on 2024-05-03 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0002_vendor_performance_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['created_at', 'uid'], name='po_created_uid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['created_at', 'uid'], name='vendor_created_uid_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.0.4 on 2024-05-04 11:37
+
+import django.db.models.deletion
+import uuid
+from datetime import timezone
+from django.db import migrations, models
+
+METRICS = ('on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
+
+
+def period_start(date, bucket):
+    date = date.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if bucket in ('day', 'month'):
+        date = date.replace(hour=0)
+    if bucket == 'month':
+        date = date.replace(day=1)
+    return date
+
+
+def backfill_performance_rollups(apps, schema_editor):
+    HistoricalPerformance = apps.get_model('vmsApp', 'HistoricalPerformance')
+    PerformanceRollup = apps.get_model('vmsApp', 'PerformanceRollup')
+    rollups = {}
+    for row in HistoricalPerformance.objects.values('vendor_id', 'date', *METRICS).iterator(chunk_size=2000):
+        for bucket in ('hour', 'day', 'month'):
+            key = (row['vendor_id'], bucket, period_start(row['date'], bucket))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = PerformanceRollup(
+                    vendor_id=key[0], bucket=bucket, period_start=key[2], samples=0,
+                    **{f'{metric}_sum': 0.0 for metric in METRICS},
+                )
+            rollup.samples += 1
+            for metric in METRICS:
+                value = row[metric]
+                setattr(rollup, f'{metric}_sum', getattr(rollup, f'{metric}_sum') + value)
+                low, high = getattr(rollup, f'{metric}_min'), getattr(rollup, f'{metric}_max')
+                setattr(rollup, f'{metric}_min', value if low is None else min(low, value))
+                setattr(rollup, f'{metric}_max', value if high is None else max(high, value))
+    PerformanceRollup.objects.bulk_create(rollups.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0004_purchase_order_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceRollup',
+            fields=[
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bucket', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateTimeField()),
+                ('samples', models.IntegerField(default=0)),
+                ('on_time_delivery_rate_sum', models.FloatField(default=0.0)),
+                ('on_time_delivery_rate_min', models.FloatField(null=True)),
+                ('on_time_delivery_rate_max', models.FloatField(null=True)),
+                ('quality_rating_avg_sum', models.FloatField(default=0.0)),
+                ('quality_rating_avg_min', models.FloatField(null=True)),
+                ('quality_rating_avg_max', models.FloatField(null=True)),
+                ('average_response_time_sum', models.FloatField(default=0.0)),
+                ('average_response_time_min', models.FloatField(null=True)),
+                ('average_response_time_max', models.FloatField(null=True)),
+                ('fulfillment_rate_sum', models.FloatField(default=0.0)),
+                ('fulfillment_rate_min', models.FloatField(null=True)),
+                ('fulfillment_rate_max', models.FloatField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='historicalperformance',
+            index=models.Index(fields=['vendor', 'date'], name='history_vendor_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='performancerollup',
+            name='vendor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_rollups', to='vmsApp.vendor'),
+        ),
+        migrations.AddConstraint(
+            model_name='performancerollup',
+            constraint=models.UniqueConstraint(fields=('vendor', 'bucket', 'period_start'), name='rollup_vendor_bucket_period_uniq'),
+        ),
+        migrations.RunPython(backfill_performance_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.4 on 2024-05-05 09:48
+
+import django.db.models.deletion
+import uuid
+from datetime import timedelta, timezone
+from django.db import migrations, models
+from django.utils import timezone as django_timezone
+
+FIELDS = (
+    'total_pos', 'completed_pos', 'on_time_pos', 'quality_rating_sum', 'quality_rating_count',
+    'response_time_sum', 'response_time_count',
+)
+
+
+def backfill_daily_performance(apps, schema_editor):
+    # Only the longest rolling window (365 days) is ever read.
+    PurchaseOrder = apps.get_model('vmsApp', 'PurchaseOrder')
+    VendorDailyPerformance = apps.get_model('vmsApp', 'VendorDailyPerformance')
+    oldest = django_timezone.now().astimezone(timezone.utc).date() - timedelta(days=364)
+    buckets = {}
+    rows = PurchaseOrder.objects.filter(issue_date__date__gte=oldest).values(
+        'vendor_id', 'status', 'issue_date', 'delivery_date', 'quality_rating', 'acknowledgment_date',
+    )
+    for row in rows.iterator(chunk_size=2000):
+        key = (row['vendor_id'], row['issue_date'].astimezone(timezone.utc).date())
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = VendorDailyPerformance(
+                vendor_id=key[0], day=key[1], **dict.fromkeys(FIELDS, 0),
+            )
+        completed = row['status'] == 'completed'
+        bucket.total_pos += 1
+        bucket.completed_pos += int(completed)
+        bucket.on_time_pos += int(
+            completed and row['delivery_date'] is not None and row['delivery_date'] >= row['issue_date']
+        )
+        if row['quality_rating'] is not None:
+            bucket.quality_rating_sum += row['quality_rating']
+            bucket.quality_rating_count += 1
+        if row['acknowledgment_date'] is not None:
+            bucket.response_time_sum += (row['acknowledgment_date'] - row['issue_date']).total_seconds() / 86400
+            bucket.response_time_count += 1
+    VendorDailyPerformance.objects.bulk_create(buckets.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0005_performance_history_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyPerformance',
+            fields=[
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('total_pos', models.IntegerField(default=0)),
+                ('completed_pos', models.IntegerField(default=0)),
+                ('on_time_pos', models.IntegerField(default=0)),
+                ('quality_rating_sum', models.FloatField(default=0.0)),
+                ('quality_rating_count', models.IntegerField(default=0)),
+                ('response_time_sum', models.FloatField(default=0.0)),
+                ('response_time_count', models.IntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_performance', to='vmsApp.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailyperformance',
+            constraint=models.UniqueConstraint(fields=('vendor', 'day'), name='daily_performance_vendor_day_uniq'),
+        ),
+        migrations.RunPython(backfill_daily_performance, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2024-05-05 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0006_vendor_daily_performance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['on_time_delivery_rate', 'uid'], name='vendor_on_time_uid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['quality_rating_avg', 'uid'], name='vendor_quality_uid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['average_response_time', 'uid'], name='vendor_response_uid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['fulfillment_rate', 'uid'], name='vendor_fulfillment_uid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['total_pos', 'uid'], name='vendor_total_pos_uid_idx'),
+        ),
+    ]
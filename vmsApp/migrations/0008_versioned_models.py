@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2024-05-05 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0007_vendor_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2024-05-05 18:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0008_versioned_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrderLine',
+            fields=[
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('position', models.PositiveIntegerField()),
+                ('sku', models.CharField(max_length=100)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('quantity', models.IntegerField(default=0)),
+                ('unit_price', models.FloatField(blank=True, null=True)),
+                ('purchase_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='vmsApp.purchaseorder')),
+                ('vendor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='order_lines', to='vmsApp.vendor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sku'], name='po_line_sku_idx'), models.Index(fields=['vendor', 'sku'], name='po_line_vendor_sku_idx')],
+            },
+        ),
+    ]
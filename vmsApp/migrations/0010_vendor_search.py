@@ -0,0 +1,77 @@
+# Hand-written migration: the FTS5 table and its triggers are SQLite specific raw SQL.
+
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+# FTS5 index of the vendors' name, address and contact details. The vendor uid is stored,
+# not indexed, so the update and delete triggers scan the index rows. Migration 0011
+# replaces it with an index keyed by rowid.
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE "vmsApp_vendor_search" USING fts5(
+        uid UNINDEXED, name, address, contact_details,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO "vmsApp_vendor_search" (uid, name, address, contact_details)
+    SELECT uid, name, address, contact_details FROM "vmsApp_vendor"
+    """,
+    """
+    CREATE TRIGGER "vmsApp_vendor_search_insert" AFTER INSERT ON "vmsApp_vendor" BEGIN
+        INSERT INTO "vmsApp_vendor_search" (uid, name, address, contact_details)
+        VALUES (new.uid, new.name, new.address, new.contact_details);
+    END
+    """,
+    """
+    CREATE TRIGGER "vmsApp_vendor_search_update" AFTER UPDATE OF name, address, contact_details ON "vmsApp_vendor"
+    WHEN old.name IS NOT new.name OR old.address IS NOT new.address OR old.contact_details IS NOT new.contact_details
+    BEGIN
+        UPDATE "vmsApp_vendor_search" SET name = new.name, address = new.address, contact_details = new.contact_details
+        WHERE uid = old.uid;
+    END
+    """,
+    """
+    CREATE TRIGGER "vmsApp_vendor_search_delete" AFTER DELETE ON "vmsApp_vendor" BEGIN
+        DELETE FROM "vmsApp_vendor_search" WHERE uid = old.uid;
+    END
+    """,
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS "vmsApp_vendor_search_insert"',
+    'DROP TRIGGER IF EXISTS "vmsApp_vendor_search_update"',
+    'DROP TRIGGER IF EXISTS "vmsApp_vendor_search_delete"',
+    'DROP TABLE IF EXISTS "vmsApp_vendor_search"',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other backends, and SQLite builds without FTS5, search with the fallback queries.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for statement in CREATE_SEARCH_INDEX:
+                schema_editor.execute(statement)
+    except OperationalError as error:
+        if 'no such module' not in str(error):
+            raise
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SEARCH_INDEX:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0009_purchase_order_lines'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,97 @@
+# Hand-written migration: the FTS5 table and its triggers are SQLite specific raw SQL.
+
+from importlib import import_module
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+# Replaces the index of 0010, whose triggers looked the vendor up by an unindexed uid, a
+# scan of the whole index on every vendor update or delete. Each vendor now gets an integer
+# document id in "vmsApp_vendor_search_doc" (a unique index on uid), used as the rowid of
+# its FTS5 row: the triggers find it with two index lookups. The document id is an explicit
+# INTEGER PRIMARY KEY, VACUUM keeps it, unlike the implicit rowid of the vendor table.
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE TABLE "vmsApp_vendor_search_doc" (
+        docid INTEGER PRIMARY KEY,
+        uid char(32) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE "vmsApp_vendor_search" USING fts5(
+        name, address, contact_details,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO "vmsApp_vendor_search_doc" (uid) SELECT uid FROM "vmsApp_vendor"
+    """,
+    """
+    INSERT INTO "vmsApp_vendor_search" (rowid, name, address, contact_details)
+    SELECT doc.docid, vendor.name, vendor.address, vendor.contact_details
+    FROM "vmsApp_vendor_search_doc" doc JOIN "vmsApp_vendor" vendor ON vendor.uid = doc.uid
+    """,
+    """
+    CREATE TRIGGER "vmsApp_vendor_search_insert" AFTER INSERT ON "vmsApp_vendor" BEGIN
+        INSERT INTO "vmsApp_vendor_search_doc" (uid) VALUES (new.uid);
+        INSERT INTO "vmsApp_vendor_search" (rowid, name, address, contact_details)
+        VALUES ((SELECT docid FROM "vmsApp_vendor_search_doc" WHERE uid = new.uid),
+                new.name, new.address, new.contact_details);
+    END
+    """,
+    """
+    CREATE TRIGGER "vmsApp_vendor_search_update" AFTER UPDATE OF name, address, contact_details ON "vmsApp_vendor"
+    WHEN old.name IS NOT new.name OR old.address IS NOT new.address OR old.contact_details IS NOT new.contact_details
+    BEGIN
+        UPDATE "vmsApp_vendor_search" SET name = new.name, address = new.address, contact_details = new.contact_details
+        WHERE rowid = (SELECT docid FROM "vmsApp_vendor_search_doc" WHERE uid = old.uid);
+    END
+    """,
+    """
+    CREATE TRIGGER "vmsApp_vendor_search_delete" AFTER DELETE ON "vmsApp_vendor" BEGIN
+        DELETE FROM "vmsApp_vendor_search"
+        WHERE rowid = (SELECT docid FROM "vmsApp_vendor_search_doc" WHERE uid = old.uid);
+        DELETE FROM "vmsApp_vendor_search_doc" WHERE uid = old.uid;
+    END
+    """,
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS "vmsApp_vendor_search_insert"',
+    'DROP TRIGGER IF EXISTS "vmsApp_vendor_search_update"',
+    'DROP TRIGGER IF EXISTS "vmsApp_vendor_search_delete"',
+    'DROP TABLE IF EXISTS "vmsApp_vendor_search"',
+    'DROP TABLE IF EXISTS "vmsApp_vendor_search_doc"',
+]
+
+
+def _run(schema_editor, statements):
+    # Other backends, and SQLite builds without FTS5, search with the fallback queries.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for statement in statements:
+                schema_editor.execute(statement)
+    except OperationalError as error:
+        if 'no such module' not in str(error):
+            raise
+
+
+def create_rowid_search_index(apps, schema_editor):
+    _run(schema_editor, DROP_SEARCH_INDEX + CREATE_SEARCH_INDEX)
+
+
+def restore_uid_search_index(apps, schema_editor):
+    previous = import_module('vmsApp.migrations.0010_vendor_search')
+    _run(schema_editor, DROP_SEARCH_INDEX + previous.CREATE_SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmsApp', '0010_vendor_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rowid_search_index, restore_uid_search_index),
+    ]
@@ -1,7 +1,113 @@
 import uuid
-from django.db import models
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db import models, transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.db.models.lookups import GreaterThan
+from django.db.models.query_utils import DeferredAttribute
 from django.utils import timezone
-from .constants.appConstants import STATUS_CHOICES
+from .metricsWorker import submit_performance_deltas, empty_performance_delta
+from .readCache import invalidate_vendors
+from .constants.appConstants import (
+    STATUS_CHOICES,
+    PERFORMANCE_METRIC_FIELDS,
+    PERFORMANCE_AGGREGATE_FIELDS,
+    PERFORMANCE_VERIFY_TOLERANCE,
+    PERFORMANCE_ROLLUP_BUCKETS,
+    PERFORMANCE_WINDOWS,
+    PERFORMANCE_DELTA_BATCH_SIZE,
+)
+
+
+def performance_aggregate_expressions():
+    """
+    Aggregate expressions computing the vendor running aggregates with a full
+    scan over purchase orders. Usable with `aggregate()` or `values('vendor').annotate()`.
+    """
+    return {
+        'total_pos': Count('pk'),
+        'completed_pos': Count('pk', filter=Q(status='completed')),
+        'on_time_pos': Count('pk', filter=Q(status='completed', delivery_date__gte=F('issue_date'))),
+        'quality_rating_sum': Sum('quality_rating'),
+        'quality_rating_count': Count('quality_rating'),
+        'response_time_sum': Sum(
+            ExpressionWrapper(F('acknowledgment_date') - F('issue_date'), output_field=models.DurationField()),
+            filter=Q(acknowledgment_date__isnull=False),
+        ),
+        'response_time_count': Count('acknowledgment_date'),
+    }
+
+
+def normalize_performance_aggregates(row):
+    """
+    Converts a row produced by `performance_aggregate_expressions()` into plain
+    aggregate values (no NULL sums, response time expressed in days).
+    """
+    response_time_sum = row.get('response_time_sum') or timedelta(0)
+    if isinstance(response_time_sum, timedelta):
+        response_time_sum = response_time_sum.total_seconds() / 86400
+    return {
+        'total_pos': row.get('total_pos') or 0,
+        'completed_pos': row.get('completed_pos') or 0,
+        'on_time_pos': row.get('on_time_pos') or 0,
+        'quality_rating_sum': row.get('quality_rating_sum') or 0.0,
+        'quality_rating_count': row.get('quality_rating_count') or 0,
+        'response_time_sum': response_time_sum,
+        'response_time_count': row.get('response_time_count') or 0,
+    }
+
+
+def performance_metrics_from_aggregates(aggregates):
+    """
+    Computes the four vendor performance metrics from the running aggregates.
+    """
+    total_pos = aggregates['total_pos']
+    quality_count = aggregates['quality_rating_count']
+    response_count = aggregates['response_time_count']
+    return {
+        'on_time_delivery_rate': (aggregates['on_time_pos'] / total_pos) * 100 if total_pos else 0.0,
+        'quality_rating_avg': aggregates['quality_rating_sum'] / quality_count if quality_count else 0.0,
+        'average_response_time': aggregates['response_time_sum'] / response_count if response_count else 0.0,
+        'fulfillment_rate': (aggregates['completed_pos'] / total_pos) * 100 if total_pos else 0.0,
+    }
+
+
+def _ratio_expression(numerator, denominator, scale=1.0):
+    # SQL counterpart of the divisions in performance_metrics_from_aggregates().
+    return Case(
+        When(
+            GreaterThan(denominator, 0),
+            then=ExpressionWrapper(numerator * Value(scale) / denominator, output_field=models.FloatField()),
+        ),
+        default=Value(0.0),
+        output_field=models.FloatField(),
+    )
+
+
+def rollup_period_start(date, bucket):
+    """
+    Returns the start of the hour/day/month (in UTC) containing `date`.
+    """
+    date = date.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if bucket in ('day', 'month'):
+        date = date.replace(hour=0)
+    if bucket == 'month':
+        date = date.replace(day=1)
+    return date
+
+
+def performance_day(issue_date):
+    """
+    Returns the UTC day a purchase order issued at `issue_date` is bucketed under.
+    """
+    return issue_date.astimezone(dt_timezone.utc).date()
+
+
+def performance_window_start(days, now=None):
+    """
+    Returns the first UTC day of the rolling window of `days` days ending today.
+    """
+    return performance_day(now or timezone.now()) - timedelta(days=days - 1)
 
 
 class BaseModel(models.Model):
@@ -14,7 +120,58 @@ class BaseModel(models.Model):
         abstract = True
 
 
-class Vendor(BaseModel):
+class VersionConflict(Exception):
+    """
+    Raised when saving an instance whose row was changed (or deleted) since it was read.
+    """
+
+
+class VersionedModel(BaseModel):
+    """
+    A model whose rows carry a version, incremented by every save writing it. The save
+    is a conditional UPDATE on the version the instance holds, the one it was read
+    with or the one a client expects (`If-Match`), and raises `VersionConflict` when the
+    row moved on. Concurrent read-modify-writes fail instead of overwriting each other,
+    without holding any lock. Saves restricted to `update_fields` without `version`
+    (derived columns) are neither checked nor counted.
+    """
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def checks_version(self, update_fields=None, force_insert=False, **kwargs):
+        """
+        Whether a save with these arguments is conditional on the version held by the
+        instance, i.e. fails rather than writes over a row changed since it was read.
+        """
+        return not (self._state.adding or force_insert or (update_fields is not None and 'version' not in update_fields))
+
+    def save(self, *args, **kwargs):
+        if not self.checks_version(**kwargs):
+            return super().save(*args, **kwargs)
+        self._expected_version = self.version
+        self.version += 1
+        try:
+            # A savepoint, so that a conflict does not break the caller's transaction.
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except BaseException:
+            self.version = self._expected_version
+            raise
+        finally:
+            self._expected_version = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if not super()._do_update(base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update):
+            raise VersionConflict(f'{self._meta.object_name} {pk_val} is no longer at version {expected}')
+        return True
+
+
+class Vendor(VersionedModel):
     name = models.CharField(max_length=100)
     address = models.CharField(max_length=100)
     contact_details = models.CharField(max_length=100)
@@ -23,35 +180,150 @@ class Vendor(BaseModel):
     average_response_time = models.FloatField(default=0.0)
     fulfillment_rate = models.FloatField(default=0.0)
 
+    # Running aggregates over the vendor's purchase orders. They are adjusted by the
+    # delta of every purchase order change, so the metrics never need a full scan.
+    total_pos = models.IntegerField(default=0, editable=False)
+    completed_pos = models.IntegerField(default=0, editable=False)
+    on_time_pos = models.IntegerField(default=0, editable=False)
+    quality_rating_sum = models.FloatField(default=0.0, editable=False)
+    quality_rating_count = models.IntegerField(default=0, editable=False)
+    response_time_sum = models.FloatField(default=0.0, editable=False)  # in days
+    response_time_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # keyset pagination order of the vendor list
+            models.Index(fields=['created_at', 'uid'], name='vendor_created_uid_idx'),
+            # leaderboard orderings and metric threshold range scans
+            models.Index(fields=['on_time_delivery_rate', 'uid'], name='vendor_on_time_uid_idx'),
+            models.Index(fields=['quality_rating_avg', 'uid'], name='vendor_quality_uid_idx'),
+            models.Index(fields=['average_response_time', 'uid'], name='vendor_response_uid_idx'),
+            models.Index(fields=['fulfillment_rate', 'uid'], name='vendor_fulfillment_uid_idx'),
+            models.Index(fields=['total_pos', 'uid'], name='vendor_total_pos_uid_idx'),
+        ]
+
     def __str__(self):
         return self.name
-    
-    def calculate_performance_metrics(self):
-        completed_pos = self.purchase_orders.all()  # Consider all purchase orders
 
-        if not completed_pos.exists():
-            return  # Handle scenario with no POs (avoid division by zero)
+    def save(self, *args, **kwargs):
+        # Metrics and aggregates are only written by apply_performance_delta() and the
+        # rebuild path, a plain read-modify-write must not overwrite them with stale values.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            derived = PERFORMANCE_METRIC_FIELDS + PERFORMANCE_AGGREGATE_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in derived
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def apply_performance_delta(cls, vendor_id, delta):
+        """
+        Adjusts the running aggregates of a vendor by `delta` and recomputes the
+        metrics from them, all in a single UPDATE statement. The per day part of the
+        delta goes to the vendor's rolling window buckets.
+        """
+        return cls.apply_performance_deltas({vendor_id: delta})
+
+    @classmethod
+    def apply_performance_deltas(cls, deltas):
+        """
+        Same as `apply_performance_delta()` for `{vendor_id: delta}`, with three statements
+        per `PERFORMANCE_DELTA_BATCH_SIZE` vendors rather than per vendor.
+        """
+        deltas = {
+            vendor_id: delta for vendor_id, delta in deltas.items()
+            if any(delta.get(field, 0) for field in PERFORMANCE_AGGREGATE_FIELDS)
+            or any(any(day_delta.values()) for day_delta in delta.get('days', {}).values())
+        }
+        vendor_ids = list(deltas)
+        updated = 0
+        for start in range(0, len(vendor_ids), PERFORMANCE_DELTA_BATCH_SIZE):
+            batch = {vendor_id: deltas[vendor_id] for vendor_id in vendor_ids[start:start + PERFORMANCE_DELTA_BATCH_SIZE]}
+            updated += cls._apply_performance_deltas(batch)
+        return updated
 
-        total_pos = completed_pos.count()
+    @classmethod
+    def _apply_performance_deltas(cls, deltas):
+        aggregates = {}
+        for field in PERFORMANCE_AGGREGATE_FIELDS:
+            changes = {vendor_id: delta.get(field, 0) for vendor_id, delta in deltas.items() if delta.get(field, 0)}
+            if not changes:
+                aggregates[field] = F(field)
+            elif len(deltas) == 1:
+                aggregates[field] = F(field) + next(iter(changes.values()))
+            else:
+                aggregates[field] = F(field) + Case(
+                    *(When(pk=vendor_id, then=Value(change)) for vendor_id, change in changes.items()),
+                    default=Value(0),
+                    output_field=cls._meta.get_field(field),
+                )
+        metrics = {
+            'on_time_delivery_rate': _ratio_expression(aggregates['on_time_pos'], aggregates['total_pos'], 100.0),
+            'quality_rating_avg': _ratio_expression(aggregates['quality_rating_sum'], aggregates['quality_rating_count']),
+            'average_response_time': _ratio_expression(aggregates['response_time_sum'], aggregates['response_time_count']),
+            'fulfillment_rate': _ratio_expression(aggregates['completed_pos'], aggregates['total_pos'], 100.0),
+        }
+        changed = {field: value for field, value in aggregates.items() if not isinstance(value, F)}
+        # The vendor rows first: their lock orders the deltas against the rebuilds,
+        # which lock the vendors before reading the purchase orders.
+        updated = cls.objects.filter(pk__in=deltas).update(updated_at=timezone.now(), **changed, **metrics)
+        VendorDailyPerformance.apply_deltas({
+            vendor_id: {day: day_delta for day, day_delta in delta.get('days', {}).items() if any(day_delta.values())}
+            for vendor_id, delta in deltas.items()
+        })
+        invalidate_vendors(deltas)
+        return updated
 
-        # On-Time Delivery Rate
-        on_time_deliveries = completed_pos.filter(delivery_date__gte=models.F('issue_date'), status='completed')
-        self.on_time_delivery_rate = (on_time_deliveries.count() / total_pos) * 100  # Percentage
+    def calculate_performance_metrics(self):
+        """
+        Refreshes the running aggregates from the database and derives the metrics
+        from them. This is constant time, whatever the size of the PO history.
+        """
+        self.refresh_from_db(fields=PERFORMANCE_AGGREGATE_FIELDS)
+        aggregates = {field: getattr(self, field) for field in PERFORMANCE_AGGREGATE_FIELDS}
+        for field, value in performance_metrics_from_aggregates(aggregates).items():
+            setattr(self, field, value)
+        self.save(update_fields=PERFORMANCE_METRIC_FIELDS + ('updated_at',))
 
-        # Quality Rating Average (assuming quality_rating is a field in PurchaseOrder)
-        quality_ratings = [po.quality_rating for po in completed_pos if po.quality_rating is not None]
-        self.quality_rating_avg = sum(quality_ratings) / len(quality_ratings) if quality_ratings else 0
+    def scan_performance_aggregates(self):
+        """
+        Computes the running aggregates with a full scan of the vendor's purchase orders.
+        """
+        row = self.purchase_orders.aggregate(**performance_aggregate_expressions())
+        return normalize_performance_aggregates(row)
 
-        # Average Response Time (based on provided logic)
-        acknowledged_pos = completed_pos.filter(acknowledgment_date__isnull=False)
-        response_times = [(po.acknowledgment_date - po.issue_date).total_seconds() / 86400 for po in acknowledged_pos]
-        self.average_response_time = sum(response_times) / len(response_times) if response_times else 0
+    def verify_performance_aggregates(self):
+        """
+        Compares the stored aggregates and metrics against a full scan.
 
-        # Fulfillment Rate (refer to previous explanation)
-        successful_pos = completed_pos.filter(status='completed')  # Filter completed POs
-        self.fulfillment_rate = (successful_pos.count() / total_pos) * 100  # Percentage
+        Returns a dict of `{field: (stored, expected)}` for every field that drifted,
+        an empty dict means the incremental values are correct.
+        """
+        self.refresh_from_db(fields=PERFORMANCE_AGGREGATE_FIELDS + PERFORMANCE_METRIC_FIELDS)
+        expected = self.scan_performance_aggregates()
+        expected.update(performance_metrics_from_aggregates(expected))
+        mismatches = {}
+        for field, value in expected.items():
+            stored = getattr(self, field)
+            if abs(stored - value) > PERFORMANCE_VERIFY_TOLERANCE * max(1.0, abs(value)):
+                mismatches[field] = (stored, value)
+        return mismatches
 
-        self.save()
+    def rebuild_performance_aggregates(self):
+        """
+        Recomputes the aggregates, metrics and rolling window buckets with a full scan
+        and stores them.
+        """
+        with transaction.atomic():
+            # Locked before the scan, a delta committed meanwhile would be overwritten.
+            Vendor.objects.select_for_update().filter(pk=self.pk).exists()
+            aggregates = self.scan_performance_aggregates()
+            aggregates.update(performance_metrics_from_aggregates(aggregates))
+            for field, value in aggregates.items():
+                setattr(self, field, value)
+            self.save(update_fields=tuple(aggregates) + ('updated_at',))
+            VendorDailyPerformance.rebuild([self.pk])
 
     def save_performance_history(self):
         # Calculate metrics using the logic in calculate_performance_metrics
@@ -62,28 +334,420 @@ class Vendor(BaseModel):
             'fulfillment_rate': self.fulfillment_rate,
         }
         # Create a new HistoricalPerformance record with calculated metrics
-        HistoricalPerformance.objects.create(vendor=self, **performance_data)
+        HistoricalPerformance.record([{'vendor_id': self.pk, **performance_data}])
+
 
-    
+# `_stored_items` of a purchase order whose stored items may have been changed in place.
+_ITEMS_EXPOSED = object()
 
-class PurchaseOrder(BaseModel):
+
+class ItemsAttribute(DeferredAttribute):
+    """
+    Descriptor of `PurchaseOrder.items`. The items loaded with a purchase order can only
+    be changed in place once handed out, until then they are the stored ones as is.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is not None and instance.__dict__.get('_stored_items') is instance.__dict__.get(self.field.attname, _ITEMS_EXPOSED):
+            instance.__dict__['_stored_items'] = _ITEMS_EXPOSED
+        return super().__get__(instance, cls)
+
+    def __set__(self, instance, value):
+        # A data descriptor, so that reads go through `__get__()` once the items are loaded.
+        instance.__dict__[self.field.attname] = value
+
+
+class ItemsField(models.JSONField):
+    descriptor_class = ItemsAttribute
+
+    def deconstruct(self):
+        # Migrations see a plain JSONField, the descriptor has no schema impact.
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.JSONField', args, kwargs
+
+
+class PurchaseOrder(VersionedModel):
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='purchase_orders')
     order_date = models.DateTimeField(default=timezone.now)
     delivery_date = models.DateTimeField(blank=True, null=True)
-    items = models.JSONField()
+    items = ItemsField()
     quantity = models.IntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     quality_rating = models.FloatField(blank=True, null=True)
     issue_date = models.DateTimeField(default=timezone.now)
     acknowledgment_date = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination order of the purchase order list
+            models.Index(fields=['created_at', 'uid'], name='po_created_uid_idx'),
+            # purchase order list filters
+            models.Index(fields=['vendor', 'status'], name='po_vendor_status_idx'),
+            models.Index(fields=['vendor', 'issue_date'], name='po_vendor_issue_date_idx'),
+            models.Index(fields=['vendor', 'created_at'], name='po_vendor_created_idx'),
+            models.Index(fields=['status', 'delivery_date'], name='po_status_delivery_date_idx'),
+        ]
+
+    # Fields the vendor performance aggregates depend on.
+    PERFORMANCE_FIELDS = ('vendor_id', 'status', 'delivery_date', 'issue_date', 'quality_rating', 'acknowledgment_date')
+    # Fields the PurchaseOrderLine rows are derived from.
+    LINE_FIELDS = ('vendor_id', 'items')
+
     def __str__(self):
-        return f"PO #{self.po_number} - {self.vendor}"
-    
+        # Do not load the vendor just to print the purchase order.
+        vendor = self.vendor if PurchaseOrder.vendor.is_cached(self) else self.vendor_id
+        return f"PO #{self.pk} - {vendor}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this PO contributed to its vendor's aggregates, so a later
+        # save only has to apply the difference.
+        deferred = instance.get_deferred_fields()
+        instance._performance_state = instance.performance_state() if not (
+            deferred & set(cls.PERFORMANCE_FIELDS)
+        ) else None
+        # Vendor and items of the stored lines, compared on save rather than snapshotted,
+        # see `ItemsAttribute`.
+        lines_loaded = not (deferred & set(cls.LINE_FIELDS))
+        instance._lines_state = instance.vendor_id if lines_loaded else None
+        instance._stored_items = instance.__dict__['items'] if lines_loaded else _ITEMS_EXPOSED
+        return instance
+
+    @staticmethod
+    def performance_contribution(status, delivery_date, issue_date, quality_rating, acknowledgment_date):
+        """
+        Returns what a single purchase order adds to its vendor's running aggregates.
+        """
+        completed = status == 'completed'
+        acknowledged = acknowledgment_date is not None
+        return {
+            'total_pos': 1,
+            'completed_pos': int(completed),
+            'on_time_pos': int(completed and delivery_date is not None and delivery_date >= issue_date),
+            'quality_rating_sum': quality_rating or 0.0,
+            'quality_rating_count': int(quality_rating is not None),
+            'response_time_sum': (acknowledgment_date - issue_date).total_seconds() / 86400 if acknowledged else 0.0,
+            'response_time_count': int(acknowledged),
+        }
+
+    def performance_state(self):
+        """
+        Returns `(vendor_id, day, contribution)` for the current field values, `day`
+        being the bucket of the rolling window aggregates (see `performance_day()`).
+        """
+        return self.vendor_id, performance_day(self.issue_date), self.performance_contribution(
+            self.status, self.delivery_date, self.issue_date, self.quality_rating, self.acknowledgment_date,
+        )
+
+    def _stored_performance_state(self, use_snapshot=True):
+        """
+        The performance state of the stored row. The snapshot taken when the instance was
+        loaded is only used when `use_snapshot`, i.e. when the write is version checked and
+        so fails if the row changed since. Otherwise the row is read (and locked) again.
+        """
+        state = getattr(self, '_performance_state', None) if use_snapshot else None
+        if state is None and not self._state.adding:
+            stored = PurchaseOrder.objects.select_for_update().filter(pk=self.pk).values(*self.PERFORMANCE_FIELDS).first()
+            if stored is not None:
+                vendor_id = stored.pop('vendor_id')
+                state = vendor_id, performance_day(stored['issue_date']), self.performance_contribution(**stored)
+        return state
+
+    @staticmethod
+    def performance_deltas(previous, current):
+        """
+        Returns `{vendor_id: delta}` turning the `previous` performance state into `current`.
+        Either state may be None (created or deleted purchase order).
+        """
+        return PurchaseOrder.combined_performance_deltas([(previous, current)])
+
+    @staticmethod
+    def combined_performance_deltas(changes):
+        """
+        Same as `performance_deltas()` for many `(previous, current)` pairs at once,
+        with a single delta per vendor.
+        """
+        deltas = {}
+        for previous, current in changes:
+            for state, sign in ((previous, -1), (current, 1)):
+                if state is None:
+                    continue
+                vendor_id, day, contribution = state
+                delta = deltas.get(vendor_id)
+                if delta is None:
+                    delta = deltas[vendor_id] = empty_performance_delta()
+                day_delta = delta['days'].setdefault(day, dict.fromkeys(PERFORMANCE_AGGREGATE_FIELDS, 0))
+                for field, value in contribution.items():
+                    delta[field] += sign * value
+                    day_delta[field] += sign * value
+        return deltas
+
+    def _lines_changed(self, update_fields=None):
+        """
+        Whether the PurchaseOrderLine rows have to be replaced. Items handed out since the
+        load may have been changed in place, those are compared to the stored row.
+        """
+        if update_fields is not None and not {'vendor', 'vendor_id', 'items'} & set(update_fields):
+            return False
+        state = getattr(self, '_lines_state', None)
+        if state is None or state != self.vendor_id:
+            return True
+        stored, items = self.__dict__.get('_stored_items', _ITEMS_EXPOSED), self.__dict__.get('items')
+        if stored is items:
+            return False
+        if stored is _ITEMS_EXPOSED:
+            stored = PurchaseOrder.objects.select_for_update().filter(pk=self.pk).values_list('items', flat=True).first()
+        return stored != items
+
     def save(self, *args, **kwargs):
-        # Trigger performance metric calculation and history update
-        self.vendor.calculate_performance_metrics()
-        super().save(*args, **kwargs)
+        # Adjust the vendor aggregates by the change of this PO instead of rescanning its history
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        performance_changed = update_fields is None or bool(
+            {'vendor' if field == 'vendor_id' else field for field in self.PERFORMANCE_FIELDS}
+            & {'vendor' if field == 'vendor_id' else field for field in update_fields}
+        )
+        if performance_changed and update_fields is not None and 'version' not in update_fields:
+            # Not a derived column: the write is counted, so that the snapshot of any
+            # other instance of this PO no longer passes the version check.
+            kwargs['update_fields'] = update_fields = [*update_fields, 'version']
+        with transaction.atomic():
+            lines_changed = adding or self._lines_changed(update_fields)
+            # Writing the row reads the items too, that does not hand them out.
+            stored_items = self.__dict__.get('_stored_items', _ITEMS_EXPOSED)
+            if performance_changed:
+                previous = self._stored_performance_state(use_snapshot=self.checks_version(**kwargs))
+            super().save(*args, **kwargs)
+            if performance_changed:
+                # A partial save leaves the other fields of the row as they were stored.
+                current = self.performance_state() if update_fields is None else self._stored_performance_state(use_snapshot=False)
+                submit_performance_deltas(self.performance_deltas(previous, current))
+            if lines_changed:
+                PurchaseOrderLine.replace([(self.pk, self.vendor_id, self.items)], created=adding)
+        if performance_changed:
+            self._performance_state = current
+        if lines_changed:
+            self._lines_state = self.vendor_id
+            stored_items = _ITEMS_EXPOSED
+        self._stored_items = stored_items
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # Deletes are not version checked, subtract what the row holds now.
+            previous = self._stored_performance_state(use_snapshot=False)
+            result = super().delete(*args, **kwargs)
+            submit_performance_deltas(self.performance_deltas(previous, None))
+        self._performance_state = None
+        return result
+
+
+class VendorDailyPerformance(BaseModel):
+    """
+    A vendor's running aggregates restricted to the purchase orders issued on one UTC
+    day. Rolling window metrics sum at most one row per day of the window, whatever
+    the number of purchase orders.
+    """
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='daily_performance')
+    day = models.DateField()
+    total_pos = models.IntegerField(default=0)
+    completed_pos = models.IntegerField(default=0)
+    on_time_pos = models.IntegerField(default=0)
+    quality_rating_sum = models.FloatField(default=0.0)
+    quality_rating_count = models.IntegerField(default=0)
+    response_time_sum = models.FloatField(default=0.0)  # in days
+    response_time_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # also serves the window range scans of a vendor
+            models.UniqueConstraint(fields=['vendor', 'day'], name='daily_performance_vendor_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Performance for {self.vendor} on {self.day}"
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Adds `{vendor_id: {day: delta}}` to the vendors' daily buckets, with one insert
+        of the missing rows and one UPDATE. Days before the longest window are skipped,
+        they can no longer affect any window and are pruned by compact_performance_history.
+        """
+        oldest = performance_window_start(max(PERFORMANCE_WINDOWS.values()))
+        buckets = {
+            (vendor_id, day): delta
+            for vendor_id, days in deltas.items() for day, delta in days.items() if day >= oldest
+        }
+        if not buckets:
+            return 0
+        cls.objects.bulk_create(
+            [cls(vendor_id=vendor_id, day=day) for vendor_id, day in buckets], ignore_conflicts=True,
+        )
+        values = {'updated_at': timezone.now()}
+        for field in PERFORMANCE_AGGREGATE_FIELDS:
+            changes = {key: delta[field] for key, delta in buckets.items() if delta[field]}
+            if changes:
+                values[field] = F(field) + Case(
+                    *(When(vendor_id=vendor_id, day=day, then=Value(change)) for (vendor_id, day), change in changes.items()),
+                    default=Value(0),
+                    output_field=cls._meta.get_field(field),
+                )
+        days = {}
+        for vendor_id, day in buckets:
+            days.setdefault(vendor_id, []).append(day)
+        return cls.objects.filter(cls._rows(days)).update(**values)
+
+    @classmethod
+    def scan(cls, vendor_ids=None):
+        """
+        Computes the buckets of the longest window with a grouped scan of the purchase
+        orders: `{(vendor_id, day): aggregates}`, only for days with purchase orders.
+        """
+        oldest = performance_window_start(max(PERFORMANCE_WINDOWS.values()))
+        orders = PurchaseOrder.objects.filter(issue_date__gte=datetime.combine(oldest, time.min, tzinfo=dt_timezone.utc))
+        if vendor_ids is not None:
+            orders = orders.filter(vendor_id__in=vendor_ids)
+        rows = (
+            orders.annotate(day=TruncDate('issue_date', tzinfo=dt_timezone.utc))
+            .values('vendor_id', 'day')
+            .annotate(**performance_aggregate_expressions())
+            .order_by()
+        )
+        return {(row['vendor_id'], row['day']): normalize_performance_aggregates(row) for row in rows}
+
+    @classmethod
+    def verify(cls, vendor_ids=None):
+        """
+        Compares the stored buckets of the longest window against `scan()`.
+
+        Returns `{(vendor_id, day): {field: (stored, expected)}}` for every bucket that
+        drifted, a missing row counting as all zeros.
+        """
+        return cls._compare(vendor_ids)[1]
+
+    @classmethod
+    def rebuild(cls, vendor_ids=None, dry_run=False):
+        """
+        Rewrites the buckets of the longest window that drifted from `scan()`, with one
+        DELETE and one INSERT. Returns the `verify()` mismatches, nothing is written
+        when `dry_run` is set.
+        """
+        expected, mismatches = cls._compare(vendor_ids)
+        if mismatches and not dry_run:
+            days = {}
+            for vendor_id, day in mismatches:
+                days.setdefault(vendor_id, []).append(day)
+            with transaction.atomic():
+                cls.objects.filter(cls._rows(days)).delete()
+                cls.objects.bulk_create([
+                    cls(vendor_id=vendor_id, day=day, **expected[vendor_id, day])
+                    for vendor_id, day in mismatches if (vendor_id, day) in expected
+                ])
+            invalidate_vendors(days)
+        return mismatches
+
+    @classmethod
+    def _compare(cls, vendor_ids):
+        expected = cls.scan(vendor_ids)
+        stored = cls.objects.filter(day__gte=performance_window_start(max(PERFORMANCE_WINDOWS.values())))
+        if vendor_ids is not None:
+            stored = stored.filter(vendor_id__in=vendor_ids)
+        stored = {
+            (row.pop('vendor_id'), row.pop('day')): row
+            for row in stored.values('vendor_id', 'day', *PERFORMANCE_AGGREGATE_FIELDS)
+        }
+        empty = normalize_performance_aggregates({})
+        mismatches = {}
+        for key in expected.keys() | stored.keys():
+            stored_row, expected_row = stored.get(key, empty), expected.get(key, empty)
+            changes = {
+                field: (stored_row[field], expected_row[field]) for field in PERFORMANCE_AGGREGATE_FIELDS
+                if abs(stored_row[field] - expected_row[field]) > PERFORMANCE_VERIFY_TOLERANCE * max(1.0, abs(expected_row[field]))
+            }
+            if changes:
+                mismatches[key] = changes
+        return expected, mismatches
+
+    @staticmethod
+    def _rows(days):
+        # Matches the `{vendor_id: [day, ...]}` buckets.
+        rows = Q()
+        for vendor_id, vendor_days in days.items():
+            rows |= Q(vendor_id=vendor_id, day__in=vendor_days)
+        return rows
+
+
+def _item_value(item, keys, cast):
+    for key in keys:
+        value = item.get(key)
+        if value is not None and not isinstance(value, bool):
+            try:
+                return cast(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class PurchaseOrderLine(BaseModel):
+    """
+    One entry of a purchase order's `items`, normalized so that item level questions
+    (which orders contain a SKU, the quantity ordered per vendor) are index lookups
+    instead of a scan parsing every `items` document. `PurchaseOrder.save()` rewrites
+    the lines of an order when its items or its vendor change, `vendor` is copied from
+    the order for the per-vendor queries. `items` stays the source of truth, entries
+    without a `sku` have no line.
+    """
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='lines')
+    # indexed by po_line_vendor_sku_idx
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='order_lines', db_index=False)
+    position = models.PositiveIntegerField()  # index of the entry in `items`
+    sku = models.CharField(max_length=100)
+    description = models.CharField(max_length=255, blank=True, default='')
+    quantity = models.IntegerField(default=0)
+    unit_price = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sku'], name='po_line_sku_idx'),
+            models.Index(fields=['vendor', 'sku'], name='po_line_vendor_sku_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} x {self.quantity} on PO #{self.purchase_order_id}"
+
+    @classmethod
+    def from_items(cls, purchase_order_id, vendor_id, items):
+        """
+        Returns the (unsaved) lines of the `items` of a purchase order. The `qty` /
+        `quantity`, `price` / `unit_price` and `description` / `name` keys are read.
+        """
+        lines = []
+        for position, item in enumerate(items if isinstance(items, list) else ()):
+            if not isinstance(item, dict) or item.get('sku') in (None, ''):
+                continue
+            lines.append(cls(
+                purchase_order_id=purchase_order_id,
+                vendor_id=vendor_id,
+                position=position,
+                sku=str(item['sku'])[:100],
+                description=str(item.get('description') or item.get('name') or '')[:255],
+                quantity=_item_value(item, ('qty', 'quantity'), int) or 0,
+                unit_price=_item_value(item, ('price', 'unit_price'), float),
+            ))
+        return lines
+
+    @classmethod
+    def replace(cls, purchase_orders, created=False):
+        """
+        Rewrites the lines of `(pk, vendor_id, items)` purchase orders, with one DELETE of
+        their current lines (skipped for `created` orders) and one INSERT.
+        """
+        purchase_orders = list(purchase_orders)
+        if not created:
+            cls.objects.filter(purchase_order_id__in=[pk for pk, _, _ in purchase_orders]).delete()
+        lines = [line for order in purchase_orders for line in cls.from_items(*order)]
+        return cls.objects.bulk_create(lines) if lines else []
 
 
 class HistoricalPerformance(BaseModel):
@@ -94,6 +758,108 @@ class HistoricalPerformance(BaseModel):
     average_response_time = models.FloatField()
     fulfillment_rate = models.FloatField()
 
+    class Meta:
+        indexes = [
+            # range queries of a vendor's history and retention scans
+            models.Index(fields=['vendor', 'date'], name='history_vendor_date_idx'),
+        ]
+
     def __str__(self):
         return f"Performance for {self.vendor} on {self.date}"
 
+    @classmethod
+    def record(cls, snapshots, date=None):
+        """
+        Stores a snapshot per `{'vendor_id': ..., <metric>: value}` dict, taken at `date`
+        (now by default), and folds it into the vendor's hourly, daily and monthly rollups.
+        """
+        snapshots = list(snapshots)
+        date = date or timezone.now()
+        with transaction.atomic():
+            history = cls.objects.bulk_create([cls(date=date, **snapshot) for snapshot in snapshots])
+            PerformanceRollup.accumulate(snapshots, date)
+        return history
+
+
+class PerformanceRollup(BaseModel):
+    """
+    Summary of a vendor's performance snapshots over one hour, day or month (UTC).
+
+    Rollups are updated as snapshots are recorded, so history queries over long ranges
+    read a bounded number of rows and raw snapshots can be dropped once they expire.
+    The average of a metric is `<metric>_sum / samples`.
+    """
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='performance_rollups')
+    bucket = models.CharField(max_length=5, choices=PERFORMANCE_ROLLUP_BUCKETS)
+    period_start = models.DateTimeField()
+    samples = models.IntegerField(default=0)
+    on_time_delivery_rate_sum = models.FloatField(default=0.0)
+    on_time_delivery_rate_min = models.FloatField(null=True)
+    on_time_delivery_rate_max = models.FloatField(null=True)
+    quality_rating_avg_sum = models.FloatField(default=0.0)
+    quality_rating_avg_min = models.FloatField(null=True)
+    quality_rating_avg_max = models.FloatField(null=True)
+    average_response_time_sum = models.FloatField(default=0.0)
+    average_response_time_min = models.FloatField(null=True)
+    average_response_time_max = models.FloatField(null=True)
+    fulfillment_rate_sum = models.FloatField(default=0.0)
+    fulfillment_rate_min = models.FloatField(null=True)
+    fulfillment_rate_max = models.FloatField(null=True)
+
+    # Vendors folded in per UPDATE, bounds the size of the CASE expressions.
+    ACCUMULATE_BATCH_SIZE = 200
+
+    class Meta:
+        constraints = [
+            # also serves the (vendor, bucket, period_start) range queries
+            models.UniqueConstraint(fields=['vendor', 'bucket', 'period_start'], name='rollup_vendor_bucket_period_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_bucket_display()} performance for {self.vendor} from {self.period_start}"
+
+    @classmethod
+    def accumulate(cls, snapshots, date):
+        """
+        Adds snapshots taken at `date` to the rollups of their vendors: one insert of the
+        missing rollup rows and one UPDATE per batch of vendors, whatever the batch size.
+        """
+        periods = {bucket: rollup_period_start(date, bucket) for bucket, _ in PERFORMANCE_ROLLUP_BUCKETS}
+        in_periods = Q()
+        for bucket, period_start in periods.items():
+            in_periods |= Q(bucket=bucket, period_start=period_start)
+
+        pending = list(snapshots)
+        while pending:
+            # A vendor can only be folded in once per UPDATE, repeats wait for the next round.
+            batch, repeated = {}, []
+            for snapshot in pending:
+                if snapshot['vendor_id'] in batch or len(batch) >= cls.ACCUMULATE_BATCH_SIZE:
+                    repeated.append(snapshot)
+                else:
+                    batch[snapshot['vendor_id']] = snapshot
+            pending = repeated
+
+            cls.objects.bulk_create(
+                [
+                    cls(vendor_id=vendor_id, bucket=bucket, period_start=period_start)
+                    for vendor_id in batch for bucket, period_start in periods.items()
+                ],
+                ignore_conflicts=True,
+            )
+            values = {'samples': F('samples') + 1, 'updated_at': timezone.now()}
+            for field in PERFORMANCE_METRIC_FIELDS:
+                sample = cls._sample_expression(batch, field)
+                values[f'{field}_sum'] = F(f'{field}_sum') + sample
+                values[f'{field}_min'] = Least(Coalesce(F(f'{field}_min'), sample), sample)
+                values[f'{field}_max'] = Greatest(Coalesce(F(f'{field}_max'), sample), sample)
+            cls.objects.filter(in_periods, vendor_id__in=batch).update(**values)
+
+    @staticmethod
+    def _sample_expression(batch, field):
+        if len(batch) == 1:
+            return Value(float(next(iter(batch.values()))[field]), output_field=models.FloatField())
+        return Case(
+            *(When(vendor_id=vendor_id, then=Value(float(snapshot[field]))) for vendor_id, snapshot in batch.items()),
+            output_field=models.FloatField(),
+        )
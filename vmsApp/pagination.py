@@ -0,0 +1,155 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a WHERE clause on the ordering key `(field, uid)` instead of an
+OFFSET, so every page costs the same index range scan however deep it is. Cursors are
+opaque url-safe tokens encoding the position of the first/last row of a page.
+"""
+import base64
+import json
+import uuid
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from .constants.appConstants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+def get_page_size(value=None):
+    """
+    Parses the requested page size, falling back to `VMS_PAGE_SIZE` and capping it
+    to `VMS_MAX_PAGE_SIZE`.
+    """
+    default = getattr(settings, 'VMS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'VMS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    if value in (None, ''):
+        return min(default, maximum)
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({'page_size': 'page_size must be an integer'})
+    if page_size < 1:
+        raise ValidationError({'page_size': 'page_size must be a positive integer'})
+    return min(page_size, maximum)
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset ordered on `(field, uid)`.
+
+    Args:
+        field (str): The ordering field, prefixed with '-' for descending order.
+            The primary key `uid` is always appended as a tie breaker.
+        page_size (int): Number of rows per page.
+    """
+
+    def __init__(self, field='created_at', page_size=None):
+        self.descending = field.startswith('-')
+        self.field = field.lstrip('-')
+        self.page_size = page_size or get_page_size()
+
+    def encode_cursor(self, row, backwards=False):
+        value = self._row_value(row, self.field)
+        value = value.isoformat() if hasattr(value, 'isoformat') else value
+        payload = {'k': self.field, 'v': value, 'u': str(self._row_value(row, 'uid'))}
+        if backwards:
+            payload['b'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        return token.decode().rstrip('=')
+
+    def decode_cursor(self, queryset, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if payload['k'] != self.field:
+                raise ValueError('cursor belongs to another ordering')
+            model_field = queryset.model._meta.get_field(self.field)
+            value = model_field.to_python(payload['v'])
+            uid = queryset.model._meta.pk.to_python(payload['u'])
+            return value, uid, bool(payload.get('b'))
+        except Exception:
+            raise ValidationError({'cursor': 'Invalid cursor'})
+
+    def paginate(self, queryset, cursor=None):
+        """
+        Returns `(rows, next_cursor, prev_cursor)` for the page after (or before, for a
+        backwards cursor) the position encoded in `cursor`, the first page when None.
+        Works on model and `values()` querysets alike.
+        """
+        queryset, backwards = self._page_queryset(queryset, cursor)
+        return self._page(list(queryset), cursor, backwards)
+
+    async def apaginate(self, queryset, cursor=None):
+        """
+        Same as `paginate()`, reading the page with the async ORM.
+        """
+        queryset, backwards = self._page_queryset(queryset, cursor)
+        return self._page([row async for row in queryset], cursor, backwards)
+
+    def _page_queryset(self, queryset, cursor):
+        """
+        Returns the queryset of the requested page plus one row, and whether it walks backwards.
+        """
+        backwards = False
+        if cursor:
+            value, uid, backwards = self.decode_cursor(queryset, cursor)
+            # Moving backwards walks the reversed ordering from the cursor position.
+            after = self.descending == backwards
+            lookup = 'gt' if after else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'uid__{lookup}': uid})
+            )
+
+        descending = self.descending != backwards
+        prefix = '-' if descending else ''
+        return queryset.order_by(f'{prefix}{self.field}', f'{prefix}uid')[:self.page_size + 1], backwards
+
+    def _page(self, rows, cursor, backwards):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return rows, None, None
+        has_next = has_more if not backwards else True
+        has_prev = has_more if backwards else bool(cursor)
+        next_cursor = self.encode_cursor(rows[-1]) if has_next else None
+        prev_cursor = self.encode_cursor(rows[0], backwards=True) if has_prev else None
+        return rows, next_cursor, prev_cursor
+
+    @staticmethod
+    def _row_value(row, field):
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+class RankedKeysetPaginator(KeysetPaginator):
+    """
+    Paginates search results ordered on `(rank, uid)`, `rank` being a relevance score
+    computed by the query (lower is better) rather than a model field. Pages either come
+    from a queryset annotated with `rank` (`paginate()`), or from a function reading the
+    rows itself (`paginate_rows()`). Ranks depend on the indexed data, so a write between
+    two pages may shift the results.
+    """
+
+    def __init__(self, page_size=None):
+        super().__init__('rank', page_size)
+
+    def decode_cursor(self, queryset, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if payload['k'] != self.field:
+                raise ValueError('cursor belongs to another ordering')
+            return float(payload['v']), uuid.UUID(str(payload['u'])), bool(payload.get('b'))
+        except Exception:
+            raise ValidationError({'cursor': 'Invalid cursor'})
+
+    def paginate_rows(self, fetch, cursor=None):
+        """
+        Same as `paginate()` for rows read by `fetch(position, backwards, limit)`, which
+        returns at most `limit` rows after `position` (a `(rank, uid)` pair, None for the
+        first page) in `(rank, uid)` order, or before it in reverse order when `backwards`.
+        """
+        position, backwards = None, False
+        if cursor:
+            rank, uid, backwards = self.decode_cursor(None, cursor)
+            position = (rank, uid)
+        return self._page(list(fetch(position, backwards, self.page_size + 1)), cursor, backwards)
@@ -0,0 +1,108 @@
+"""
+Purchase order state machine.
+
+A purchase order is created `pending` and leaves that status once, either `completed` or
+`canceled`. Independently of its status it can be acknowledged once, and rated (or
+re-rated) once completed. `TRANSITIONS` holds the rule of every action:
+
+- `allowed(purchase_order)` checks the action against the current values;
+- `guard` is the same check as UPDATE lookups, so the write only matches the row while
+  the action is still allowed and a concurrent transition makes it match nothing;
+- `fields` are the columns the action writes, `apply()` sets them on the instance;
+- `snapshot` records a HistoricalPerformance snapshot of the vendor afterwards.
+
+`CommonService` applies them, one conditional UPDATE of the purchase order and one
+aggregate delta for its vendor per transition.
+"""
+from django.db.models import Case, Value, When
+
+
+# Statuses a purchase order may move to from each status.
+STATUS_TRANSITIONS = {
+    'pending': ('completed', 'canceled'),
+    'completed': (),
+    'canceled': (),
+}
+
+
+class InvalidTransition(Exception):
+    """
+    Raised when an action is not allowed in the current state of the purchase order.
+    """
+
+
+class Transition:
+
+    def __init__(self, allowed, guard, fields, values, error, snapshot=False):
+        self.allowed = allowed
+        self.guard = guard
+        self.fields = fields
+        self.values = values
+        self.error = error
+        self.snapshot = snapshot
+
+    def apply(self, purchase_order, payload, now):
+        """
+        Applies the action to the in-memory purchase order, raises `InvalidTransition`
+        when it is not allowed.
+        """
+        if not self.allowed(purchase_order):
+            raise InvalidTransition(self.error)
+        for field, value in self.values(payload, now).items():
+            setattr(purchase_order, field, value)
+
+
+TRANSITIONS = {
+    'acknowledge': Transition(
+        allowed=lambda po: po.acknowledgment_date is None,
+        guard={'acknowledgment_date__isnull': True},
+        fields=('acknowledgment_date',),
+        values=lambda payload, now: {'acknowledgment_date': now},
+        error='Purchase order already acknowledged',
+    ),
+    'complete': Transition(
+        allowed=lambda po: po.status == 'pending',
+        guard={'status': 'pending'},
+        fields=('status',),
+        values=lambda payload, now: {'status': 'completed'},
+        error='Purchase order already completed or cancelled',
+        snapshot=True,
+    ),
+    'cancel': Transition(
+        allowed=lambda po: po.status == 'pending',
+        guard={'status': 'pending'},
+        fields=('status',),
+        values=lambda payload, now: {'status': 'canceled'},
+        error='Purchase order already completed or cancelled',
+    ),
+    'rate': Transition(
+        allowed=lambda po: po.status == 'completed',
+        guard={'status': 'completed'},
+        fields=('quality_rating',),
+        values=lambda payload, now: {'quality_rating': payload['quality_rating']},
+        error='Cannot update quality rating for non-completed PO',
+        snapshot=True,
+    ),
+}
+
+
+def can_change_status(current, new):
+    return new == current or new in STATUS_TRANSITIONS.get(current, ())
+
+
+def update_values(transition, purchase_orders):
+    """
+    Returns the UPDATE values writing `transition` to all of `purchase_orders` at once,
+    a CASE on the primary key for the fields whose new value differs between them.
+    """
+    values = {}
+    for field in transition.fields:
+        distinct = {getattr(purchase_order, field) for purchase_order in purchase_orders}
+        if len(distinct) == 1:
+            values[field] = distinct.pop()
+        else:
+            values[field] = Case(
+                *(When(pk=purchase_order.pk, then=Value(getattr(purchase_order, field))) for purchase_order in purchase_orders),
+                output_field=purchase_orders[0]._meta.get_field(field),
+            )
+    return values
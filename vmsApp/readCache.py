@@ -0,0 +1,208 @@
+"""
+Read-through cache for the vendor and purchase order read services.
+
+Cached entries are keyed on the generation counters of the namespaces they depend on
+(`vendor:<id>`, `po:<id>`, `vendor_pos:<id>`, and `vendors`/`pos` for the lists). A
+write bumps the counters it affects once its transaction commits, so every entry built
+from the old data becomes unreachable at once and simply expires from the backend.
+The backend is any Django cache, chosen with `VMS_CACHE_ALIAS`.
+
+The counters only invalidate the processes sharing the backend. A process-local backend
+(locmem) would keep serving another worker's stale entries until they expire, so by
+default (`VMS_CACHE_ENABLED = None`) the cache is only on with a shared backend, and
+`manage.py check` warns when it is forced on with a process-local one.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from .dbRouter import routes_to_replica
+
+KEY_PREFIX = 'vms'
+_MISSING = object()
+
+
+class ReadCache:
+    """
+    Generation-keyed read-through cache with per-entry-kind hit/miss counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    @property
+    def enabled(self):
+        enabled = getattr(settings, 'VMS_CACHE_ENABLED', None)
+        if enabled is None:
+            return not backend_is_process_local(self.backend)
+        return enabled
+
+    @property
+    def backend(self):
+        return caches[getattr(settings, 'VMS_CACHE_ALIAS', 'default')]
+
+    def get_or_load(self, name, namespaces, params, loader):
+        """
+        Returns the cached value of `name` for `params`, calling `loader()` on a miss.
+        `None` results are not cached, values read from a replica, which may lag
+        behind the primary, only for `VMS_REPLICA_CACHE_TIMEOUT`.
+        """
+        if not self.enabled:
+            return loader()
+        backend = self.backend
+        key = self._key(name, params, self._generations(backend, namespaces))
+
+        value = backend.get(key, _MISSING)
+        if value is not _MISSING:
+            self._record(name, 'hits')
+            return value
+        self._record(name, 'misses')
+        value = loader()
+        if value is not None:
+            backend.set(key, value, self._timeout())
+        return value
+
+    async def aget_or_load(self, name, namespaces, params, loader):
+        """
+        Same as `get_or_load()` with the async cache API, `loader` being a coroutine function.
+        """
+        if not self.enabled:
+            return await loader()
+        backend = self.backend
+        key = self._key(name, params, await self._agenerations(backend, namespaces))
+
+        value = await backend.aget(key, _MISSING)
+        if value is not _MISSING:
+            self._record(name, 'hits')
+            return value
+        self._record(name, 'misses')
+        value = await loader()
+        if value is not None:
+            await backend.aset(key, value, self._timeout())
+        return value
+
+    def bump(self, namespaces):
+        """
+        Invalidates every entry depending on one of `namespaces`.
+        """
+        backend = self.backend
+        for namespace in namespaces:
+            key = self._generation_key(namespace)
+            try:
+                backend.incr(key)
+            except ValueError:
+                backend.add(key, time.time_ns())
+
+    def stats(self):
+        with self._lock:
+            stats = {name: dict(counters) for name, counters in self._stats.items()}
+        totals = {'hits': sum(s['hits'] for s in stats.values()), 'misses': sum(s['misses'] for s in stats.values())}
+        return {'enabled': self.enabled, 'totals': totals, 'entries': stats}
+
+    def _generations(self, backend, namespaces):
+        keys = [self._generation_key(namespace) for namespace in namespaces]
+        found = backend.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # Start from the clock rather than 0, so a counter evicted from the backend
+                # never comes back to a value already used by older entries.
+                backend.add(key, time.time_ns())
+                found[key] = backend.get(key)
+        return [found[key] for key in keys]
+
+    async def _agenerations(self, backend, namespaces):
+        keys = [self._generation_key(namespace) for namespace in namespaces]
+        found = await backend.aget_many(keys)
+        for key in keys:
+            if key not in found:
+                await backend.aadd(key, time.time_ns())
+                found[key] = await backend.aget(key)
+        return [found[key] for key in keys]
+
+    @staticmethod
+    def _key(name, params, generations):
+        digest = hashlib.sha1(json.dumps([params, generations], default=str, sort_keys=True).encode()).hexdigest()
+        return f'{KEY_PREFIX}:{name}:{digest}'
+
+    @staticmethod
+    def _timeout():
+        timeout = getattr(settings, 'VMS_CACHE_TIMEOUT', 300)
+        if routes_to_replica():
+            timeout = min(timeout, getattr(settings, 'VMS_REPLICA_CACHE_TIMEOUT', 5))
+        return timeout
+
+    @staticmethod
+    def _generation_key(namespace):
+        return f'{KEY_PREFIX}:gen:{namespace}'
+
+    def _record(self, name, outcome):
+        with self._lock:
+            self._stats[name][outcome] += 1
+
+
+read_cache = ReadCache()
+
+
+def backend_is_process_local(backend):
+    """
+    Whether `backend` is private to the process (locmem) or stores nothing (dummy).
+    """
+    return isinstance(backend, (LocMemCache, DummyCache))
+
+
+@checks.register(checks.Tags.caches)
+def check_read_cache_backend(app_configs, **kwargs):
+    if getattr(settings, 'VMS_CACHE_ENABLED', None) is not True or not backend_is_process_local(read_cache.backend):
+        return []
+    return [checks.Warning(
+        'The read cache is enabled on a process-local cache backend.',
+        hint=(
+            'Writes only invalidate the entries of the process making them, other worker processes '
+            'serve stale reads for up to VMS_CACHE_TIMEOUT seconds. Point VMS_CACHE_ALIAS at a shared '
+            'backend (Redis, Memcached, database), or only force the cache on with a single worker process.'
+        ),
+        id='vmsApp.W001',
+    )]
+
+
+def _bump_on_commit(namespaces):
+    namespaces = list(namespaces)
+    transaction.on_commit(lambda: read_cache.bump(namespaces))
+
+
+def invalidate_vendors(vendor_ids):
+    """
+    Invalidates the cached details, performance and list entries of `vendor_ids`.
+    """
+    _bump_on_commit(['vendors', *(f'vendor:{vendor_id}' for vendor_id in vendor_ids)])
+
+
+def invalidate_purchase_orders(po_ids, vendor_ids):
+    """
+    Invalidates the cached details of `po_ids` and the purchase order lists they appear in.
+    """
+    _bump_on_commit([
+        'pos',
+        *(f'po:{po_id}' for po_id in po_ids),
+        *(f'vendor_pos:{vendor_id}' for vendor_id in vendor_ids),
+    ])
+
+
+def purchase_order_list_namespaces(filters):
+    """
+    A list filtered on one vendor only depends on that vendor's purchase orders.
+    """
+    try:
+        vendor_id = uuid.UUID(str((filters or {})['vendor']))
+    except (KeyError, ValueError):
+        return ['pos']
+    return [f'vendor_pos:{vendor_id}']
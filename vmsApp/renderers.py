@@ -0,0 +1,61 @@
+import csv
+import json
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class _Echo:
+    """
+    File-like object handing back what csv.writer writes, to stream rows one by one.
+    """
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON, one record per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(self.stream(rows))
+
+    def stream(self, rows, fieldnames=None):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        for row in rows:
+            yield (encoder.encode(row) + '\n').encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header line, nested values (e.g. `items`) are written as JSON.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fieldnames = list(rows[0]) if rows else []
+        return b''.join(self.stream(rows, fieldnames))
+
+    def stream(self, rows, fieldnames):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fieldnames).encode(self.charset)
+        for row in rows:
+            yield writer.writerow([self._cell(row.get(name)) for name in fieldnames]).encode(self.charset)
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+        return '' if value is None else value
@@ -0,0 +1,37 @@
+# import modules
+from django.db import models
+from django.db.models import ExpressionWrapper, F
+from ..models import HistoricalPerformance, PerformanceRollup
+from ..constants.appConstants import PERFORMANCE_METRIC_FIELDS
+
+
+class PerformanceHistoryRepository:
+
+    def get_snapshots(self, vendor_id, start=None, end=None):
+        queryset = HistoricalPerformance.objects.filter(vendor_id=vendor_id)
+        if start is not None:
+            queryset = queryset.filter(date__gte=start)
+        if end is not None:
+            queryset = queryset.filter(date__lte=end)
+        return queryset
+
+    def get_rollups(self, vendor_id, bucket, start=None, end=None):
+        """
+        Rollups of a vendor whose period starts within `[start, end]`, annotated with
+        the average of every metric under the metric's own name.
+        """
+        queryset = PerformanceRollup.objects.filter(vendor_id=vendor_id, bucket=bucket).annotate(**{
+            metric: ExpressionWrapper(F(f'{metric}_sum') / F('samples'), output_field=models.FloatField())
+            for metric in PERFORMANCE_METRIC_FIELDS
+        })
+        if start is not None:
+            queryset = queryset.filter(period_start__gte=start)
+        if end is not None:
+            queryset = queryset.filter(period_start__lte=end)
+        return queryset
+
+    def get_snapshots_before(self, cutoff):
+        return HistoricalPerformance.objects.filter(date__lt=cutoff)
+
+    def get_rollups_before(self, bucket, cutoff):
+        return PerformanceRollup.objects.filter(bucket=bucket, period_start__lt=cutoff)
@@ -0,0 +1,43 @@
+# import modules
+from django.db import models
+from django.db.models import Avg, Count, ExpressionWrapper, F, Sum
+from ..models import PurchaseOrder, PurchaseOrderLine
+
+
+class PurchaseOrderLineRepository:
+
+    def filter_lines(self, **lookups):
+        return PurchaseOrderLine.objects.filter(**lookups)
+
+    def summarize_lines(self, group_by, sort, limit, **lookups):
+        """
+        Aggregates the lines matching `lookups` per `group_by` columns: number of lines and
+        of distinct purchase orders, total quantity, total value (quantity x unit price,
+        lines without a price excluded) and average unit price. Returns the first `limit`
+        groups in `sort` order.
+        """
+        return (
+            PurchaseOrderLine.objects.filter(**lookups)
+            .values(*group_by)
+            .annotate(
+                lines=Count('pk'),
+                orders=Count('purchase_order', distinct=True),
+                total_quantity=Sum('quantity'),
+                total_value=Sum(ExpressionWrapper(F('quantity') * F('unit_price'), output_field=models.FloatField())),
+                average_unit_price=Avg('unit_price'),
+            )
+            .order_by(sort, *group_by)[:limit]
+        )
+
+    def get_purchased_order_chunk(self, after=None, size=1000):
+        """
+        The `(pk, vendor_id, items)` of the next `size` purchase orders in primary key
+        order after `after`, for streaming over the whole table.
+        """
+        queryset = PurchaseOrder.objects.order_by('pk')
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        return list(queryset.values_list('pk', 'vendor_id', 'items')[:size])
+
+    def replace_lines(self, purchase_orders):
+        return PurchaseOrderLine.replace(purchase_orders)
@@ -1,5 +1,6 @@
 # import modules
-from ..models import PurchaseOrder
+from django.db.models import Count, Max
+from ..models import PurchaseOrder, performance_aggregate_expressions, normalize_performance_aggregates
 
 class PurchasedOrderRepository:
     def __init__(self):
@@ -8,13 +9,58 @@ class PurchasedOrderRepository:
     
     def get_all_purchased_orders(self):
         return PurchaseOrder.objects.all()
+
+    def get_purchased_order_state(self, po_id):
+        return PurchaseOrder.objects.filter(pk=po_id).values_list('updated_at', 'version').first()
+
+    async def aget_purchased_order_state(self, po_id):
+        return await PurchaseOrder.objects.filter(pk=po_id).values_list('updated_at', 'version').afirst()
+
+    def get_purchased_orders_last_modified(self, **lookups):
+        state = PurchaseOrder.objects.filter(**lookups).aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return state['last_modified'], state['count']
+
+    async def aget_purchased_orders_last_modified(self, **lookups):
+        state = await PurchaseOrder.objects.filter(**lookups).aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return state['last_modified'], state['count']
+
+    def filter_purchased_orders(self, **lookups):
+        return PurchaseOrder.objects.filter(**lookups)
+
+    def bulk_create_purchased_orders(self, orders):
+        return PurchaseOrder.objects.bulk_create(orders)
+
+    def get_purchased_order_for_update(self, po_id):
+        return PurchaseOrder.objects.select_for_update().filter(pk=po_id).first()
+
+    def get_purchased_orders_for_update(self, po_ids):
+        return {po.pk: po for po in PurchaseOrder.objects.select_for_update().filter(pk__in=po_ids)}
+
+    def update_purchased_orders(self, po_ids, guard=None, **values):
+        return PurchaseOrder.objects.filter(pk__in=po_ids, **(guard or {})).update(**values)
     
-    def get_purchased_order_by_id(self, po_id):
-        return PurchaseOrder.objects.get(pk=po_id)
+    def get_purchased_order_by_id(self, po_id, fields=None):
+        queryset = PurchaseOrder.objects.all() if fields is None else PurchaseOrder.objects.only('pk', *fields)
+        return queryset.get(pk=po_id)
+
+    async def aget_purchased_order_by_id(self, po_id, fields=None):
+        queryset = PurchaseOrder.objects.all() if fields is None else PurchaseOrder.objects.only('pk', *fields)
+        return await queryset.aget(pk=po_id)
     
     def delete_purchased_order(self, po_id):
         po = self.get_purchased_order_by_id(po_id)
         if not po:
             return None
         po.delete()
-        return po
\ No newline at end of file
+        return po
+
+    def get_performance_aggregates_by_vendor(self, vendor_ids=None):
+        """
+        Computes the vendor performance aggregates for every vendor in one
+        GROUP BY vendor query, returns `{vendor_id: aggregates}`.
+        """
+        queryset = PurchaseOrder.objects.all()
+        if vendor_ids is not None:
+            queryset = queryset.filter(vendor__in=vendor_ids)
+        rows = queryset.order_by().values('vendor').annotate(**performance_aggregate_expressions())
+        return {row['vendor']: normalize_performance_aggregates(row) for row in rows}
@@ -1,5 +1,7 @@
 # import required modules
-from ..models import Vendor
+from django.db.models import Count, Max, Sum
+from ..models import Vendor, VendorDailyPerformance
+from ..constants.appConstants import PERFORMANCE_METRIC_FIELDS, PERFORMANCE_AGGREGATE_FIELDS
 from ..serializers import VendorSerializer, VendorPerformanceSerializer
 
 class VendorRepository:
@@ -10,8 +12,55 @@ class VendorRepository:
     def get_all_vendors(self):
         return Vendor.objects.all()
     
-    def get_vendor_by_id(self, vendor_id):
-        return Vendor.objects.get(pk=vendor_id)
+    def get_vendor_by_id(self, vendor_id, fields=None):
+        queryset = Vendor.objects.all() if fields is None else Vendor.objects.only('pk', *fields)
+        return queryset.get(pk=vendor_id)
+
+    async def aget_vendor_by_id(self, vendor_id, fields=None):
+        queryset = Vendor.objects.all() if fields is None else Vendor.objects.only('pk', *fields)
+        return await queryset.aget(pk=vendor_id)
+
+    def get_vendor_last_modified(self, vendor_id):
+        return Vendor.objects.filter(pk=vendor_id).values_list('updated_at', flat=True).first()
+
+    async def aget_vendor_last_modified(self, vendor_id):
+        return await Vendor.objects.filter(pk=vendor_id).values_list('updated_at', flat=True).afirst()
+
+    def get_vendor_state(self, vendor_id):
+        return Vendor.objects.filter(pk=vendor_id).values_list('updated_at', 'version').first()
+
+    async def aget_vendor_state(self, vendor_id):
+        return await Vendor.objects.filter(pk=vendor_id).values_list('updated_at', 'version').afirst()
+
+    def get_vendors_last_modified(self):
+        state = Vendor.objects.aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return state['last_modified'], state['count']
+
+    async def aget_vendors_last_modified(self):
+        state = await Vendor.objects.aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return state['last_modified'], state['count']
+
+    def get_window_performance_aggregates(self, vendor_id, since):
+        """
+        Sums a vendor's daily performance buckets from `since` (a date) on.
+        """
+        return VendorDailyPerformance.objects.filter(vendor_id=vendor_id, day__gte=since).aggregate(
+            **{field: Sum(field) for field in PERFORMANCE_AGGREGATE_FIELDS}
+        )
+
+    async def aget_window_performance_aggregates(self, vendor_id, since):
+        return await VendorDailyPerformance.objects.filter(vendor_id=vendor_id, day__gte=since).aaggregate(
+            **{field: Sum(field) for field in PERFORMANCE_AGGREGATE_FIELDS}
+        )
+
+    def get_expired_daily_performance(self, before):
+        return VendorDailyPerformance.objects.filter(day__lt=before)
+
+    def get_existing_vendor_ids(self, vendor_ids):
+        return set(Vendor.objects.filter(pk__in=vendor_ids).values_list('pk', flat=True))
+
+    async def aget_existing_vendor_ids(self, vendor_ids):
+        return {pk async for pk in Vendor.objects.filter(pk__in=vendor_ids).values_list('pk', flat=True)}
     
     def create_vendor(self, vendor_name):
         vendor = Vendor(name=vendor_name)
@@ -31,3 +80,29 @@ class VendorRepository:
         vendor.delete()
         return vendor
     
+
+    def iter_vendor_ids(self, vendor_ids=None, chunk_size=2000):
+        """
+        Streams the ids of all vendors (or of the existing ones among `vendor_ids`).
+        """
+        queryset = Vendor.objects.order_by('pk')
+        if vendor_ids is not None:
+            queryset = queryset.filter(pk__in=vendor_ids)
+        return queryset.values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+
+    def lock_vendor_performance(self, vendor_ids):
+        """
+        Returns the vendors with only their performance metrics and aggregates loaded,
+        locking their rows until the end of the transaction.
+        """
+        return list(
+            Vendor.objects.select_for_update().only(*PERFORMANCE_METRIC_FIELDS, *PERFORMANCE_AGGREGATE_FIELDS)
+            .filter(pk__in=vendor_ids).order_by('pk')
+        )
+
+    def bulk_update_vendors(self, vendors, fields, batch_size=None):
+        return Vendor.objects.bulk_update(vendors, fields, batch_size=batch_size)
+
+    def rebuild_daily_performance(self, vendor_ids=None, dry_run=False):
+        return VendorDailyPerformance.rebuild(vendor_ids, dry_run=dry_run)
+
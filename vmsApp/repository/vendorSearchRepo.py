@@ -0,0 +1,110 @@
+# import modules
+import re
+import uuid
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import Case, IntegerField, Q, Value, When
+from ..models import Vendor
+from ..constants.appConstants import VENDOR_SEARCH_WEIGHTS
+
+# FTS5 index of the vendors, created and kept in sync by triggers in migration 0011. The
+# rowid of a vendor's index row is its `docid` in SEARCH_DOC_TABLE, which maps it to the uid.
+SEARCH_TABLE = 'vmsApp_vendor_search'
+SEARCH_DOC_TABLE = 'vmsApp_vendor_search_doc'
+SEARCH_COLUMNS = ('name', 'address', 'contact_details')
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(text):
+    """
+    The words of a search query, what both the FTS5 and the fallback search match.
+    """
+    return _TERM.findall(text or '')
+
+
+class VendorSearchRepository:
+    """
+    Ranked vendor search. On SQLite the FTS5 index answers the query, every term
+    matching as a prefix and the results ranked by bm25 with `VENDOR_SEARCH_WEIGHTS`.
+    Other backends (or an SQLite build without FTS5) fall back to `icontains` filters,
+    ranked by where the first term appears in the name.
+    """
+
+    def fts_available(self, using=DEFAULT_DB_ALIAS):
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            return False
+        # Looked up once per connection, the schema does not change under a running process.
+        available = getattr(connection, 'vms_vendor_search', None)
+        if available is None:
+            with connection.cursor() as cursor:
+                available = SEARCH_TABLE in connection.introspection.table_names(cursor)
+            connection.vms_vendor_search = available
+        return available
+
+    def search_ranked(self, terms, position=None, backwards=False, limit=50, using=None):
+        """
+        Returns the `{uid, rank}` of the vendors matching all `terms` through the FTS5
+        index, `limit` at most, after `position` (`(rank, uid)`) in `(rank, uid)` order
+        or before it in reverse order when `backwards`.
+        """
+        using = using or router.db_for_read(Vendor)
+        query = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        weights = ', '.join(str(float(VENDOR_SEARCH_WEIGHTS[column])) for column in SEARCH_COLUMNS)
+        sql = (
+            f'SELECT uid, rank FROM (SELECT doc.uid AS uid, hits.rank AS rank '
+            f'FROM (SELECT rowid, bm25("{SEARCH_TABLE}", {weights}) AS rank '
+            f'FROM "{SEARCH_TABLE}" WHERE "{SEARCH_TABLE}" MATCH %s) hits '
+            f'JOIN "{SEARCH_DOC_TABLE}" doc ON doc.docid = hits.rowid)'
+        )
+        params = [query]
+        if position is not None:
+            lookup = '<' if backwards else '>'
+            sql += f' WHERE rank {lookup} %s OR (rank = %s AND uid {lookup} %s)'
+            params += [position[0], position[0], position[1].hex]
+        order = 'DESC' if backwards else 'ASC'
+        sql += f' ORDER BY rank {order}, uid {order} LIMIT %s'
+        params.append(limit)
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return [{'uid': uuid.UUID(uid), 'rank': rank} for uid, rank in cursor.fetchall()]
+
+    def search_fallback(self, terms):
+        """
+        The vendors matching all `terms` anywhere in their indexed columns, annotated with
+        a `rank`: 0 when the name starts with the first term, 1 when it contains it, 2 else.
+        """
+        matches = Q()
+        for term in terms:
+            any_column = Q()
+            for column in SEARCH_COLUMNS:
+                any_column |= Q(**{f'{column}__icontains': term})
+            matches &= any_column
+        return Vendor.objects.filter(matches).annotate(rank=Case(
+            When(name__istartswith=terms[0], then=Value(0)),
+            When(name__icontains=terms[0], then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        ))
+
+    def get_vendors(self, vendor_ids):
+        return Vendor.objects.filter(pk__in=vendor_ids)
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        """
+        Refills the FTS5 index from the vendor table and merges its segments, returns the
+        number of vendors indexed.
+        """
+        columns = ', '.join(SEARCH_COLUMNS)
+        vendor_columns = ', '.join(f'vendor.{column}' for column in SEARCH_COLUMNS)
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{SEARCH_TABLE}"')
+            cursor.execute(f'DELETE FROM "{SEARCH_DOC_TABLE}"')
+            cursor.execute(f'INSERT INTO "{SEARCH_DOC_TABLE}" (uid) SELECT uid FROM "{Vendor._meta.db_table}"')
+            cursor.execute(
+                f'INSERT INTO "{SEARCH_TABLE}" (rowid, {columns}) SELECT doc.docid, {vendor_columns} '
+                f'FROM "{SEARCH_DOC_TABLE}" doc JOIN "{Vendor._meta.db_table}" vendor ON vendor.uid = doc.uid'
+            )
+            count = cursor.rowcount
+            cursor.execute(f'INSERT INTO "{SEARCH_TABLE}" ("{SEARCH_TABLE}") VALUES (%s)', ['optimize'])
+        return count
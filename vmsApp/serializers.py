@@ -1,19 +1,386 @@
-from rest_framework import serializers
-from .models import Vendor, PurchaseOrder
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .models import Vendor, PurchaseOrder, PurchaseOrderLine, HistoricalPerformance, PerformanceRollup
+from .purchaseOrderStateMachine import can_change_status
+from .constants.appConstants import STATUS_CHOICES, PERFORMANCE_METRIC_FIELDS, PERFORMANCE_AGGREGATE_FIELDS, PURCHASE_ORDER_SORT_FIELDS, PURCHASE_ORDER_TRANSITIONS
+from .constants.appConstants import PERFORMANCE_HISTORY_BUCKETS, VENDOR_LEADERBOARD_SORT_FIELDS
+from .constants.appConstants import PURCHASE_ORDER_LINE_GROUPS, PURCHASE_ORDER_LINE_SUMMARY_SORT_FIELDS
 
-class VendorSerializer(serializers.ModelSerializer):
+def get_field_selection(field_names, fields=None, exclude=None):
+    """
+    Parses the comma separated `?fields=` / `?exclude=` query parameters against the
+    available `field_names`.
+
+    Returns the selected names in output order, or None when neither parameter is
+    given. Unknown names, or both parameters at once, raise `ValidationError`.
+    """
+    if fields is None and exclude is None:
+        return None
+    if fields is not None and exclude is not None:
+        raise serializers.ValidationError({'fields': 'fields and exclude cannot be combined'})
+    param, value = ('fields', fields) if fields is not None else ('exclude', exclude)
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names.difference(field_names)
+    if unknown:
+        raise serializers.ValidationError({param: f"Unknown fields: {', '.join(sorted(unknown))}"})
+    if param == 'fields':
+        return [name for name in field_names if name in names]
+    return [name for name in field_names if name not in names]
+
+
+class SparseFieldsMixin:
+    """
+    Lets a serializer be restricted to a subset of its fields with the `fields`
+    keyword argument, e.g. `PurchaseOrderSerializer(po, fields=['uid', 'status'])`.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields).difference(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, fields=None, exclude=None):
+        """
+        Returns the field names selected by the `fields` / `exclude` query parameters,
+        see `get_field_selection`.
+        """
+        return get_field_selection(list(cls().fields), fields, exclude)
+
+
+class VendorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vendor
-        fields = '__all__' 
+        # The running aggregates are internal, the API exposes the metrics derived from them.
+        exclude = PERFORMANCE_AGGREGATE_FIELDS
+        read_only_fields = PERFORMANCE_METRIC_FIELDS
 
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+class PurchaseOrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
   class Meta:
     model = PurchaseOrder
     fields = '__all__'
 
+  def validate_status(self, value):
+    # Purchase orders may be created in any status, only later changes follow the state machine.
+    if self.instance is not None and not can_change_status(self.instance.status, value):
+      raise serializers.ValidationError(f'A {self.instance.status} purchase order cannot become {value}')
+    return value
+
+
+class PurchaseOrderBulkSerializer(PurchaseOrderSerializer):
+  """
+  Validates one purchase order of a bulk create without resolving the vendor, so a
+  batch can check all of its vendors with a single query.
+  """
+  vendor = serializers.UUIDField()
+
+
+class QualityRatingSerializer(serializers.Serializer):
+    quality_rating = serializers.FloatField()
+
+
+class PurchaseOrderTransitionSerializer(serializers.Serializer):
+    """
+    Validates one entry of a batch transition: `{po_id, action, payload}`.
+    The `rate` action expects `{"quality_rating": <float>}` as payload.
+    """
+    po_id = serializers.UUIDField()
+    action = serializers.ChoiceField(choices=PURCHASE_ORDER_TRANSITIONS)
+    payload = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['action'] == 'rate':
+            rating = QualityRatingSerializer(data=attrs['payload'])
+            if not rating.is_valid():
+                raise serializers.ValidationError({'payload': rating.errors})
+            attrs['payload'] = rating.validated_data
+        return attrs
+
+
+class PurchaseOrderLineSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PurchaseOrderLine
+        fields = ('uid', 'purchase_order', 'vendor', 'position', 'sku', 'description', 'quantity', 'unit_price', 'created_at')
+
 
-class VendorPerformanceSerializer(serializers.ModelSerializer):
+class VendorPerformanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vendor
         fields = ('on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
+
+
+class HistoricalPerformanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HistoricalPerformance
+        fields = ('date',) + PERFORMANCE_METRIC_FIELDS
+
+
+class PerformanceRollupSerializer(serializers.ModelSerializer):
+    """
+    One bucket of vendor performance history: the average, min and max of each metric
+    over the `samples` snapshots taken in the period starting at `date`. The averages
+    are annotated by `PerformanceHistoryRepository.get_rollups()`.
+    """
+    date = serializers.DateTimeField(source='period_start', read_only=True)
+    on_time_delivery_rate = serializers.FloatField(read_only=True)
+    quality_rating_avg = serializers.FloatField(read_only=True)
+    average_response_time = serializers.FloatField(read_only=True)
+    fulfillment_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = PerformanceRollup
+        fields = ('date', 'samples') + tuple(
+            f'{metric}{suffix}' for metric in PERFORMANCE_METRIC_FIELDS for suffix in ('', '_min', '_max')
+        )
+
+
+class PerformanceHistoryQuerySerializer(serializers.Serializer):
+    """
+    Validates the performance history query parameters: `bucket` and the inclusive
+    `from` / `to` bounds.
+    """
+    bucket = serializers.ChoiceField(choices=PERFORMANCE_HISTORY_BUCKETS, required=False, default='day')
+
+    def get_fields(self):
+        # `from` is a Python keyword, it cannot be declared as a class attribute.
+        fields = super().get_fields()
+        fields['from'] = serializers.DateTimeField(required=False)
+        fields['to'] = serializers.DateTimeField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        if 'from' in attrs and 'to' in attrs and attrs['from'] > attrs['to']:
+            raise serializers.ValidationError({'from': 'from must not be after to'})
+        return attrs
+
+
+class QueryFilterSerializer(serializers.Serializer):
+    """
+    Base class for serializers validating list/export query parameters.
+
+    Fields map to ORM lookups of the same name, `<field>_from`/`<field>_to` to inclusive
+    ranges on `<field>`, and `updated_since` to `updated_at >=`.
+    """
+    updated_since = serializers.DateTimeField(required=False)
+
+    RANGE_LOOKUPS = {'_from': 'gte', '_to': 'lte'}
+    NON_FILTER_FIELDS = ('sort',)
+
+    def get_lookups(self):
+        """
+        Returns the ORM filter lookups for the validated parameters.
+        """
+        lookups = {}
+        for name, value in self.validated_data.items():
+            if name in self.NON_FILTER_FIELDS:
+                continue
+            if name == 'updated_since':
+                lookups['updated_at__gte'] = value
+                continue
+            if name == 'acknowledged':
+                lookups['acknowledgment_date__isnull'] = not value
+                continue
+            for suffix, lookup in self.RANGE_LOOKUPS.items():
+                if name.endswith(suffix):
+                    lookups[f'{name[:-len(suffix)]}__{lookup}'] = value
+                    break
+            else:
+                lookups[name] = value
+        return lookups
+
+
+class VendorFilterSerializer(QueryFilterSerializer):
+    pass
+
+
+class VendorLeaderboardFilterSerializer(VendorFilterSerializer):
+    """
+    Validates the vendor leaderboard query parameters: `sort` on a performance metric or
+    `total_pos`, and thresholds on each of them with the `_min`/`_max` (inclusive) and
+    `_gt`/`_lt` (exclusive) suffixes, e.g. `?total_pos_min=100&fulfillment_rate_lt=80`.
+    """
+    sort = serializers.ChoiceField(
+        choices=VENDOR_LEADERBOARD_SORT_FIELDS, required=False, default='-on_time_delivery_rate',
+    )
+
+    RANGE_LOOKUPS = {'_min': 'gte', '_max': 'lte', '_gt': 'gt', '_lt': 'lt'}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in PERFORMANCE_METRIC_FIELDS + ('total_pos',):
+            field_class = serializers.IntegerField if name == 'total_pos' else serializers.FloatField
+            for suffix in self.RANGE_LOOKUPS:
+                fields[f'{name}{suffix}'] = field_class(required=False)
+        return fields
+
+
+class VendorSearchQuerySerializer(serializers.Serializer):
+    """
+    Validates the vendor search query `q`, which must hold at least one word.
+    """
+    q = serializers.CharField(max_length=200)
+
+    def validate_q(self, value):
+        from .repository.vendorSearchRepo import search_terms
+        if not search_terms(value):
+            raise serializers.ValidationError('The search query must contain at least one word')
+        return value
+
+
+class PurchaseOrderFilterSerializer(QueryFilterSerializer):
+    """
+    Validates the query parameters filtering and sorting the purchase order list.
+    Date ranges are inclusive, `acknowledged` selects POs with or without an
+    acknowledgment date.
+    """
+    vendor = serializers.UUIDField(required=False)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+    acknowledged = serializers.BooleanField(required=False)
+    order_date_from = serializers.DateTimeField(required=False)
+    order_date_to = serializers.DateTimeField(required=False)
+    issue_date_from = serializers.DateTimeField(required=False)
+    issue_date_to = serializers.DateTimeField(required=False)
+    delivery_date_from = serializers.DateTimeField(required=False)
+    delivery_date_to = serializers.DateTimeField(required=False)
+    sort = serializers.ChoiceField(choices=PURCHASE_ORDER_SORT_FIELDS, required=False, default='created_at')
+
+
+class PurchaseOrderLineFilterSerializer(QueryFilterSerializer):
+    """
+    Validates the query parameters filtering purchase order lines. `status` filters on the
+    status of the purchase order, e.g. `?sku=SKU-1&status=pending` for the open orders
+    containing an item.
+    """
+    sku = serializers.CharField(required=False, max_length=100)
+    vendor = serializers.UUIDField(required=False)
+    purchase_order = serializers.UUIDField(required=False)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False, source='purchase_order__status')
+
+
+class PurchaseOrderLineSummaryFilterSerializer(PurchaseOrderLineFilterSerializer):
+    """
+    Adds the grouping (`sku`, `vendor` or `vendor,sku`) and the order of the line summary.
+    """
+    group_by = serializers.ChoiceField(choices=PURCHASE_ORDER_LINE_GROUPS, required=False, default='sku')
+    sort = serializers.ChoiceField(choices=PURCHASE_ORDER_LINE_SUMMARY_SORT_FIELDS, required=False, default='-total_quantity')
+
+    NON_FILTER_FIELDS = ('sort', 'group_by')
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path producing the same output as a ModelSerializer from
+    `QuerySet.values()` rows.
+
+    Rows are never turned into model instances and the DRF field machinery does not
+    run per row: every field gets a plain converter (UUID, datetime, float, ...)
+    compiled once per call. Field types without a dedicated converter fall back to
+    the serializer field's own `to_representation`.
+
+    `select()` returns a copy limited to some fields, whose `values()` only reads
+    their columns.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        self.serializer_class = serializer_class
+        self._fields = fields
+
+    @property
+    def fields(self):
+        """
+        `(name, source, serializer field)` of every readable field, in output order.
+        """
+        if self._fields is None:
+            self._fields = [
+                (name, field.source, field)
+                for name, field in self.serializer_class().fields.items()
+                if not field.write_only
+            ]
+        return self._fields
+
+    @property
+    def field_names(self):
+        return [name for name, _, _ in self.fields]
+
+    @property
+    def sources(self):
+        return [source for _, source, _ in self.fields]
+
+    def select(self, fields=None, exclude=None):
+        """
+        Returns a ValuesSerializer limited to the fields selected by the `fields` /
+        `exclude` query parameters, or self when neither is given.
+        """
+        selected = get_field_selection(self.field_names, fields, exclude)
+        if selected is None:
+            return self
+        return ValuesSerializer(self.serializer_class, [field for field in self.fields if field[0] in selected])
+
+    def values(self, queryset, *extra):
+        """
+        Returns `queryset.values()` of the serialized fields, plus the `extra` columns
+        needed by the caller (e.g. the pagination key) which are not serialized.
+        """
+        sources = self.sources
+        return queryset.values(*sources, *(column for column in extra if column not in sources))
+
+    def serialize(self, rows):
+        """
+        Serializes an iterable of `values()` rows to a list of dicts.
+        """
+        converters = self.compile()
+        return [
+            {name: None if row[source] is None else convert(row[source]) for name, source, convert in converters}
+            for row in rows
+        ]
+
+    def iter_serialize(self, rows):
+        """
+        Same as `serialize()`, one row at a time.
+        """
+        converters = self.compile()
+        for row in rows:
+            yield {name: None if row[source] is None else convert(row[source]) for name, source, convert in converters}
+
+    def compile(self):
+        return [(name, source, self._converter(field)) for name, source, field in self.fields]
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # values() already holds the related primary key, which is what DRF outputs.
+            return lambda value: value
+        if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+            return str
+        if isinstance(field, serializers.DateTimeField) and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601:
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            if field_timezone is None:
+                return field.to_representation
+
+            def convert_datetime(value):
+                if timezone.is_naive(value):
+                    return field.to_representation(value)
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return convert_datetime
+        if isinstance(field, serializers.FloatField):
+            return float
+        if isinstance(field, serializers.IntegerField):
+            return int
+        if isinstance(field, serializers.ChoiceField):
+            return lambda value: field.choice_strings_to_values.get(str(value), value) if value != '' else value
+        if isinstance(field, serializers.CharField):
+            return str
+        if isinstance(field, serializers.JSONField) and not field.binary:
+            return lambda value: value
+        return field.to_representation
+
+
+FastVendorSerializer = ValuesSerializer(VendorSerializer)
+FastPurchaseOrderSerializer = ValuesSerializer(PurchaseOrderSerializer)
+FastHistoricalPerformanceSerializer = ValuesSerializer(HistoricalPerformanceSerializer)
+FastPerformanceRollupSerializer = ValuesSerializer(PerformanceRollupSerializer)
+FastPurchaseOrderLineSerializer = ValuesSerializer(PurchaseOrderLineSerializer)
@@ -1,15 +1,28 @@
 # import modules
 from rest_framework import status
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from ..models import PurchaseOrder
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound
-from ..serializers import PurchaseOrderSerializer
+from rest_framework.exceptions import NotFound, ValidationError
+from ..constants.appConstants import BULK_MAX_ITEMS
+from ..serializers import PurchaseOrderTransitionSerializer, QualityRatingSerializer
 from ..repository.purchaseOrderRepo import PurchasedOrderRepository
 from ..repository.vendorRepo import VendorRepository
+from ..metricsWorker import submit_performance_deltas, record_performance_snapshots
+from ..readCache import invalidate_purchase_orders
+from ..purchaseOrderStateMachine import TRANSITIONS, InvalidTransition, update_values
+from ..writeCoordinator import coordinated_write
+
+
+class TransitionConflictError(Exception):
+    """
+    Raised when a purchase order changed concurrently while a batch transition was applied.
+    """
 
 
-    
 
 class CommonService:
     """
@@ -30,6 +43,45 @@ class CommonService:
         self.po_repo = PurchasedOrderRepository()
         self.vendor_repo = VendorRepository()
     
+    @coordinated_write
+    def transition(self, po_id, action, payload=None):
+        """
+        Applies one state machine transition (see `purchaseOrderStateMachine`) to a
+        purchase order.
+
+        In one transaction the purchase order row is locked and the action checked
+        against it, then it is written with a single conditional UPDATE and its vendor
+        aggregates are adjusted by a single delta.
+
+        Output:
+            PurchaseOrder: The updated purchase order. Raises `NotFound`, `InvalidTransition`
+            when the action is not allowed, or `TransitionConflictError` when the row
+            changed concurrently.
+        """
+        transition = TRANSITIONS[action]
+        now = timezone.now()
+        with transaction.atomic():
+            purchase_order = self.po_repo.get_purchased_order_for_update(po_id)
+            if purchase_order is None:
+                raise NotFound(f'Purchase order {po_id} not found')
+            previous = purchase_order.performance_state()
+            transition.apply(purchase_order, payload, now)
+            purchase_order.updated_at = now
+            values = {field: getattr(purchase_order, field) for field in transition.fields}
+            if not self.po_repo.update_purchased_orders(
+                [purchase_order.pk], transition.guard, updated_at=now, version=F('version') + 1, **values,
+            ):
+                raise TransitionConflictError('Purchase order changed concurrently, the transition was not applied')
+            purchase_order.version += 1
+            current = purchase_order.performance_state()
+            deltas = PurchaseOrder.performance_deltas(previous, current)
+            submit_performance_deltas(deltas)
+            invalidate_purchase_orders([purchase_order.pk], deltas.keys())
+            if transition.snapshot:
+                record_performance_snapshots({purchase_order.vendor_id})
+        purchase_order._performance_state = current
+        return purchase_order
+
     def get_acknowledged_purchase_orders(self, po_id):
         """
         Acknowledges a purchase order by its ID.
@@ -37,20 +89,10 @@ class CommonService:
         This function handles acknowledging a purchase order with the provided `po_id`.
         """
         try:
-            purchase_order = self.po_repo.get_purchased_order_by_id(po_id)
-            if purchase_order.acknowledgment_date is not None:
-                return Response({'message': 'Purchase order already acknowledged', 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
-
-             # Update acknowledgment date
-            purchase_order.acknowledgment_date = timezone.now()
-            purchase_order.save()
-
-            # Trigger vendor performance recalculation
-            purchase_order.vendor.calculate_performance_metrics()
-            purchase_order.vendor.save()              
-            return 1
-        except Exception as e:
-            raise None
+            self.transition(po_id, 'acknowledge')
+        except InvalidTransition as e:
+            return Response({'message': str(e), 'status': 400}, status=status.HTTP_400_BAD_REQUEST)
+        return 1
 
     def completed_purchase_orders(self, po_id):
         """
@@ -58,41 +100,111 @@ class CommonService:
 
         This function handles marking a purchase order with the provided `po_id` as completed.
         """
-        try:            
-            purchase_order = self.po_repo.get_purchased_order_by_id(po_id)
-            if purchase_order.status != 'pending':
-                return Response({'message': 'Purchase order already completed or cancelled'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            purchase_order.status = 'completed'
-            purchase_order.save()
-
-            
-            # Trigger performance metric recalculation for the vendor
-            purchase_order.vendor.calculate_performance_metrics()
-            purchase_order.vendor.save_performance_history()
-            return 1
-        except Exception as e:
-            raise None
-    
+        try:
+            self.transition(po_id, 'complete')
+        except InvalidTransition as e:
+            return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return 1
+
     def update_quality_rating(self, po_id, data):
         """
         Updates the quality rating of a purchase order.
 
         This function handles updating the quality rating of a purchase order with the provided
-        `po_id`. It expects the quality rating information in the request data (`data`).
+        `po_id`. It expects the quality rating information in the request data (`data`), an
+        invalid rating raises `ValidationError`.
         """
+        rating = QualityRatingSerializer(data=data)
+        rating.is_valid(raise_exception=True)
         try:
-            purchase_order = self.po_repo.get_purchased_order_by_id(po_id)
-            if purchase_order.status != 'completed':
-                return Response({'message': 'Cannot update quality rating for non-completed PO'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Update quality rating and potentially other fields
-            purchase_order.quality_rating = data.get('quality_rating')
-            purchase_order.save()
-
-            # Trigger performance metric recalculation for the vendor
-            purchase_order.vendor.calculate_performance_metrics()
-            purchase_order.vendor.save_performance_history()
-            return 1
-        except Exception as e:
-            raise None
\ No newline at end of file
+            self.transition(po_id, 'rate', rating.validated_data)
+        except InvalidTransition as e:
+            return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return 1
+
+    @coordinated_write
+    def apply_transitions(self, entries, atomic=False):
+        """
+        Applies a batch of purchase order transitions in one transaction.
+
+        Each entry is `{po_id, action, payload}` with action `acknowledge`, `complete`,
+        `cancel` or `rate`. Entries are checked in order against the state left by the
+        previous ones, then written with one conditional UPDATE per action. Every affected vendor gets a
+        single metrics update, and a single history snapshot when one of its orders was
+        completed or rated (as the single order endpoints do).
+
+        Args:
+            entries (list): The transitions to apply.
+            atomic (bool): When set, nothing is applied if any entry fails.
+
+        Output:
+            list: One `{index, po_id, action, status, message}` outcome per entry, status
+            being `ok` or `error`. A malformed payload raises `ValidationError`, a
+            concurrent change raises `TransitionConflictError` and rolls everything back.
+        """
+        max_items = getattr(settings, 'VMS_BULK_MAX_ITEMS', BULK_MAX_ITEMS)
+        if not isinstance(entries, list):
+            raise ValidationError({'transitions': 'Expected a list of transitions'})
+        if len(entries) > max_items:
+            raise ValidationError({'transitions': f'A batch accepts at most {max_items} transitions'})
+
+        outcomes, valid = [], []
+        for index, entry in enumerate(entries):
+            serializer = PurchaseOrderTransitionSerializer(data=entry)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+                outcome = {'index': index, 'po_id': serializer.validated_data['po_id'], 'status': 'ok', 'message': None}
+            else:
+                outcome = {'index': index, 'po_id': entry.get('po_id') if isinstance(entry, dict) else None, 'status': 'error', 'message': serializer.errors}
+            outcome['action'] = entry.get('action') if isinstance(entry, dict) else None
+            outcomes.append(outcome)
+
+        now = timezone.now()
+        with transaction.atomic():
+            orders = self.po_repo.get_purchased_orders_for_update({data['po_id'] for _, data in valid})
+            applied = {action: {} for action in TRANSITIONS}
+            for index, data in valid:
+                purchase_order = orders.get(data['po_id'])
+                if purchase_order is None:
+                    outcomes[index].update(status='error', message='Purchase order not found')
+                    continue
+                try:
+                    TRANSITIONS[data['action']].apply(purchase_order, data['payload'], now)
+                except InvalidTransition as e:
+                    outcomes[index].update(status='error', message=str(e))
+                    continue
+                outcomes[index]['message'] = f"Purchase order {data['action']} applied"
+                applied[data['action']][purchase_order.pk] = purchase_order
+
+            failed = any(outcome['status'] == 'error' for outcome in outcomes)
+            if atomic and failed:
+                for outcome in outcomes:
+                    if outcome['status'] == 'ok':
+                        outcome.update(status='skipped', message='Batch rejected, nothing was applied')
+                return outcomes
+
+            # In TRANSITIONS order, so a purchase order completed and rated in the same
+            # batch is completed before the rating guard checks its status.
+            for action, purchase_orders in applied.items():
+                if not purchase_orders:
+                    continue
+                transition = TRANSITIONS[action]
+                updated = self.po_repo.update_purchased_orders(
+                    purchase_orders, transition.guard, updated_at=now, version=F('version') + 1,
+                    **update_values(transition, list(purchase_orders.values())),
+                )
+                if updated != len(purchase_orders):
+                    raise TransitionConflictError('Purchase orders changed concurrently, no transition was applied')
+
+            touched = {pk: purchase_order for purchase_orders in applied.values() for pk, purchase_order in purchase_orders.items()}
+            deltas = PurchaseOrder.combined_performance_deltas(
+                (purchase_order._performance_state, purchase_order.performance_state()) for purchase_order in touched.values()
+            )
+            submit_performance_deltas(deltas)
+            invalidate_purchase_orders(list(touched), deltas.keys())
+            record_performance_snapshots({
+                purchase_order.vendor_id
+                for action, purchase_orders in applied.items() if TRANSITIONS[action].snapshot
+                for purchase_order in purchase_orders.values()
+            })
+        return outcomes
@@ -0,0 +1,67 @@
+# import modules
+from django.conf import settings
+from ..constants.appConstants import EXPORT_CHUNK_SIZE
+from ..serializers import FastPurchaseOrderSerializer, FastVendorSerializer
+from ..serializers import PurchaseOrderFilterSerializer, VendorFilterSerializer
+from ..repository.purchaseOrderRepo import PurchasedOrderRepository
+from ..repository.vendorRepo import VendorRepository
+from ..dbRouter import replica_read
+
+
+class ExportService:
+    """
+    Service class for bulk exports of purchase orders and vendors.
+
+    Rows are read as `values()` with `QuerySet.iterator()` and serialized one at a time,
+    so the memory used by an export does not grow with the number of rows.
+    """
+
+    def __init__(self):
+        """
+        Initializes the ExportService instance.
+
+        This constructor establishes connections with the `PurchasedOrderRepository`
+        and `VendorRepository` instances.
+        """
+        self.po_repo = PurchasedOrderRepository()
+        self.vendor_repo = VendorRepository()
+        self.chunk_size = getattr(settings, 'VMS_EXPORT_CHUNK_SIZE', EXPORT_CHUNK_SIZE)
+
+    @replica_read
+    def export_purchase_orders(self, filters=None):
+        """
+        Prepares an export of the purchase orders matching `filters`, which accepts the
+        purchase order list filters plus `updated_since`, and `fields` / `exclude` to
+        choose the exported columns.
+
+        Output:
+            tuple: `(fieldnames, rows)` where `rows` lazily yields serialized purchase orders.
+            Invalid filters raise `ValidationError` before anything is read.
+        """
+        filter_serializer = PurchaseOrderFilterSerializer(data=filters or {})
+        filter_serializer.is_valid(raise_exception=True)
+        queryset = self.po_repo.filter_purchased_orders(**filter_serializer.get_lookups())
+        queryset = queryset.order_by(filter_serializer.validated_data['sort'], 'uid')
+        return self._export(queryset, FastPurchaseOrderSerializer, filters)
+
+    @replica_read
+    def export_vendors(self, filters=None):
+        """
+        Prepares an export of all vendors, optionally only those changed since `updated_since`,
+        with the columns chosen by `fields` / `exclude`.
+
+        Output:
+            tuple: `(fieldnames, rows)` where `rows` lazily yields serialized vendors.
+        """
+        filter_serializer = VendorFilterSerializer(data=filters or {})
+        filter_serializer.is_valid(raise_exception=True)
+        queryset = self.vendor_repo.get_all_vendors().filter(**filter_serializer.get_lookups())
+        return self._export(queryset.order_by('created_at', 'uid'), FastVendorSerializer, filters)
+
+    def _export(self, queryset, serializer, filters):
+        filters = filters or {}
+        serializer = serializer.select(filters.get('fields'), filters.get('exclude'))
+        # The rows are read after the export method returned, fix the database now.
+        queryset = queryset.using(queryset.db)
+        rows = serializer.values(queryset).iterator(chunk_size=self.chunk_size)
+        return serializer.field_names, serializer.iter_serialize(rows)
@@ -1,7 +1,20 @@
 # import modules
-from ..models import PurchaseOrder
-from ..serializers import PurchaseOrderSerializer
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from ..models import PurchaseOrder, PurchaseOrderLine, VersionConflict
+from ..metricsWorker import submit_performance_deltas
+from ..constants.appConstants import BULK_MAX_ITEMS, LINE_BACKFILL_CHUNK_SIZE
+from ..serializers import PurchaseOrderSerializer, PurchaseOrderFilterSerializer, PurchaseOrderBulkSerializer
+from ..serializers import FastPurchaseOrderSerializer, FastPurchaseOrderLineSerializer
+from ..serializers import PurchaseOrderLineFilterSerializer, PurchaseOrderLineSummaryFilterSerializer
 from ..repository.purchaseOrderRepo import PurchasedOrderRepository
+from ..repository.vendorRepo import VendorRepository
+from ..repository.purchaseOrderLineRepo import PurchaseOrderLineRepository
+from ..pagination import KeysetPaginator, get_page_size
+from ..readCache import read_cache, invalidate_purchase_orders, purchase_order_list_namespaces
+from ..dbRouter import replica_read
+from ..writeCoordinator import coordinated_write
 
 
 class PurhaseOrderService:
@@ -18,25 +31,118 @@ class PurhaseOrderService:
         This constructor establishes a connection with the `PurchasedOrderRepository` instance.
         """
         self.po_repo = PurchasedOrderRepository()
+        self.vendor_repo = VendorRepository()
+        self.line_repo = PurchaseOrderLineRepository()
 
-    def get_all_orders(self):
+    @replica_read
+    def get_all_orders(self, filters=None, cursor=None, page_size=None, fields=None, exclude=None):
         """
-        Retrieves all purchase orders.
+        Retrieves one page of purchase orders.
 
-        This function retrieves a list of all purchase orders from the repository.
+        This function retrieves the page of purchase orders following `cursor` (the first
+        page when None), filtered and sorted by the query parameters in `filters`
+        (see `PurchaseOrderFilterSerializer`), ordered by creation time by default.
+        `fields` / `exclude` (comma separated names) limit the serialized fields and the
+        columns read, so e.g. the `items` JSON is not loaded unless it is requested.
         Output:
-            list or None:
-                On success, it returns a list of purchase orders in a format suitable for serialization
-                (likely a dictionary representation).
-                On failure, it returns None. Consider returning a more informative value or raising an exception.
-        """
-        try:        
-            po_list = self.po_repo.get_all_purchased_orders() #.order_by('-created_at')
-            serializer = PurchaseOrderSerializer(po_list, many=True)
-            return serializer.data
+            dict or None:
+                On success, it returns a dictionary with the serialized purchase orders under
+                `results` and the `next`/`prev` page cursors.
+                Invalid filters, cursor, page size or field selection raise `ValidationError`.
+                On other failures, it returns None.
+        """
+        try:
+            filter_serializer = PurchaseOrderFilterSerializer(data=filters or {})
+            filter_serializer.is_valid(raise_exception=True)
+            po_list = self.po_repo.filter_purchased_orders(**filter_serializer.get_lookups())
+
+            paginator = KeysetPaginator(filter_serializer.validated_data['sort'], get_page_size(page_size))
+            serializer = FastPurchaseOrderSerializer.select(fields, exclude)
+
+            def load():
+                page, next_cursor, prev_cursor = paginator.paginate(serializer.values(po_list, paginator.field, 'uid'), cursor)
+                return {'results': serializer.serialize(page), 'next': next_cursor, 'prev': prev_cursor}
+
+            return read_cache.get_or_load(
+                'purchase_order_list',
+                purchase_order_list_namespaces(filter_serializer.validated_data),
+                {
+                    'filters': filter_serializer.validated_data,
+                    'cursor': cursor,
+                    'page_size': paginator.page_size,
+                    'fields': serializer.field_names,
+                },
+                load,
+            )
+        except ValidationError:
+            raise
         except Exception as e:
             return None
     
+    @replica_read
+    async def aget_all_orders(self, filters=None, cursor=None, page_size=None, fields=None, exclude=None):
+        """
+        Async counterpart of `get_all_orders()`, sharing its cache entries.
+        """
+        try:
+            filter_serializer = PurchaseOrderFilterSerializer(data=filters or {})
+            filter_serializer.is_valid(raise_exception=True)
+            po_list = self.po_repo.filter_purchased_orders(**filter_serializer.get_lookups())
+
+            paginator = KeysetPaginator(filter_serializer.validated_data['sort'], get_page_size(page_size))
+            serializer = FastPurchaseOrderSerializer.select(fields, exclude)
+
+            async def load():
+                page, next_cursor, prev_cursor = await paginator.apaginate(serializer.values(po_list, paginator.field, 'uid'), cursor)
+                return {'results': serializer.serialize(page), 'next': next_cursor, 'prev': prev_cursor}
+
+            return await read_cache.aget_or_load(
+                'purchase_order_list',
+                purchase_order_list_namespaces(filter_serializer.validated_data),
+                {
+                    'filters': filter_serializer.validated_data,
+                    'cursor': cursor,
+                    'page_size': paginator.page_size,
+                    'fields': serializer.field_names,
+                },
+                load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+    @replica_read
+    def get_order_state(self, order_id):
+        """
+        Returns `(last_modified, version)` of a purchase order with a two column query,
+        or None when it does not exist.
+        """
+        return self.po_repo.get_purchased_order_state(order_id)
+
+    @replica_read
+    async def aget_order_state(self, order_id):
+        return await self.po_repo.aget_purchased_order_state(order_id)
+
+    @replica_read
+    def get_orders_last_modified(self, filters=None):
+        """
+        Returns `(max(updated_at), count)` of the purchase orders matching `filters`,
+        or None when the filters are invalid.
+        """
+        filter_serializer = PurchaseOrderFilterSerializer(data=filters or {})
+        if not filter_serializer.is_valid():
+            return None
+        return self.po_repo.get_purchased_orders_last_modified(**filter_serializer.get_lookups())
+
+    @replica_read
+    async def aget_orders_last_modified(self, filters=None):
+        filter_serializer = PurchaseOrderFilterSerializer(data=filters or {})
+        if not filter_serializer.is_valid():
+            return None
+        return await self.po_repo.aget_purchased_orders_last_modified(**filter_serializer.get_lookups())
+
+    @coordinated_write
     def create_order(self, data):
         """
         Creates a new purchase order.
@@ -63,7 +169,63 @@ class PurhaseOrderService:
         except Exception as e:
             return None
     
-    def get_purchase_order_detail(self, order_id):
+    @coordinated_write
+    def bulk_create_orders(self, orders, atomic=False):
+        """
+        Creates many purchase orders at once.
+
+        The whole batch is validated with a single vendor lookup, the valid orders are
+        inserted with one `bulk_create` in a transaction, and the performance metrics of
+        each affected vendor are updated once.
+
+        Args:
+            orders (list): A list of purchase order dictionaries.
+            atomic (bool): When set, nothing is created if any order is invalid.
+
+        Output:
+            dict: `created` (serialized purchase orders) and `errors`, a list of
+            `{'index': position in the batch, 'errors': validation errors}`.
+            A payload that is not a list, or too large, raises `ValidationError`.
+        """
+        max_items = getattr(settings, 'VMS_BULK_MAX_ITEMS', BULK_MAX_ITEMS)
+        if not isinstance(orders, list):
+            raise ValidationError({'orders': 'Expected a list of purchase orders'})
+        if len(orders) > max_items:
+            raise ValidationError({'orders': f'A bulk request accepts at most {max_items} purchase orders'})
+
+        errors, valid = [], []
+        for index, data in enumerate(orders):
+            serializer = PurchaseOrderBulkSerializer(data=data)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        vendor_ids = self.vendor_repo.get_existing_vendor_ids({data['vendor'] for _, data in valid})
+        instances = []
+        for index, data in valid:
+            vendor_id = data.pop('vendor')
+            if vendor_id not in vendor_ids:
+                errors.append({'index': index, 'errors': {'vendor': [f'Invalid pk "{vendor_id}" - object does not exist.']}})
+                continue
+            instances.append(PurchaseOrder(vendor_id=vendor_id, **data))
+        errors.sort(key=lambda error: error['index'])
+
+        if not instances or (atomic and errors):
+            return {'created': [], 'errors': errors}
+
+        deltas = PurchaseOrder.combined_performance_deltas(
+            (None, instance.performance_state()) for instance in instances
+        )
+        with transaction.atomic():
+            created = self.po_repo.bulk_create_purchased_orders(instances)
+            PurchaseOrderLine.replace(((po.pk, po.vendor_id, po.items) for po in created), created=True)
+            submit_performance_deltas(deltas)
+            invalidate_purchase_orders([instance.pk for instance in created], deltas.keys())
+        return {'created': PurchaseOrderSerializer(created, many=True).data, 'errors': errors}
+
+    @replica_read
+    def get_purchase_order_detail(self, order_id, fields=None, exclude=None):
         """
         Retrieves a specific purchase order.
 
@@ -71,6 +233,8 @@ class PurhaseOrderService:
 
         Args:
             order_id (int): The ID of the purchase order to retrieve.
+            fields, exclude (str): Optional comma separated field names limiting the
+                serialized fields and the columns loaded.
 
         Output:
             dict or None:
@@ -78,46 +242,85 @@ class PurhaseOrderService:
                 the retrieved purchase order details.
                 On failure (including cases where the purchase order is not found), it returns None.
                 Consider returning a more informative value (e.g., a specific exception).
+                An invalid field selection raises `ValidationError`.
         """
         try:
-            po = self.po_repo.get_purchased_order_by_id(order_id)
-            if not po:
-                return f"Purchased order for id {order_id} not found"
-            serializer = PurchaseOrderSerializer(po)
-            return serializer.data
+            selected = PurchaseOrderSerializer.select_fields(fields, exclude)
+
+            def load():
+                po = self.po_repo.get_purchased_order_by_id(order_id, fields=selected)
+                if not po:
+                    return f"Purchased order for id {order_id} not found"
+                serializer = PurchaseOrderSerializer(po, fields=selected)
+                return serializer.data
+
+            return read_cache.get_or_load(
+                'purchase_order_detail', [f'po:{order_id}'], {'po': order_id, 'fields': selected}, load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+    @replica_read
+    async def aget_purchase_order_detail(self, order_id, fields=None, exclude=None):
+        """
+        Async counterpart of `get_purchase_order_detail()`, sharing its cache entries.
+        """
+        try:
+            selected = PurchaseOrderSerializer.select_fields(fields, exclude)
+
+            async def load():
+                po = await self.po_repo.aget_purchased_order_by_id(order_id, fields=selected)
+                return PurchaseOrderSerializer(po, fields=selected).data
+
+            return await read_cache.aget_or_load(
+                'purchase_order_detail', [f'po:{order_id}'], {'po': order_id, 'fields': selected}, load,
+            )
+        except ValidationError:
+            raise
         except Exception as e:
             return None
     
-    def update_order(self, order_id, data):
+    @coordinated_write
+    def update_order(self, order_id, data, expected_version=None):
         """
         Updates a purchase order.
 
         This function updates a purchase order with the provided `order_id` based on the given data.
+        The row is only written while its version is still the one read here, which
+        must be `expected_version` when given, otherwise `VersionConflict` is raised.
 
         Args:
             order_id (int): The ID of the purchase order to update.
             data (dict): A dictionary containing update information for the purchase order.
+            expected_version (int): The version the client based its update on.
 
         Output:
-            dict or None:
-                On success (if the purchase order is found and updated), it returns a dictionary
-                representing the updated purchase order details.
+            PurchaseOrderSerializer or None:
+                On success (if the purchase order is found and updated), it returns the serializer
+                of the updated purchase order.
                 On failure (including cases where the purchase order is not found or update fails),
                 it returns None. Consider returning a more informative value (e.g., validation errors).
         """
         try:
             po = self.po_repo.get_purchased_order_by_id(order_id)
             if not po:
-                return f"Purchased order for id {order_id} not found"
+                return None
+            if expected_version is not None and po.version != expected_version:
+                raise VersionConflict(f'PurchaseOrder {order_id} is no longer at version {expected_version}')
             serializer = PurchaseOrderSerializer(po, data=data)
             if serializer.is_valid():
                 serializer.save()
-                return serializer.data
+                return serializer
             else:
                 return None
+        except VersionConflict:
+            raise
         except Exception as e:
             return None
         
+    @coordinated_write
     def delete_order(self, order_id):
         """
         Deletes a purchase order.
@@ -140,3 +343,111 @@ class PurhaseOrderService:
             return delete_po
         except Exception as e:
             return None
+
+    @replica_read
+    def get_order_lines(self, filters=None, cursor=None, page_size=None, fields=None, exclude=None):
+        """
+        Retrieves one page of purchase order lines, the normalized entries of the orders'
+        `items`, filtered by `filters` (see `PurchaseOrderLineFilterSerializer`) and
+        ordered by creation time. `sku` and `vendor` + `sku` are index lookups.
+
+        Output:
+            dict or None: the serialized lines under `results` and the `next`/`prev` page
+            cursors. Invalid parameters raise `ValidationError`, other failures return None.
+        """
+        try:
+            filter_serializer = PurchaseOrderLineFilterSerializer(data=filters or {})
+            filter_serializer.is_valid(raise_exception=True)
+            lines = self.line_repo.filter_lines(**filter_serializer.get_lookups())
+
+            paginator = KeysetPaginator('created_at', get_page_size(page_size))
+            serializer = FastPurchaseOrderLineSerializer.select(fields, exclude)
+
+            def load():
+                page, next_cursor, prev_cursor = paginator.paginate(serializer.values(lines, paginator.field, 'uid'), cursor)
+                return {'results': serializer.serialize(page), 'next': next_cursor, 'prev': prev_cursor}
+
+            # Lines only change with their purchase orders, whose writes bump these namespaces.
+            return read_cache.get_or_load(
+                'purchase_order_lines',
+                purchase_order_list_namespaces(filter_serializer.validated_data),
+                {
+                    'filters': filter_serializer.validated_data,
+                    'cursor': cursor,
+                    'page_size': paginator.page_size,
+                    'fields': serializer.field_names,
+                },
+                load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+    @replica_read
+    def get_order_line_summary(self, params=None, page_size=None):
+        """
+        Aggregates the purchase order lines matching the filters of `params` per SKU,
+        per vendor or per vendor and SKU (`group_by`), e.g. the quantity of an item
+        ordered from each vendor with `?sku=SKU-1&group_by=vendor`. The `page_size`
+        first groups in `sort` order are returned.
+
+        Output:
+            dict or None: `group_by` and the groups under `results`. Invalid parameters
+            raise `ValidationError`, other failures return None.
+        """
+        try:
+            query = PurchaseOrderLineSummaryFilterSerializer(data=params or {})
+            query.is_valid(raise_exception=True)
+            group_by = query.validated_data['group_by']
+            limit = get_page_size(page_size)
+
+            def load():
+                groups = self.line_repo.summarize_lines(
+                    group_by.split(','), query.validated_data['sort'], limit, **query.get_lookups(),
+                )
+                return {
+                    'group_by': group_by,
+                    'results': [
+                        {
+                            **({'vendor': str(group['vendor'])} if 'vendor' in group else {}),
+                            **({'sku': group['sku']} if 'sku' in group else {}),
+                            'lines': group['lines'],
+                            'orders': group['orders'],
+                            'total_quantity': group['total_quantity'] or 0,
+                            'total_value': group['total_value'] or 0.0,
+                            'average_unit_price': group['average_unit_price'],
+                        }
+                        for group in groups
+                    ],
+                }
+
+            return read_cache.get_or_load(
+                'purchase_order_line_summary',
+                purchase_order_list_namespaces(query.validated_data),
+                {'params': query.validated_data, 'limit': limit},
+                load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+    @coordinated_write
+    def backfill_order_lines(self, chunk_size=LINE_BACKFILL_CHUNK_SIZE, after=None):
+        """
+        Rewrites the lines of the `chunk_size` purchase orders following `after` in
+        primary key order from their `items`, in one transaction. Called repeatedly by
+        `backfill_order_lines` to stream over the whole table.
+
+        Returns:
+            tuple: the number of orders and of lines written, and the last primary key
+            processed (None once past the end).
+        """
+        with transaction.atomic():
+            orders = self.line_repo.get_purchased_order_chunk(after, chunk_size)
+            if not orders:
+                return 0, 0, None
+            lines = self.line_repo.replace_lines(orders)
+            invalidate_purchase_orders([pk for pk, _, _ in orders], {vendor_id for _, vendor_id, _ in orders})
+        return len(orders), len(lines), orders[-1][0]
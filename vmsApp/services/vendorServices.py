@@ -1,8 +1,24 @@
 # import required modules
+from datetime import timedelta
+from django.db import router, transaction
+from django.utils import timezone
 from rest_framework import serializers
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
+from ..models import performance_metrics_from_aggregates, normalize_performance_aggregates, rollup_period_start
+from ..models import Vendor, performance_window_start, VersionConflict
+from ..constants.appConstants import PERFORMANCE_METRIC_FIELDS, PERFORMANCE_AGGREGATE_FIELDS, PERFORMANCE_VERIFY_TOLERANCE
+from ..constants.appConstants import PERFORMANCE_WINDOWS
 from ..repository.vendorRepo import VendorRepository
-from ..serializers import VendorSerializer, VendorPerformanceSerializer
+from ..repository.purchaseOrderRepo import PurchasedOrderRepository
+from ..repository.performanceHistoryRepo import PerformanceHistoryRepository
+from ..repository.vendorSearchRepo import VendorSearchRepository, search_terms
+from ..serializers import VendorSerializer, VendorPerformanceSerializer, FastVendorSerializer, VendorLeaderboardFilterSerializer
+from ..serializers import PerformanceHistoryQuerySerializer, FastHistoricalPerformanceSerializer, FastPerformanceRollupSerializer
+from ..serializers import VendorSearchQuerySerializer
+from ..pagination import KeysetPaginator, RankedKeysetPaginator, get_page_size
+from ..readCache import read_cache, invalidate_vendors
+from ..dbRouter import replica_read
+from ..writeCoordinator import coordinated_write
 
 class VendorService:
     """
@@ -20,22 +36,164 @@ class VendorService:
         which likely handles persistence logic for vendor data (e.g., database access).
         """
         self.vendorRepo = VendorRepository()
+        self.po_repo = PurchasedOrderRepository()
+        self.history_repo = PerformanceHistoryRepository()
+        self.search_repo = VendorSearchRepository()
 
-    def get_all_vendors(self) -> VendorSerializer:
+    @replica_read
+    def get_all_vendors(self, cursor=None, page_size=None, fields=None, exclude=None):
         """
-        Retrieves a list of all vendors.
+        Retrieves one page of vendors.
 
-        This function fetches a list of all vendors from the vendor repository.
+        This function fetches the page of vendors following `cursor` (the first page when
+        None), ordered by creation time. `fields` / `exclude` (comma separated names)
+        limit the serialized fields and the columns read.
+
+        Output:
+            dict: `results` (serialized vendors) and the `next`/`prev` page cursors.
+            An invalid cursor, page size or field selection raises `ValidationError`.
         """
         try:
-            vendors = self.vendorRepo.get_all_vendors()
-            serializer = VendorSerializer(vendors, many=True)
-            return serializer
+            paginator = KeysetPaginator('created_at', get_page_size(page_size))
+            serializer = FastVendorSerializer.select(fields, exclude)
+
+            def load():
+                vendors = serializer.values(self.vendorRepo.get_all_vendors(), paginator.field, 'uid')
+                vendors, next_cursor, prev_cursor = paginator.paginate(vendors, cursor)
+                return {'results': serializer.serialize(vendors), 'next': next_cursor, 'prev': prev_cursor}
+
+            return read_cache.get_or_load(
+                'vendor_list',
+                ['vendors'],
+                {'cursor': cursor, 'page_size': paginator.page_size, 'fields': serializer.field_names},
+                load,
+            )
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             # Consider returning a more informative value or raising a specific exception
             return None
 
-    
+    @replica_read
+    async def aget_all_vendors(self, cursor=None, page_size=None, fields=None, exclude=None):
+        """
+        Async counterpart of `get_all_vendors()`, sharing its cache entries.
+        """
+        try:
+            paginator = KeysetPaginator('created_at', get_page_size(page_size))
+            serializer = FastVendorSerializer.select(fields, exclude)
+
+            async def load():
+                vendors = serializer.values(self.vendorRepo.get_all_vendors(), paginator.field, 'uid')
+                vendors, next_cursor, prev_cursor = await paginator.apaginate(vendors, cursor)
+                return {'results': serializer.serialize(vendors), 'next': next_cursor, 'prev': prev_cursor}
+
+            return await read_cache.aget_or_load(
+                'vendor_list',
+                ['vendors'],
+                {'cursor': cursor, 'page_size': paginator.page_size, 'fields': serializer.field_names},
+                load,
+            )
+        except serializers.ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+
+    @replica_read
+    def get_vendor_leaderboard(self, filters=None, cursor=None, page_size=None, fields=None, exclude=None):
+        """
+        Retrieves one page of vendors ranked by a performance metric or purchase order count.
+
+        `filters` holds the query parameters validated by `VendorLeaderboardFilterSerializer`:
+        the `sort` key (best on-time delivery rate first by default) and metric thresholds.
+        Every sort key has a `(column, uid)` index, so a top-N page or a threshold is an
+        index range scan, and the following pages are keyset paginated on it.
+
+        Output:
+            dict: `results` (serialized vendors) and the `next`/`prev` page cursors.
+            Invalid filters, cursor, page size or field selection raise `ValidationError`.
+        """
+        try:
+            filter_serializer = VendorLeaderboardFilterSerializer(data=filters or {})
+            filter_serializer.is_valid(raise_exception=True)
+            vendors = self.vendorRepo.get_all_vendors().filter(**filter_serializer.get_lookups())
+            paginator = KeysetPaginator(filter_serializer.validated_data['sort'], get_page_size(page_size))
+            serializer = FastVendorSerializer.select(fields, exclude)
+
+            def load():
+                page, next_cursor, prev_cursor = paginator.paginate(serializer.values(vendors, paginator.field, 'uid'), cursor)
+                return {'results': serializer.serialize(page), 'next': next_cursor, 'prev': prev_cursor}
+
+            return read_cache.get_or_load(
+                'vendor_leaderboard',
+                ['vendors'],
+                {
+                    'filters': filter_serializer.validated_data,
+                    'cursor': cursor,
+                    'page_size': paginator.page_size,
+                    'fields': serializer.field_names,
+                },
+                load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+    @replica_read
+    def search_vendors(self, params=None, cursor=None, page_size=None, fields=None, exclude=None):
+        """
+        Retrieves one page of the vendors matching the search query `q` in their name,
+        address or contact details, best matches first.
+
+        Every word of the query must match, as a prefix of a word of the vendor on SQLite
+        (FTS5 index, bm25 ranking) or as a substring elsewhere (see `VendorSearchRepository`).
+
+        Output:
+            dict or None: `results` (serialized vendors with their `rank`) and the `next` /
+            `prev` page cursors. Invalid parameters raise `ValidationError`, other failures
+            return None.
+        """
+        try:
+            query = VendorSearchQuerySerializer(data=params or {})
+            query.is_valid(raise_exception=True)
+            terms = search_terms(query.validated_data['q'])
+            paginator = RankedKeysetPaginator(get_page_size(page_size))
+            serializer = FastVendorSerializer.select(fields, exclude)
+
+            def load():
+                using = router.db_for_read(Vendor)
+                if self.search_repo.fts_available(using):
+                    page, next_cursor, prev_cursor = paginator.paginate_rows(
+                        lambda position, backwards, limit: self.search_repo.search_ranked(terms, position, backwards, limit, using),
+                        cursor,
+                    )
+                    ranks = {row['uid']: row['rank'] for row in page}
+                    rows = {row['uid']: row for row in serializer.values(self.search_repo.get_vendors(ranks), 'uid')}
+                    # A vendor deleted since the index was read is left out.
+                    page = [{**rows[uid], 'rank': rank} for uid, rank in ranks.items() if uid in rows]
+                else:
+                    page, next_cursor, prev_cursor = paginator.paginate(
+                        serializer.values(self.search_repo.search_fallback(terms), 'rank', 'uid'), cursor,
+                    )
+                results = serializer.serialize(page)
+                for result, row in zip(results, page):
+                    result['rank'] = row['rank']
+                return {'results': results, 'next': next_cursor, 'prev': prev_cursor}
+
+            return read_cache.get_or_load(
+                'vendor_search',
+                ['vendors'],
+                {'q': terms, 'cursor': cursor, 'page_size': paginator.page_size, 'fields': serializer.field_names},
+                load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+    @coordinated_write
     def create_vendor(self, vendor_data):
         """
         Creates a new vendor.
@@ -52,31 +210,65 @@ class VendorService:
         except Exception as e:  # Catch any exceptions during creation
             return None
     
-    def get_vendor_details(self, vendor_id):
+    @replica_read
+    def get_vendor_details(self, vendor_id, fields=None, exclude=None):
         """
         Retrieves a specific vendor's details.
 
-        This function retrieves the details of a vendor using the provided vendor ID.
+        This function retrieves the serialized details of a vendor using the provided
+        vendor ID, served from the read cache when possible. `fields` / `exclude`
+        limit the serialized fields and the columns loaded.
         """
         try:
-            vendor = self.vendorRepo.get_vendor_by_id(vendor_id)
-            if not vendor:
-                raise NotFound(f"Vendor with ID {vendor_id} not found")
+            selected = VendorSerializer.select_fields(fields, exclude)
 
-            serializer = VendorSerializer(vendor)
-            return serializer
+            def load():
+                vendor = self.vendorRepo.get_vendor_by_id(vendor_id, fields=selected)
+                if not vendor:
+                    raise NotFound(f"Vendor with ID {vendor_id} not found")
+                return VendorSerializer(vendor, fields=selected).data
+
+            return read_cache.get_or_load(
+                'vendor_detail', [f'vendor:{vendor_id}'], {'vendor': vendor_id, 'fields': selected}, load,
+            )
+        except ValidationError:
+            raise
         except Exception as e:  # Catch any exceptions during retrieval
             return None
+
+    @replica_read
+    async def aget_vendor_details(self, vendor_id, fields=None, exclude=None):
+        """
+        Async counterpart of `get_vendor_details()`, sharing its cache entries.
+        """
+        try:
+            selected = VendorSerializer.select_fields(fields, exclude)
+
+            async def load():
+                vendor = await self.vendorRepo.aget_vendor_by_id(vendor_id, fields=selected)
+                return VendorSerializer(vendor, fields=selected).data
+
+            return await read_cache.aget_or_load(
+                'vendor_detail', [f'vendor:{vendor_id}'], {'vendor': vendor_id, 'fields': selected}, load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
     
-    def update_vendor(self, vendor_id, vendor_data):
+    @coordinated_write
+    def update_vendor(self, vendor_id, vendor_data, expected_version=None):
         """
         Updates a vendor's details.
 
         This function updates a vendor's details using the provided vendor ID and data.
+        The row is only written while its version is still the one read here, which
+        must be `expected_version` when given, otherwise `VersionConflict` is raised.
 
         Args:
             vendor_id (int): The ID of the vendor to update.
             vendor_data (dict): The data containing the updated vendor information.
+            expected_version (int): The version the client based its update on.
 
         Returns:
             VendorSerializer: The updated vendor data serialized.
@@ -86,6 +278,8 @@ class VendorService:
             vendor = self.vendorRepo.get_vendor_by_id(vendor_id)
             if not vendor:
                 raise NotFound(f"Vendor with ID {vendor_id} not found")
+            if expected_version is not None and vendor.version != expected_version:
+                raise VersionConflict(f'Vendor {vendor_id} is no longer at version {expected_version}')
 
             serializer = VendorSerializer(vendor, data=vendor_data)
             if not serializer.is_valid():
@@ -94,10 +288,13 @@ class VendorService:
             serializer.save()
             return serializer
 
+        except VersionConflict:
+            raise
         except Exception as e:
             print(f"error: {e}")
             return None
     
+    @coordinated_write
     def delete_vendor(self, vendor_id):
         """
         Deletes a vendor.
@@ -112,19 +309,257 @@ class VendorService:
         except Exception as e:  # Catch any exceptions during deletion
             return None
     
-    def get_vendor_performance(self, vendor_id):
+    @replica_read
+    def get_vendor_performance(self, vendor_id, fields=None, exclude=None, window=None):
         """
         Retrieves a specific vendor's performance data.
 
-        This function retrieves the performance data of a vendor using the provided vendor ID.
+        This function retrieves the serialized performance data of a vendor using the
+        provided vendor ID, served from the read cache when possible. Only the metric
+        columns (or those selected with `fields` / `exclude`) are loaded.
+
+        With `window` (e.g. '30d', see `PERFORMANCE_WINDOWS`) the metrics only cover the
+        purchase orders issued in that many last days, summed from at most one daily
+        bucket per day. An unknown window raises `ValidationError`.
         """
         try:
-            vendor = self.vendorRepo.get_vendor_by_id(vendor_id)
-            if not vendor:
-                raise NotFound(f"Vendor with ID {vendor_id} not found")
+            selected = VendorPerformanceSerializer.select_fields(fields, exclude)
+            columns = list(VendorPerformanceSerializer.Meta.fields) if selected is None else selected
+            since = self._window_start(window)
 
-            serializer = VendorPerformanceSerializer(vendor)
-            return serializer
+            def load():
+                if since is None:
+                    vendor = self.vendorRepo.get_vendor_by_id(vendor_id, fields=columns)
+                else:
+                    if not self.vendorRepo.get_existing_vendor_ids([vendor_id]):
+                        raise NotFound(f"Vendor with ID {vendor_id} not found")
+                    aggregates = self.vendorRepo.get_window_performance_aggregates(vendor_id, since)
+                    vendor = performance_metrics_from_aggregates(normalize_performance_aggregates(aggregates))
+                if not vendor:
+                    raise NotFound(f"Vendor with ID {vendor_id} not found")
+                return VendorPerformanceSerializer(vendor, fields=selected).data
+
+            return read_cache.get_or_load(
+                'vendor_performance',
+                [f'vendor:{vendor_id}'],
+                # The window start is part of the key, so cached windows slide every day.
+                {'vendor': vendor_id, 'fields': selected, 'since': since},
+                load,
+            )
+        except ValidationError:
+            raise
         except Exception as e:  # Catch any exceptions during retrieval
             return None
-    
+
+    @replica_read
+    async def aget_vendor_performance(self, vendor_id, fields=None, exclude=None, window=None):
+        """
+        Async counterpart of `get_vendor_performance()`, sharing its cache entries.
+        """
+        try:
+            selected = VendorPerformanceSerializer.select_fields(fields, exclude)
+            columns = list(VendorPerformanceSerializer.Meta.fields) if selected is None else selected
+            since = self._window_start(window)
+
+            async def load():
+                if since is None:
+                    vendor = await self.vendorRepo.aget_vendor_by_id(vendor_id, fields=columns)
+                else:
+                    if not await self.vendorRepo.aget_existing_vendor_ids([vendor_id]):
+                        raise NotFound(f"Vendor with ID {vendor_id} not found")
+                    aggregates = await self.vendorRepo.aget_window_performance_aggregates(vendor_id, since)
+                    vendor = performance_metrics_from_aggregates(normalize_performance_aggregates(aggregates))
+                return VendorPerformanceSerializer(vendor, fields=selected).data
+
+            return await read_cache.aget_or_load(
+                'vendor_performance',
+                [f'vendor:{vendor_id}'],
+                {'vendor': vendor_id, 'fields': selected, 'since': since},
+                load,
+            )
+        except ValidationError:
+            raise
+        except Exception as e:
+            return None
+
+    @replica_read
+    def get_vendor_performance_history(self, vendor_id, params=None, cursor=None, page_size=None):
+        """
+        Retrieves one page of a vendor's performance history.
+
+        `params` holds the query parameters validated by `PerformanceHistoryQuerySerializer`.
+        With `bucket=raw` the snapshots between `from` and `to` are returned, otherwise
+        the hourly/daily/monthly rollups of the periods overlapping that range, in
+        chronological order. Both are index range scans on the vendor.
+
+        Output:
+            dict or None: `bucket`, `results` and the `next`/`prev` page cursors, None when
+            the vendor does not exist. Invalid parameters raise `ValidationError`, any
+            other error propagates.
+        """
+        query = PerformanceHistoryQuerySerializer(data=params or {})
+        query.is_valid(raise_exception=True)
+        bucket, start, end = (query.validated_data.get(key) for key in ('bucket', 'from', 'to'))
+        paginator = KeysetPaginator('date' if bucket == 'raw' else 'period_start', get_page_size(page_size))
+
+        if not self.vendorRepo.get_existing_vendor_ids([vendor_id]):
+            return None
+        if bucket == 'raw':
+            serializer = FastHistoricalPerformanceSerializer
+            history = self.history_repo.get_snapshots(vendor_id, start, end)
+        else:
+            serializer = FastPerformanceRollupSerializer
+            start = rollup_period_start(start, bucket) if start is not None else None
+            history = self.history_repo.get_rollups(vendor_id, bucket, start, end)
+
+        rows, next_cursor, prev_cursor = paginator.paginate(serializer.values(history, paginator.field, 'uid'), cursor)
+        return {'bucket': bucket, 'results': serializer.serialize(rows), 'next': next_cursor, 'prev': prev_cursor}
+
+    def compact_performance_history(self, now=None, raw_days=None, hourly_days=None, daily_days=None, dry_run=False):
+        """
+        Applies the performance history retention: raw snapshots older than `raw_days`
+        and hourly/daily rollups older than `hourly_days`/`daily_days` are deleted. A
+        None retention keeps those rows, monthly rollups are always kept.
+
+        Every snapshot is folded into the rollups when it is recorded, so the deleted
+        rows are already summarized by the coarser buckets that remain.
+
+        The rolling window buckets that slid out of the longest window are deleted too.
+
+        Returns:
+            dict: the number of rows deleted (or that would be, with `dry_run`) for
+            `raw`, `hour`, `day` and `window`.
+        """
+        now = now or timezone.now()
+        report = {}
+        targets = (
+            ('raw', raw_days, self.history_repo.get_snapshots_before),
+            ('hour', hourly_days, lambda cutoff: self.history_repo.get_rollups_before('hour', cutoff)),
+            ('day', daily_days, lambda cutoff: self.history_repo.get_rollups_before('day', cutoff)),
+        )
+        for name, days, expired in targets:
+            if days is None:
+                report[name] = 0
+                continue
+            cutoff = now - timedelta(days=days)
+            if name != 'raw':
+                # Only drop whole periods.
+                cutoff = rollup_period_start(cutoff, name)
+            queryset = expired(cutoff)
+            report[name] = queryset.count() if dry_run else queryset.delete()[0]
+
+        expired = self.vendorRepo.get_expired_daily_performance(
+            performance_window_start(max(PERFORMANCE_WINDOWS.values()), now)
+        )
+        report['window'] = expired.count() if dry_run else expired.delete()[0]
+        return report
+
+    @replica_read
+    def get_vendor_state(self, vendor_id):
+        """
+        Returns `(last_modified, version)` of a vendor with a two column query, or None
+        when it does not exist. The last modification also covers the performance
+        metrics, the version only the details written through `update_vendor()`.
+        """
+        return self.vendorRepo.get_vendor_state(vendor_id)
+
+    @replica_read
+    async def aget_vendor_state(self, vendor_id):
+        return await self.vendorRepo.aget_vendor_state(vendor_id)
+
+    @replica_read
+    def get_vendor_performance_last_modified(self, vendor_id, window=None):
+        """
+        Returns when a vendor's performance last changed, or None when it does not
+        exist. A rolling window also changes at every UTC midnight, when it slides,
+        even if nothing was written.
+        """
+        last_modified = self.vendorRepo.get_vendor_last_modified(vendor_id)
+        if last_modified is None or window not in PERFORMANCE_WINDOWS:
+            return last_modified
+        return max(last_modified, rollup_period_start(timezone.now(), 'day'))
+
+    @replica_read
+    async def aget_vendor_performance_last_modified(self, vendor_id, window=None):
+        last_modified = await self.vendorRepo.aget_vendor_last_modified(vendor_id)
+        if last_modified is None or window not in PERFORMANCE_WINDOWS:
+            return last_modified
+        return max(last_modified, rollup_period_start(timezone.now(), 'day'))
+
+    @staticmethod
+    def _window_start(window):
+        if window is None:
+            return None
+        if window not in PERFORMANCE_WINDOWS:
+            raise ValidationError({'window': f"window must be one of {', '.join(PERFORMANCE_WINDOWS)}"})
+        return performance_window_start(PERFORMANCE_WINDOWS[window])
+
+    @replica_read
+    def get_vendors_last_modified(self):
+        """
+        Returns `(max(updated_at), count)` of the vendor collection.
+        """
+        return self.vendorRepo.get_vendors_last_modified()
+
+    @replica_read
+    async def aget_vendors_last_modified(self):
+        return await self.vendorRepo.aget_vendors_last_modified()
+
+    def recompute_all_performance_metrics(self, vendor_ids=None, batch_size=500, dry_run=False):
+        """
+        Recomputes the performance aggregates and metrics of all vendors (or only
+        `vendor_ids`) with grouped aggregate queries over purchase orders.
+
+        Vendors are processed in batches of `batch_size`, each in one transaction: the
+        vendor rows are locked, the batch's purchase orders aggregated, and the vendors
+        whose stored values differ written back with `bulk_update`, along with the
+        rolling window buckets that drifted. A delta committed by a concurrent write
+        is either in the aggregates or waits for the lock and applies on top, it is
+        never overwritten. Nothing is written when `dry_run` is set.
+
+        Returns:
+            dict: `scanned` and `changed` vendor counts, a `diffs` list of
+            `{'vendor': id, 'changes': {field: (stored, expected)}}` and the drifted
+            `buckets` as `{(vendor_id, day): {field: (stored, expected)}}`.
+        """
+        report = {'scanned': 0, 'changed': 0, 'diffs': [], 'buckets': {}}
+        batch = []
+        for vendor_id in self.vendorRepo.iter_vendor_ids(vendor_ids, chunk_size=batch_size):
+            batch.append(vendor_id)
+            if len(batch) >= batch_size:
+                self._recompute_performance_batch(batch, report, dry_run)
+                batch = []
+        if batch:
+            self._recompute_performance_batch(batch, report, dry_run)
+        return report
+
+    def _recompute_performance_batch(self, vendor_ids, report, dry_run):
+        empty = normalize_performance_aggregates({})
+        fields = PERFORMANCE_AGGREGATE_FIELDS + PERFORMANCE_METRIC_FIELDS
+        now = timezone.now()
+        with transaction.atomic():
+            # Lock first, then aggregate: see recompute_all_performance_metrics().
+            vendors = self.vendorRepo.lock_vendor_performance(vendor_ids)
+            aggregates_by_vendor = self.po_repo.get_performance_aggregates_by_vendor(vendor_ids)
+            pending = []
+            for vendor in vendors:
+                report['scanned'] += 1
+                expected = dict(aggregates_by_vendor.get(vendor.pk, empty))
+                expected.update(performance_metrics_from_aggregates(expected))
+                changes = {
+                    field: (getattr(vendor, field), value) for field, value in expected.items()
+                    if abs(getattr(vendor, field) - value) > PERFORMANCE_VERIFY_TOLERANCE * max(1.0, abs(value))
+                }
+                if not changes:
+                    continue
+                report['changed'] += 1
+                report['diffs'].append({'vendor': vendor.pk, 'changes': changes})
+                for field, value in expected.items():
+                    setattr(vendor, field, value)
+                vendor.updated_at = now
+                pending.append(vendor)
+            if pending and not dry_run:
+                self.vendorRepo.bulk_update_vendors(pending, fields + ('updated_at',))
+                invalidate_vendors([vendor.pk for vendor in pending])
+            report['buckets'].update(self.vendorRepo.rebuild_daily_performance(vendor_ids, dry_run=dry_run))
+
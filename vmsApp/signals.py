@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Vendor, PurchaseOrder
+from .readCache import invalidate_vendors, invalidate_purchase_orders
+
+
+@receiver([post_save, post_delete], sender=Vendor)
+def invalidate_vendor_cache(sender, instance, **kwargs):
+    invalidate_vendors([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=PurchaseOrder)
+def invalidate_purchase_order_cache(sender, instance, **kwargs):
+    vendor_ids = {instance.vendor_id}
+    previous = getattr(instance, '_performance_state', None)
+    if previous is not None:
+        vendor_ids.add(previous[0])
+    invalidate_purchase_orders([instance.pk], vendor_ids)
@@ -1,3 +1,1785 @@
-from django.test import TestCase
+import base64
+import contextvars
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from . import metricsWorker, writeCoordinator
+from .constants.appConstants import PERFORMANCE_AGGREGATE_FIELDS
+from .dbRouter import PIN_COOKIE, PrimaryReplicaRouter, use_replica, _wrote
+from .instrumentation import EndpointMetrics, NPlusOneMiddleware, RequestStats, endpoint_metrics
+from .management.commands.benchmark_api import SCENARIOS, seed_data, uncovered_url_names
+from .models import Vendor, PurchaseOrder, PurchaseOrderLine, VendorDailyPerformance, HistoricalPerformance, VersionConflict, performance_day
+from .pagination import KeysetPaginator, RankedKeysetPaginator
+from .purchaseOrderStateMachine import InvalidTransition
+from .readCache import check_read_cache_backend, invalidate_vendors, read_cache
+from .repository.performanceHistoryRepo import PerformanceHistoryRepository
+from .repository.purchaseOrderRepo import PurchasedOrderRepository
+from .repository.vendorRepo import VendorRepository
+from .repository.vendorSearchRepo import SEARCH_DOC_TABLE, SEARCH_TABLE, VendorSearchRepository
+from .services.commonServices import CommonService, TransitionConflictError
+from .services.vendorServices import VendorService
+from .serializers import VendorSerializer, PurchaseOrderSerializer, FastVendorSerializer, FastPurchaseOrderSerializer
+from .serializers import HistoricalPerformanceSerializer, PerformanceRollupSerializer, PurchaseOrderLineSerializer
+from .serializers import FastHistoricalPerformanceSerializer, FastPerformanceRollupSerializer, FastPurchaseOrderLineSerializer
 
-# Create your tests here.
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class VendorPerformanceAggregateTests(TestCase):
+    """
+    The running aggregates adjusted by every purchase order change must always equal a
+    full recompute over the vendor's purchase orders.
+    """
+
+    def setUp(self):
+        self.acme = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.globex = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+        self.issued = timezone.now() - timedelta(days=3)
+
+    def order(self, vendor, **fields):
+        return PurchaseOrder.objects.create(vendor=vendor, items=[], quantity=1, issue_date=self.issued, **fields)
+
+    def assertMatchesRecompute(self, *vendors):
+        for vendor in vendors:
+            stored = Vendor.objects.values(*PERFORMANCE_AGGREGATE_FIELDS).get(pk=vendor.pk)
+            expected = vendor.scan_performance_aggregates()
+            for field in PERFORMANCE_AGGREGATE_FIELDS:
+                self.assertAlmostEqual(stored[field], expected[field], msg=f'{vendor.name}.{field}')
+            self.assertEqual(vendor.verify_performance_aggregates(), {})
+
+    def test_create(self):
+        self.order(self.acme)
+        self.order(self.acme, status='completed', delivery_date=self.issued + timedelta(days=1), quality_rating=4.0)
+        self.order(self.acme, status='completed', delivery_date=self.issued - timedelta(hours=2))
+        self.order(self.acme, acknowledgment_date=self.issued + timedelta(hours=12))
+        self.assertMatchesRecompute(self.acme)
+        self.acme.refresh_from_db()
+        self.assertEqual((self.acme.total_pos, self.acme.completed_pos, self.acme.on_time_pos), (4, 2, 1))
+        self.assertEqual(self.acme.fulfillment_rate, 50.0)
+
+    def test_status_quality_and_acknowledgment_edits(self):
+        po = self.order(self.acme)
+        po.status = 'completed'
+        po.delivery_date = self.issued + timedelta(days=2)
+        po.save()
+        self.assertMatchesRecompute(self.acme)
+        po.quality_rating = 3.5
+        po.acknowledgment_date = self.issued + timedelta(hours=6)
+        po.save()
+        self.assertMatchesRecompute(self.acme)
+        po.quality_rating = 5.0
+        po.delivery_date = self.issued - timedelta(days=1)
+        po.save()
+        self.assertMatchesRecompute(self.acme)
+        po.status = 'canceled'
+        po.quality_rating = None
+        po.save()
+        self.assertMatchesRecompute(self.acme)
+
+    def test_reassign_and_delete(self):
+        po = self.order(self.acme, status='completed', delivery_date=self.issued + timedelta(days=1), quality_rating=4.5)
+        self.order(self.acme)
+        po.vendor = self.globex
+        po.save()
+        self.assertMatchesRecompute(self.acme, self.globex)
+        po.delete()
+        self.assertMatchesRecompute(self.acme, self.globex)
+        self.assertEqual(Vendor.objects.get(pk=self.globex.pk).total_pos, 0)
+
+    def test_stale_instances_do_not_corrupt_the_aggregates(self):
+        po = self.order(self.acme)
+        stale = PurchaseOrder.objects.get(pk=po.pk)
+        po.status = 'completed'
+        po.delivery_date = self.issued + timedelta(days=1)
+        po.save()
+
+        # Saves of the stale instance, partial ones included, fail without applying their delta.
+        stale.quality_rating = 2.0
+        with self.assertRaises(VersionConflict):
+            stale.save()
+        with self.assertRaises(VersionConflict):
+            stale.save(update_fields=['quality_rating'])
+        self.assertMatchesRecompute(self.acme)
+
+        # A partial save only counts the fields it writes.
+        fresh = PurchaseOrder.objects.get(pk=po.pk)
+        fresh.status = 'canceled'
+        fresh.quality_rating = 3.0
+        fresh.save(update_fields=['quality_rating'])
+        self.assertEqual(PurchaseOrder.objects.get(pk=po.pk).status, 'completed')
+        self.assertMatchesRecompute(self.acme)
+        # Saves not touching the aggregated fields leave the vendor alone.
+        fresh.items = [{'sku': 'A', 'qty': 1}]
+        fresh.save(update_fields=['items'])
+        self.assertMatchesRecompute(self.acme)
+
+        # Deletes subtract what the row holds, not the snapshot.
+        stale.delete()
+        self.assertMatchesRecompute(self.acme)
+        self.assertEqual(Vendor.objects.get(pk=self.acme.pk).total_pos, 0)
+
+    def test_aggregates_are_not_exposed(self):
+        self.order(self.acme)
+        vendor = self.client.get(f'/api/vendors/{self.acme.pk}/').json()['data']['vendor']
+        self.assertIn('fulfillment_rate', vendor)
+        self.assertFalse(set(PERFORMANCE_AGGREGATE_FIELDS) & set(vendor))
+        self.assertFalse(set(PERFORMANCE_AGGREGATE_FIELDS) & set(VendorSerializer(self.acme).data))
+
+
+class FastSerializerParityTests(TestCase):
+    """
+    The values() based serializers must render byte-identical JSON to the ModelSerializers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now().replace(microsecond=123456)
+        cls.vendors = [
+            Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com'),
+            Vendor.objects.create(name='Ünïcödé “quoted”', address='', contact_details='+91 00000'),
+        ]
+        PurchaseOrder.objects.create(vendor=cls.vendors[0], items=[], quantity=0)
+        PurchaseOrder.objects.create(
+            vendor=cls.vendors[0],
+            items=[{'sku': 'A-1', 'qty': 3, 'price': 9.99, 'tags': ['x', None]}],
+            quantity=3,
+            status='completed',
+            quality_rating=4.5,
+            issue_date=now - timedelta(days=3),
+            delivery_date=now,
+            acknowledgment_date=now - timedelta(days=2, seconds=1),
+        )
+        PurchaseOrder.objects.create(
+            vendor=cls.vendors[1], items={'nested': {'deep': [1, 2.5, 'three']}}, quantity=-1,
+            status='canceled', quality_rating=0.0, order_date=now.replace(microsecond=0),
+        )
+
+    def assertSameJSON(self, expected, actual):
+        self.assertEqual(JSONRenderer().render(expected), JSONRenderer().render(actual))
+
+    def test_vendor_parity(self):
+        queryset = Vendor.objects.order_by('created_at')
+        self.assertSameJSON(
+            VendorSerializer(queryset, many=True).data,
+            FastVendorSerializer.serialize(FastVendorSerializer.values(queryset)),
+        )
+
+    def test_purchase_order_parity(self):
+        queryset = PurchaseOrder.objects.order_by('created_at')
+        self.assertSameJSON(
+            PurchaseOrderSerializer(queryset, many=True).data,
+            FastPurchaseOrderSerializer.serialize(FastPurchaseOrderSerializer.values(queryset)),
+        )
+
+    def test_parity_in_non_utc_timezone(self):
+        queryset = PurchaseOrder.objects.order_by('created_at')
+        with timezone.override('Asia/Kolkata'):
+            self.assertSameJSON(
+                PurchaseOrderSerializer(queryset, many=True).data,
+                list(FastPurchaseOrderSerializer.iter_serialize(FastPurchaseOrderSerializer.values(queryset))),
+            )
+
+    def test_selected_fields_parity(self):
+        queryset = PurchaseOrder.objects.order_by('created_at')
+        for fields, exclude in (('uid,status,vendor,delivery_date', None), (None, 'items,quality_rating'), ('items', None)):
+            selected = PurchaseOrderSerializer.select_fields(fields, exclude)
+            serializer = FastPurchaseOrderSerializer.select(fields, exclude)
+            self.assertEqual(serializer.field_names, selected)
+            with CaptureQueriesContext(connection) as queries:
+                rows = list(serializer.values(queryset))
+            # Only the selected columns are read.
+            self.assertEqual('"items"' in queries[0]['sql'], 'items' in selected)
+            self.assertSameJSON(PurchaseOrderSerializer(queryset, many=True, fields=selected).data, serializer.serialize(rows))
+
+    def test_history_and_line_parity(self):
+        HistoricalPerformance.record([
+            {'vendor_id': vendor.pk, 'on_time_delivery_rate': 50.0, 'quality_rating_avg': 4.25,
+             'average_response_time': 1.5, 'fulfillment_rate': 100.0}
+            for vendor in self.vendors
+        ])
+        history = HistoricalPerformance.objects.order_by('date', 'uid')
+        self.assertSameJSON(
+            HistoricalPerformanceSerializer(history, many=True).data,
+            FastHistoricalPerformanceSerializer.serialize(FastHistoricalPerformanceSerializer.values(history)),
+        )
+        rollups = PerformanceHistoryRepository().get_rollups(self.vendors[0].pk, 'day')
+        self.assertSameJSON(
+            PerformanceRollupSerializer(rollups, many=True).data,
+            FastPerformanceRollupSerializer.serialize(FastPerformanceRollupSerializer.values(rollups)),
+        )
+        lines = PurchaseOrderLine.objects.order_by('created_at', 'uid')
+        self.assertTrue(lines.exists())
+        self.assertSameJSON(
+            PurchaseOrderLineSerializer(lines, many=True).data,
+            FastPurchaseOrderLineSerializer.serialize(FastPurchaseOrderLineSerializer.values(lines)),
+        )
+
+    def test_list_endpoints_match_model_serializers(self):
+        response = self.client.get('/api/purchase_orders/')
+        expected = PurchaseOrderSerializer(PurchaseOrder.objects.order_by('created_at', 'uid'), many=True).data
+        self.assertSameJSON(expected, response.data['data']['po'])
+
+        response = self.client.get('/api/vendors/')
+        expected = VendorSerializer(Vendor.objects.order_by('created_at', 'uid'), many=True).data
+        self.assertSameJSON(expected, response.data['data']['vendor'])
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class SparseFieldsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        cls.po = PurchaseOrder.objects.create(
+            vendor=cls.vendor, delivery_date=timezone.now() + timedelta(days=3), items={'bolts': 10}, quantity=10,
+        )
+
+    def test_select_fields(self):
+        names = list(VendorSerializer().fields)
+        self.assertIsNone(VendorSerializer.select_fields())
+        self.assertEqual(VendorSerializer.select_fields(' name , uid,,'), ['uid', 'name'])
+        self.assertEqual(VendorSerializer.select_fields(exclude='name'), [name for name in names if name != 'name'])
+        self.assertNotIn('on_time_deliveries', names)
+
+    def test_fields_and_exclude(self):
+        response = self.client.get(f'/api/vendors/{self.vendor.pk}/', {'fields': 'uid,name'})
+        self.assertEqual(response.json()['data']['vendor'], {'uid': str(self.vendor.pk), 'name': 'Acme'})
+
+        response = self.client.get('/api/vendors/', {'exclude': 'address,contact_details'})
+        vendor = response.json()['data']['vendor'][0]
+        self.assertEqual(set(vendor), set(VendorSerializer().fields) - {'address', 'contact_details'})
+
+        response = self.client.get('/api/purchase_orders/', {'fields': 'status,uid'})
+        self.assertEqual(response.json()['data']['po'], [{'uid': str(self.po.pk), 'status': 'pending'}])
+
+        response = self.client.get(f'/api/purchase_orders/{self.po.pk}/', {'fields': 'items'})
+        self.assertEqual(response.json()['data']['po'], {'items': {'bolts': 10}})
+
+    def test_invalid_selections(self):
+        cases = [
+            (f'/api/vendors/{self.vendor.pk}/', {'fields': 'name,secret,uid'}, {'fields': 'Unknown fields: secret'}),
+            ('/api/vendors/', {'exclude': 'on_time_deliveries'}, {'exclude': 'Unknown fields: on_time_deliveries'}),
+            ('/api/purchase_orders/', {'fields': 'uid', 'exclude': 'items'}, {'fields': 'fields and exclude cannot be combined'}),
+        ]
+        for url, params, errors in cases:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()['errors'], errors)
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Vendor.objects.bulk_create([
+            Vendor(name=f'Vendor {i}', address=f'{i} Road', contact_details=f'vendor{i}@example.com') for i in range(7)
+        ])
+        # Every vendor created at the same instant: the order only holds thanks to the uid tie breaker.
+        Vendor.objects.update(created_at=timezone.now())
+        cls.order = [str(uid) for uid in Vendor.objects.order_by('created_at', 'uid').values_list('uid', flat=True)]
+
+    def page(self, **params):
+        response = self.client.get('/api/vendors/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()['data']
+        return [vendor['uid'] for vendor in data['vendor']], data['next'], data['prev']
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPaginator('-created_at', 10)
+        row = Vendor.objects.values('created_at', 'uid').first()
+        queryset = Vendor.objects.all()
+        self.assertEqual(paginator.decode_cursor(queryset, paginator.encode_cursor(row)), (row['created_at'], row['uid'], False))
+        self.assertEqual(paginator.decode_cursor(queryset, paginator.encode_cursor(row, backwards=True)), (row['created_at'], row['uid'], True))
+
+    def test_pages_walk_ties_forwards_and_backwards(self):
+        pages, cursor = [], None
+        while True:
+            uids, cursor, prev = self.page(page_size=3, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual(prev is None, not pages)
+            pages.append((uids, prev))
+            if cursor is None:
+                break
+        self.assertEqual([len(uids) for uids, _ in pages], [3, 3, 1])
+        self.assertEqual([uid for uids, _ in pages for uid in uids], self.order)
+
+        # The prev cursor of each page leads back to the page before it.
+        for (previous, _), (_, prev) in zip(pages, pages[1:]):
+            self.assertEqual(self.page(page_size=3, cursor=prev)[0], previous)
+
+    def test_last_page(self):
+        first, cursor, _ = self.page(page_size=7)
+        self.assertEqual((first, cursor), (self.order, None))
+        uids, cursor, prev = self.page(page_size=4)
+        uids, cursor, prev = self.page(page_size=4, cursor=cursor)
+        self.assertEqual((uids, cursor), (self.order[4:], None))
+        self.assertEqual(self.page(page_size=4, cursor=prev)[0], self.order[:4])
+
+    def test_float_cursor_round_trip(self):
+        paginator = KeysetPaginator('-quality_rating_avg', 10)
+        queryset = Vendor.objects.all()
+        uid = uuid.uuid4()
+        for value in (0.0, 4.25, 1 / 3, 1e-9):
+            cursor = paginator.encode_cursor({'quality_rating_avg': value, 'uid': uid})
+            # Floats go through JSON unchanged, repr() round trips them exactly.
+            self.assertEqual(paginator.decode_cursor(queryset, cursor), (value, uid, False))
+        bad_value = base64.urlsafe_b64encode(json.dumps({'k': 'quality_rating_avg', 'v': 'high', 'u': str(uid)}).encode()).decode()
+        with self.assertRaises(ValidationError):
+            paginator.decode_cursor(queryset, bad_value)
+
+    def test_float_pages_across_equal_values(self):
+        # Two runs of equal ratings, one of them a value with no exact binary representation.
+        for index, uid in enumerate(self.order):
+            Vendor.objects.filter(pk=uid).update(quality_rating_avg=1 / 3 if index % 2 else 4.7)
+        expected = [
+            str(uid) for uid in Vendor.objects.order_by('-quality_rating_avg', '-uid').values_list('uid', flat=True)
+        ]
+        paginator = KeysetPaginator('-quality_rating_avg', 2)
+        queryset = Vendor.objects.values('quality_rating_avg', 'uid')
+        pages, cursor = [], None
+        while True:
+            rows, cursor, prev = paginator.paginate(queryset, cursor)
+            pages.append(([str(row['uid']) for row in rows], prev))
+            if cursor is None:
+                break
+        self.assertEqual([uid for uids, _ in pages for uid in uids], expected)
+        for (previous, _), (_, prev) in zip(pages, pages[1:]):
+            self.assertEqual([str(row['uid']) for row in paginator.paginate(queryset, prev)[0]], previous)
+
+    def test_ranked_cursor_round_trip(self):
+        paginator = RankedKeysetPaginator(10)
+        uid = uuid.uuid4()
+        cursor = paginator.encode_cursor({'rank': -2.5, 'uid': uid}, backwards=True)
+        self.assertEqual(paginator.decode_cursor(None, cursor), (-2.5, uid, True))
+        other_key = KeysetPaginator('quality_rating_avg').encode_cursor({'quality_rating_avg': -2.5, 'uid': uid})
+        with self.assertRaises(ValidationError):
+            paginator.decode_cursor(None, other_key)
+
+    def test_invalid_cursors(self):
+        valid = self.page(page_size=3)[1]
+        other_key = KeysetPaginator('updated_at').encode_cursor({'updated_at': timezone.now(), 'uid': uuid.uuid4()})
+        bad_value = base64.urlsafe_b64encode(json.dumps({'k': 'created_at', 'v': 'yesterday', 'u': self.order[0]}).encode()).decode()
+        for cursor in ('garbage', valid[:-3] + 'xyz', other_key, bad_value):
+            response = self.client.get('/api/vendors/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json()['errors'], {'cursor': 'Invalid cursor'})
+        for page_size in ('0', 'ten'):
+            self.assertEqual(self.client.get('/api/vendors/', {'page_size': page_size}).status_code, 400)
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class VendorLeaderboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rates = [90.0, 75.5, 90.0, 60.0, 90.0, 100.0]
+        Vendor.objects.bulk_create([
+            Vendor(
+                name=f'Vendor {i}', address=f'{i} Road', contact_details=f'vendor{i}@example.com',
+                on_time_delivery_rate=rate, total_pos=i,
+            )
+            for i, rate in enumerate(rates)
+        ])
+        rows = Vendor.objects.values_list('on_time_delivery_rate', 'uid')
+        # Best rate first, ties broken on the uid in the same direction.
+        cls.ranking = [str(uid) for _, uid in sorted(rows, reverse=True)]
+
+    def page(self, **params):
+        response = self.client.get('/api/vendors/leaderboard/', {'fields': 'uid', **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()['data']
+        return [vendor['uid'] for vendor in data['vendor']], data['next'], data['prev']
+
+    def test_ranking_order(self):
+        self.assertEqual(self.page()[0], self.ranking)
+        uids = self.page(sort='on_time_delivery_rate')[0]
+        self.assertEqual(uids, self.ranking[::-1])
+
+        rates = [vendor['on_time_delivery_rate'] for vendor in self.client.get('/api/vendors/leaderboard/').json()['data']['vendor']]
+        self.assertEqual(rates, [100.0, 90.0, 90.0, 90.0, 75.5, 60.0])
+
+    def test_pages_through_ties(self):
+        pages, cursor = [], None
+        while True:
+            uids, cursor, prev = self.page(page_size=2, **({'cursor': cursor} if cursor else {}))
+            pages.append((uids, prev))
+            if cursor is None:
+                break
+        # The page boundary falls within the three vendors tied at 90.
+        self.assertEqual([uid for uids, _ in pages for uid in uids], self.ranking)
+        self.assertEqual(len(pages), 3)
+        for (previous, _), (_, prev) in zip(pages, pages[1:]):
+            self.assertEqual(self.page(page_size=2, cursor=prev)[0], previous)
+
+    def test_thresholds(self):
+        ranked_by_total = [str(uid) for uid in Vendor.objects.order_by('-total_pos', '-uid').values_list('uid', flat=True)]
+        self.assertEqual(self.page(sort='-total_pos', total_pos_min=3)[0], ranked_by_total[:3])
+        uids = self.page(on_time_delivery_rate_gt=60, on_time_delivery_rate_lt=100)[0]
+        self.assertEqual(uids, self.ranking[1:-1])
+
+    def test_invalid_parameters(self):
+        cursor = self.page(page_size=2)[1]
+        for params in ({'sort': 'name'}, {'total_pos_min': 'many'}, {'sort': 'fulfillment_rate', 'cursor': cursor}):
+            response = self.client.get('/api/vendors/leaderboard/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class PurchaseOrderFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        cls.globex = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+        cls.base = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+        day = timedelta(days=1)
+        cls.orders = [
+            PurchaseOrder.objects.create(
+                vendor=vendor, items=[], quantity=1, status=status, issue_date=cls.base + offset * day,
+                delivery_date=cls.base + (offset + 2) * day, acknowledgment_date=cls.base + offset * day if acknowledged else None,
+            )
+            for vendor, offset, status, acknowledged in (
+                (cls.acme, 0, 'pending', False),
+                (cls.acme, 1, 'completed', True),
+                (cls.globex, 1, 'pending', True),
+                (cls.globex, 3, 'canceled', False),
+            )
+        ]
+
+    def uids(self, **params):
+        response = self.client.get('/api/purchase_orders/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {po['uid'] for po in response.json()['data']['po']}
+
+    def expected(self, *indexes):
+        return {str(self.orders[index].pk) for index in indexes}
+
+    def test_invalid_filters(self):
+        for params in (
+            {'status': 'lost'}, {'vendor': 'acme'}, {'issue_date_from': 'yesterday'},
+            {'acknowledged': 'maybe'}, {'sort': 'vendor'},
+        ):
+            response = self.client.get('/api/purchase_orders/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(list(response.json()['errors']), list(params))
+
+    def test_inclusive_date_ranges(self):
+        second_day = (self.base + timedelta(days=1)).isoformat()
+        self.assertEqual(self.uids(issue_date_from=second_day, issue_date_to=second_day), self.expected(1, 2))
+        self.assertEqual(self.uids(delivery_date_to=(self.base + timedelta(days=2)).isoformat()), self.expected(0))
+        self.assertEqual(self.uids(issue_date_from=second_day, vendor=self.globex.pk), self.expected(2, 3))
+
+    def test_status_and_acknowledged(self):
+        self.assertEqual(self.uids(acknowledged='true'), self.expected(1, 2))
+        self.assertEqual(self.uids(acknowledged='false'), self.expected(0, 3))
+        self.assertEqual(self.uids(status='pending', acknowledged='true'), self.expected(2))
+        self.assertEqual(self.uids(vendor=self.acme.pk, status='completed'), self.expected(1))
+
+    def test_sort_with_keyset_pages(self):
+        ordered = sorted(self.orders, key=lambda po: (po.issue_date, po.pk), reverse=True)
+        expected = [str(po.pk) for po in ordered]
+        uids, cursor = [], None
+        while True:
+            params = {'sort': '-issue_date', 'page_size': 1, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get('/api/purchase_orders/', params).json()['data']
+            uids += [po['uid'] for po in data['po']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        # Orders 1 and 2 tie on the issue date and are split by the uid across pages.
+        self.assertEqual(uids, expected)
+
+        cursor = self.client.get('/api/purchase_orders/', {'sort': '-issue_date', 'page_size': 1}).json()['data']['next']
+        # A cursor only pages the sort key it was issued for.
+        response = self.client.get('/api/purchase_orders/', {'sort': 'order_date', 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    VMS_CACHE_ENABLED=True,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'vms-read-cache-tests'}},
+)
+class ReadCacheTests(TestCase):
+
+    def setUp(self):
+        read_cache.backend.clear()
+        self.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.service = VendorService()
+
+    def generation(self, namespace):
+        return read_cache.backend.get(read_cache._generation_key(namespace))
+
+    def test_enabled_by_default_only_on_a_shared_backend(self):
+        self.assertEqual(check_read_cache_backend(None)[0].id, 'vmsApp.W001')
+        with override_settings(VMS_CACHE_ENABLED=None):
+            self.assertFalse(read_cache.enabled)
+            self.assertEqual(check_read_cache_backend(None), [])
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            VMS_CACHE_ENABLED=None,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}},
+        ):
+            self.assertTrue(read_cache.enabled)
+        with override_settings(VMS_CACHE_ENABLED=False):
+            self.assertFalse(read_cache.enabled)
+
+    def test_entries_are_keyed_on_the_generations(self):
+        loads = []
+        load = lambda: loads.append(1) or len(loads)
+        self.assertEqual(read_cache.get_or_load('entry', ['vendors'], {'page': 1}, load), 1)
+        self.assertEqual(read_cache.get_or_load('entry', ['vendors'], {'page': 1}, load), 1)
+        self.assertEqual(read_cache.get_or_load('entry', ['vendors'], {'page': 2}, load), 2)
+
+        generation = self.generation('vendors')
+        read_cache.bump(['vendors'])
+        self.assertEqual(self.generation('vendors'), generation + 1)
+        self.assertEqual(read_cache.get_or_load('entry', ['vendors'], {'page': 1}, load), 3)
+        # Other namespaces are left alone.
+        self.assertEqual(read_cache.get_or_load('entry', ['pos'], {}, load), 4)
+        read_cache.bump([f'vendor:{self.vendor.pk}'])
+        self.assertEqual(read_cache.get_or_load('entry', ['pos'], {}, load), 4)
+
+    def test_generations_are_bumped_when_the_write_commits(self):
+        self.service.get_vendor_details(self.vendor.pk)
+        generation = self.generation(f'vendor:{self.vendor.pk}')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            invalidate_vendors([self.vendor.pk])
+            self.assertEqual(self.generation(f'vendor:{self.vendor.pk}'), generation)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.generation(f'vendor:{self.vendor.pk}'), generation + 1)
+
+    def test_writes_invalidate_cached_reads(self):
+        self.assertEqual(self.service.get_vendor_details(self.vendor.pk)['name'], 'Acme')
+        # A write bypassing the services is not seen, the entry is served from the cache.
+        Vendor.objects.filter(pk=self.vendor.pk).update(name='Acme Corp')
+        self.assertEqual(self.service.get_vendor_details(self.vendor.pk)['name'], 'Acme')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f'/api/vendors/{self.vendor.pk}/', {
+                'name': 'Acme Ltd', 'address': '1 Road', 'contact_details': 'acme@example.com',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.service.get_vendor_details(self.vendor.pk)['name'], 'Acme Ltd')
+
+        # Purchase order writes refresh the vendor's performance and the order lists.
+        self.assertEqual(self.service.get_vendor_performance(self.vendor.pk)['fulfillment_rate'], 0.0)
+        self.assertEqual(len(self.client.get('/api/purchase_orders/').json()['data']['po']), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1, status='completed')
+        self.assertEqual(self.service.get_vendor_performance(self.vendor.pk)['fulfillment_rate'], 100.0)
+        self.assertEqual(len(self.client.get('/api/purchase_orders/').json()['data']['po']), 1)
+        stats = read_cache.stats()['entries']
+        self.assertGreaterEqual(stats['vendor_detail']['hits'], 1)
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class ExportAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        cls.globex = Vendor.objects.create(name='Globex, Inc', address='2 Road', contact_details='globex@example.com')
+        for vendor, status in ((cls.acme, 'pending'), (cls.acme, 'completed'), (cls.globex, 'pending')):
+            PurchaseOrder.objects.create(vendor=vendor, items=[{'sku': 'A', 'qty': 1}], quantity=1, status=status)
+
+    def export(self, path, **kwargs):
+        response = self.client.get(path, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export('/api/purchase_orders/export/', data={'vendor': str(self.acme.pk), 'fields': 'uid,status,items'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('purchase_orders.ndjson', response['Content-Disposition'])
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(row['status'] for row in rows), ['completed', 'pending'])
+        self.assertEqual(set(rows[0]), {'uid', 'status', 'items'})
+        self.assertEqual(rows[0]['items'], [{'sku': 'A', 'qty': 1}])
+
+    def test_csv(self):
+        response, body = self.export('/api/vendors/export/', data={'fields': 'name,address'}, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(body.splitlines(), ['name,address', 'Acme,1 Road', '"Globex, Inc",2 Road'])
+        _, body = self.export('/api/vendors/export/', data={'format': 'csv', 'fields': 'name'})
+        self.assertEqual(body.splitlines(), ['name', 'Acme', '"Globex, Inc"'])
+
+    def test_errors_are_json(self):
+        for path, params, headers, code in (
+            ('/api/purchase_orders/export/', {'status': 'lost'}, {}, 400),
+            ('/api/vendors/export/', {'fields': 'nope'}, {'HTTP_ACCEPT': 'text/csv'}, 400),
+            ('/api/vendors/export/', {'format': 'xml'}, {}, 404),
+            ('/api/vendors/export/', {}, {'HTTP_ACCEPT': 'application/xml'}, 406),
+        ):
+            response = self.client.get(path, params, **headers)
+            self.assertEqual(response.status_code, code, (path, params))
+            self.assertEqual(response['Content-Type'], 'application/json')
+            body = response.json()
+            self.assertEqual((body['status'], body['data']), (code, None))
+            self.assertTrue(body['message'])
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.url = f'/api/vendors/{self.vendor.pk}/'
+
+    def test_matching_validators_answer_304(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        # Only the state query runs, the vendor is neither loaded nor serialized.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, headers={'if_modified_since': last_modified}).status_code, 304)
+        self.assertEqual(self.client.get(self.url, headers={'if_none_match': '"other"'}).status_code, 200)
+        # Another representation of the same resource has its own tag.
+        self.assertNotEqual(self.client.get(self.url, {'fields': 'name'})['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.put(self.url, {'name': 'Acme Ltd', 'address': '1 Road', 'contact_details': 'acme@example.com'},
+                        content_type='application/json')
+        response = self.client.get(self.url, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['vendor']['name'], 'Acme Ltd')
+        self.assertNotEqual(response['ETag'], etag)
+
+        performance_url = f'/api/vendors/{self.vendor.pk}/performance/'
+        etag = self.client.get(performance_url)['ETag']
+        PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1)
+        self.assertEqual(self.client.get(performance_url, headers={'if_none_match': etag}).status_code, 200)
+
+    def test_collection_etag_follows_inserts_and_deletes(self):
+        etag = self.client.get('/api/vendors/')['ETag']
+        self.assertEqual(self.client.get('/api/vendors/', headers={'if_none_match': etag}).status_code, 304)
+        other = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+        response = self.client.get('/api/vendors/', headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # Deleting an older row does not move max(updated_at), the count changes the tag.
+        Vendor.objects.filter(pk=self.vendor.pk).delete()
+        self.assertEqual(self.client.get('/api/vendors/', headers={'if_none_match': etag}).status_code, 200)
+
+    def test_collections_ignore_if_modified_since(self):
+        other = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+        response = self.client.get('/api/vendors/')
+        self.assertNotIn('Last-Modified', response)
+        since = http_date(other.updated_at.timestamp() + 1)
+        # Deleting the older vendor leaves max(updated_at) where it was.
+        Vendor.objects.filter(pk=self.vendor.pk).delete()
+        for url in ('/api/vendors/', '/api/purchase_orders/', '/api/async/vendors/'):
+            response = self.client.get(url, headers={'if_modified_since': since})
+            self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(len(self.client.get('/api/vendors/').json()['data']['vendor']), 1)
+        # A single record still answers it.
+        response = self.client.get(f'/api/vendors/{other.pk}/', headers={'if_modified_since': since})
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(VMS_READ_REPLICAS=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    Routing decisions only, each run in a fresh context so that writes made by other
+    tests in this thread do not pin it to the primary.
+    """
+
+    def route(self, func):
+        return contextvars.Context().run(func)
+
+    def test_only_replica_read_blocks_use_a_replica(self):
+        router = PrimaryReplicaRouter()
+
+        def reads():
+            outside = router.db_for_read(Vendor)
+            with use_replica():
+                inside = router.db_for_read(Vendor)
+            return outside, inside
+
+        self.assertEqual(self.route(reads), ('default', 'replica1'))
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        router = PrimaryReplicaRouter()
+
+        def reads():
+            with use_replica():
+                self.assertEqual(router.db_for_write(Vendor), 'default')
+                return router.db_for_read(Vendor)
+
+        self.assertEqual(self.route(reads), 'default')
+
+    @override_settings(VMS_READ_REPLICAS=[])
+    def test_without_replicas_reads_use_the_primary(self):
+        def reads():
+            with use_replica():
+                return PrimaryReplicaRouter().db_for_read(Vendor)
+
+        self.assertEqual(self.route(reads), 'default')
+
+
+@override_settings(VMS_READ_REPLICAS=['replica1'])
+class ReplicaPinningTests(TestCase):
+
+    def test_a_write_pins_the_client_to_the_primary(self):
+        response = self.client.post(
+            '/api/vendors/',
+            json.dumps({'name': 'Acme', 'address': '1 Road', 'contact_details': 'acme@example.com'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_a_read_does_not_pin(self):
+        response = self.client.get('/api/vendors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class AsyncReadAPITests(TestCase):
+    """
+    The async read endpoints must answer exactly like their sync counterparts. The read
+    cache is off so that both of them load the data.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        cls.po = PurchaseOrder.objects.create(vendor=cls.vendor, items=[{'sku': 'A-1'}], quantity=1)
+
+    async def test_responses_match_the_sync_endpoints(self):
+        for path in (
+            '/api/vendors/',
+            f'/api/vendors/{self.vendor.pk}/?fields=uid,name',
+            f'/api/vendors/{self.vendor.pk}/performance/',
+            f'/api/purchase_orders/?vendor={self.vendor.pk}&exclude=items',
+            f'/api/purchase_orders/{self.po.pk}/',
+            '/api/purchase_orders/?status=unknown',
+        ):
+            with self.subTest(path=path):
+                expected = await self.async_client.get(path)
+                response = await self.async_client.get(path.replace('/api/', '/api/async/', 1))
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    async def test_unknown_vendor_is_not_found(self):
+        response = await self.async_client.get('/api/async/vendors/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_conditional_get(self):
+        response = await self.async_client.get(f'/api/async/purchase_orders/{self.po.pk}/')
+        self.assertIn('ETag', response.headers)
+        response = await self.async_client.get(
+            f'/api/async/purchase_orders/{self.po.pk}/', headers={'if-none-match': response.headers['ETag']},
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        endpoint_metrics.reset()
+
+    def metric(self, text, name, **labels):
+        prefix = name + '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+        values = [line.split()[-1] for line in text.splitlines() if line.startswith(prefix)]
+        self.assertEqual(len(values), 1, prefix)
+        return float(values[0])
+
+    def test_requests_are_recorded_per_endpoint(self):
+        Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.client.get('/api/vendors/')
+        self.client.get('/api/vendors/')
+        self.client.get('/api/async/vendors/')
+
+        response = self.client.get('/api/_metrics/')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        labels = {'endpoint': 'create_new_vendor & list_all_vendors', 'method': 'GET'}
+        self.assertEqual(self.metric(text, 'vms_http_request_duration_seconds_count', **labels), 2)
+        self.assertEqual(self.metric(text, 'vms_http_request_duration_seconds_bucket', **labels, le='+Inf'), 2)
+        self.assertEqual(self.metric(text, 'vms_http_responses_total', **labels, status=200), 2)
+        self.assertGreater(self.metric(text, 'vms_db_queries_total', **labels), 0)
+        self.assertGreater(self.metric(text, 'vms_serialization_duration_seconds_total', **labels), 0)
+        self.assertGreater(self.metric(text, 'vms_http_response_size_bytes_total', **labels), 0)
+
+        labels = {'endpoint': 'async_list_all_vendors', 'method': 'GET'}
+        self.assertEqual(self.metric(text, 'vms_http_request_duration_seconds_count', **labels), 1)
+        self.assertGreater(self.metric(text, 'vms_db_queries_total', **labels), 0)
+
+    def test_shards_of_exited_threads_are_retired(self):
+        metrics = EndpointMetrics()
+
+        def record():
+            stats = RequestStats()
+            stats.queries = 2
+            metrics.record('list_all_vendors', 'GET', 200, 0.01, stats, 100)
+
+        # A thread per request, as runserver does.
+        for _ in range(10):
+            threads = [threading.Thread(target=record) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertLessEqual(len(metrics._shards), 20)
+
+        series = metrics.snapshot()[('list_all_vendors', 'GET')]
+        self.assertEqual(len(metrics._shards), 0)
+        self.assertEqual((series.count, series.queries, series.response_bytes, series.statuses), (200, 400, 20000, {200: 200}))
+        # Recording from a live thread keeps adding to the retired totals.
+        record()
+        self.assertEqual(metrics.snapshot()[('list_all_vendors', 'GET')].count, 201)
+        self.assertEqual(len(metrics._shards), 1)
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_every_endpoint_has_a_scenario(self):
+        self.assertEqual(uncovered_url_names(), [])
+
+    def test_every_scenario_succeeds_and_rolls_back(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('benchmark_api', vendors=5, orders=50, requests=1, warmup=0, output=output, stdout=io.StringIO())
+            with open(output) as results:
+                scenarios = json.load(results)['scenarios']
+        self.assertEqual({name: result['errors'] for name, result in scenarios.items() if result['errors']}, {})
+        self.assertFalse(Vendor.objects.exists())
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class QueryBudgetTests(TestCase):
+    """
+    Every endpoint runs a fixed number of queries per request, whatever the number of
+    vendors and purchase orders. Requests are those of the benchmark scenarios.
+    """
+    QUERY_BUDGETS = {
+        'vendor_list': 2, 'vendor_create': 1, 'vendor_export': 1, 'vendor_leaderboard': 2,
+        'vendor_search': 3,
+        'vendor_detail': 2, 'vendor_update': 4, 'vendor_delete': 7, 'vendor_performance': 2,
+        'vendor_performance_window': 3, 'vendor_performance_history': 2,
+        # po_delete re-reads the row it deletes to subtract its exact contribution.
+        # po_bulk_create inserts the lines of its 50 orders 99 rows at a time (SQLite parameter limit).
+        'po_list': 2, 'po_list_filtered': 2, 'po_create': 8, 'po_bulk_create': 10, 'po_export': 1,
+        'po_lines': 1, 'po_line_summary': 1,
+        'po_detail': 2, 'po_update': 12, 'po_delete': 9, 'po_acknowledge': 7, 'po_complete': 13,
+        'po_quality_rating': 13, 'po_transitions': 14,
+        'async_vendor_list': 2, 'async_vendor_detail': 2, 'async_vendor_performance': 2,
+        'async_po_list': 2, 'async_po_detail': 2,
+        'cache_stats': 0, 'metrics': 0,
+    }
+
+    def setUp(self):
+        # Whether the vendor search index exists is looked up once per connection.
+        VendorSearchRepository().fts_available()
+
+    def query_counts(self, context):
+        counts = {}
+        for scenario in SCENARIOS:
+            path, body = scenario.build(context)
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'} if body is not None else {}
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, scenario.method.lower())(path, **kwargs)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertEqual(response.status_code, scenario.expected, scenario.name)
+            counts[scenario.name] = len(queries)
+        return counts
+
+    def test_query_counts_do_not_grow_with_the_data(self):
+        small = self.query_counts(seed_data(random.Random(1), vendor_count=3, order_count=20))
+        large = self.query_counts(seed_data(random.Random(2), vendor_count=40, order_count=800))
+        self.assertEqual(large, small)
+        self.assertEqual(
+            {name: (count, self.QUERY_BUDGETS[name]) for name, count in large.items() if count > self.QUERY_BUDGETS[name]},
+            {},
+        )
+
+
+@override_settings(VMS_NPLUSONE_DETECTION=True, VMS_NPLUSONE_THRESHOLD=5)
+class NPlusOneDetectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        for _ in range(5):
+            PurchaseOrder.objects.create(vendor=vendor, items=[], quantity=1)
+
+    def run_view(self, view):
+        middleware = NPlusOneMiddleware(lambda request: (view(), HttpResponse())[1])
+        return middleware(RequestFactory().get('/api/purchase_orders/'))
+
+    def test_lazy_relation_in_a_loop_is_logged(self):
+        with self.assertLogs('vmsApp.instrumentation', 'WARNING') as logs:
+            self.run_view(lambda: [order.vendor.name for order in PurchaseOrder.objects.all()])
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('5 x SELECT', logs.output[0])
+        self.assertIn('vmsApp/tests.py', logs.output[0])
+
+    def test_prefetched_relation_is_not_logged(self):
+        with self.assertNoLogs('vmsApp.instrumentation', 'WARNING'):
+            self.run_view(lambda: [order.vendor.name for order in PurchaseOrder.objects.select_related('vendor')])
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class PurchaseOrderStateMachineTests(TestCase):
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.po = PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1)
+
+    def post(self, action):
+        return self.client.post(f'/api/purchase_orders/{self.po.pk}/{action}/')
+
+    def rate(self, rating):
+        return self.client.patch(
+            f'/api/purchase_orders/{self.po.pk}/quality_rating/', {'quality_rating': rating}, content_type='application/json',
+        )
+
+    def test_transitions_follow_the_state_machine(self):
+        self.assertEqual(self.rate(4.0).status_code, 400)
+        self.assertEqual(self.post('acknowledge').status_code, 200)
+        self.assertEqual(self.post('acknowledge').status_code, 400)
+        self.assertEqual(self.post('complete').status_code, 200)
+        self.assertEqual(self.post('complete').status_code, 400)
+        self.assertEqual(self.rate('high').status_code, 400)
+        self.assertEqual(self.rate(4.0).status_code, 200)
+        self.assertEqual(self.rate(3.0).status_code, 200)
+
+        self.po.refresh_from_db()
+        self.assertEqual((self.po.status, self.po.quality_rating), ('completed', 3.0))
+        self.assertIsNotNone(self.po.acknowledgment_date)
+        self.assertEqual(self.vendor.verify_performance_aggregates(), {})
+        self.assertEqual(self.vendor.vendor_performance.count(), 3)
+
+    def test_canceled_order_cannot_be_completed(self):
+        response = self.client.post('/api/purchase_orders/transitions/', [
+            {'po_id': str(self.po.pk), 'action': 'cancel'},
+            {'po_id': str(self.po.pk), 'action': 'complete'},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        self.po.refresh_from_db()
+        self.assertEqual(self.po.status, 'canceled')
+
+        response = self.client.put(f'/api/purchase_orders/{self.po.pk}/', {
+            'vendor': str(self.vendor.pk), 'items': [], 'quantity': 1, 'status': 'pending',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.po.refresh_from_db()
+        self.assertEqual(self.po.status, 'canceled')
+
+    def test_one_purchase_order_and_one_vendor_write_per_transition(self):
+        with CaptureQueriesContext(connection) as queries:
+            CommonService().transition(self.po.pk, 'acknowledge')
+        writes = [query['sql'].split('"')[1] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(writes.count('vmsApp_purchaseorder'), 1)
+        self.assertEqual(writes.count('vmsApp_vendor'), 1)
+
+    def test_concurrent_change_is_not_overwritten(self):
+        stale = PurchaseOrder.objects.get(pk=self.po.pk)
+        CommonService().transition(self.po.pk, 'cancel')
+        with mock.patch.object(PurchasedOrderRepository, 'get_purchased_order_for_update', return_value=stale):
+            with self.assertRaises(TransitionConflictError):
+                CommonService().transition(self.po.pk, 'complete')
+        self.po.refresh_from_db()
+        self.assertEqual(self.po.status, 'canceled')
+        self.assertEqual(self.vendor.verify_performance_aggregates(), {})
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class BulkCreateOrdersTests(TestCase):
+
+    def setUp(self):
+        self.acme = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.globex = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+
+    def order(self, vendor, days_ago=1, **fields):
+        issued = timezone.now() - timedelta(days=days_ago)
+        return {
+            'vendor': str(vendor.pk), 'items': [{'sku': 'A', 'qty': 1}], 'quantity': 1,
+            'issue_date': issued.isoformat(), 'delivery_date': (issued + timedelta(days=2)).isoformat(), **fields,
+        }
+
+    def post(self, payload, **params):
+        query = f"?{'&'.join(f'{key}={value}' for key, value in params.items())}" if params else ''
+        return self.client.post(f'/api/purchase_orders/bulk/{query}', payload, content_type='application/json')
+
+    def test_aggregates_and_buckets_match_a_scan(self):
+        orders = [
+            self.order(self.acme, days_ago=3),
+            self.order(self.acme, days_ago=3, status='completed', quality_rating=4.0),
+            self.order(self.acme, days_ago=40, status='completed', acknowledgment_date=timezone.now().isoformat()),
+            self.order(self.globex, days_ago=1, status='canceled'),
+        ]
+        response = self.post(orders)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()['data']['po']), 4)
+        self.assertEqual(PurchaseOrderLine.objects.count(), 4)
+        for vendor in (self.acme, self.globex):
+            vendor.refresh_from_db()
+            self.assertEqual(vendor.verify_performance_aggregates(), {})
+        self.assertEqual(self.acme.total_pos, 3)
+        self.assertEqual(VendorDailyPerformance.verify(), {})
+
+    def test_partial_and_atomic_validation(self):
+        orders = [self.order(self.acme), {'vendor': str(self.acme.pk), 'quantity': 'many'}, self.order(self.globex)]
+        response = self.post({'orders': orders, 'atomic': True})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['data']['errors']], [1])
+        self.assertFalse(PurchaseOrder.objects.exists())
+
+        response = self.post(orders)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error['index'] for error in response.json()['data']['errors']], [1])
+        self.assertEqual(PurchaseOrder.objects.count(), 2)
+
+    def test_unknown_vendor(self):
+        missing = uuid.uuid4()
+        orders = [self.order(self.acme), {**self.order(self.acme), 'vendor': str(missing)}]
+        response = self.post(orders, atomic='true')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['data']['errors'], [
+            {'index': 1, 'errors': {'vendor': [f'Invalid pk "{missing}" - object does not exist.']}},
+        ])
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.acme.refresh_from_db()
+        self.assertEqual(self.acme.total_pos, 0)
+
+    @override_settings(VMS_BULK_MAX_ITEMS=2)
+    def test_batch_size_limit(self):
+        response = self.post([self.order(self.acme)] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'orders': 'A bulk request accepts at most 2 purchase orders'})
+        self.assertEqual(self.post({'orders': 'all of them'}).status_code, 400)
+        self.assertFalse(PurchaseOrder.objects.exists())
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class BatchTransitionTests(TestCase):
+
+    def setUp(self):
+        self.acme = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.globex = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+        self.first = PurchaseOrder.objects.create(vendor=self.acme, items=[], quantity=1)
+        self.second = PurchaseOrder.objects.create(vendor=self.acme, items=[], quantity=1)
+        self.third = PurchaseOrder.objects.create(vendor=self.globex, items=[], quantity=1)
+
+    def post(self, transitions, atomic=False):
+        body = {'transitions': transitions, 'atomic': True} if atomic else transitions
+        return self.client.post('/api/purchase_orders/transitions/', body, content_type='application/json')
+
+    def entry(self, po, action, **payload):
+        return {'po_id': str(po.pk), 'action': action, 'payload': payload}
+
+    def state(self):
+        return list(PurchaseOrder.objects.order_by('created_at').values_list('status', 'quality_rating', 'acknowledgment_date', 'version'))
+
+    def assertAggregatesExact(self):
+        for vendor in (self.acme, self.globex):
+            self.assertEqual(vendor.verify_performance_aggregates(), {})
+
+    def test_batch_applies_every_entry(self):
+        response = self.post([
+            self.entry(self.first, 'acknowledge'),
+            self.entry(self.first, 'complete'),
+            self.entry(self.first, 'rate', quality_rating=4.5),
+            self.entry(self.second, 'cancel'),
+            self.entry(self.third, 'complete'),
+        ])
+        self.assertEqual(response.status_code, 200)
+        outcomes = response.json()['data']['transitions']
+        self.assertEqual([(outcome['index'], outcome['status']) for outcome in outcomes], [(i, 'ok') for i in range(5)])
+        first, second, third = self.state()
+        self.assertEqual(first[:2], ('completed', 4.5))
+        self.assertIsNotNone(first[2])
+        self.assertEqual(second[0], 'canceled')
+        self.assertEqual(third[0], 'completed')
+        self.assertAggregatesExact()
+        # One history snapshot per vendor with a completed or rated order.
+        self.assertEqual((self.acme.vendor_performance.count(), self.globex.vendor_performance.count()), (1, 1))
+
+    def test_errors_are_reported_per_entry(self):
+        response = self.post([
+            self.entry(self.first, 'acknowledge'),
+            self.entry(self.second, 'rate', quality_rating=4.0),
+            {'po_id': str(uuid.uuid4()), 'action': 'complete'},
+            self.entry(self.third, 'ship'),
+            self.entry(self.first, 'acknowledge'),
+            'not an entry',
+        ])
+        self.assertEqual(response.status_code, 207)
+        outcomes = response.json()['data']['transitions']
+        self.assertEqual([outcome['status'] for outcome in outcomes], ['ok', 'error', 'error', 'error', 'error', 'error'])
+        self.assertEqual(outcomes[2]['message'], 'Purchase order not found')
+        self.assertIn('action', outcomes[3]['message'])
+        first, second, third = self.state()
+        self.assertIsNotNone(first[2])
+        self.assertEqual((second[1], third[0]), (None, 'pending'))
+        self.assertAggregatesExact()
+
+        self.assertEqual(self.post([self.entry(self.second, 'rate', quality_rating=4.0)]).status_code, 400)
+        self.assertEqual(self.client.post('/api/purchase_orders/transitions/', {'transitions': 'all'},
+                                          content_type='application/json').status_code, 400)
+
+    def test_atomic_batch_is_all_or_nothing(self):
+        before = self.state()
+        response = self.post([
+            self.entry(self.first, 'complete'),
+            self.entry(self.third, 'acknowledge'),
+            self.entry(self.second, 'rate', quality_rating=2.0),
+        ], atomic=True)
+        self.assertEqual(response.status_code, 400)
+        outcomes = response.json()['data']['transitions']
+        self.assertEqual([outcome['status'] for outcome in outcomes], ['skipped', 'skipped', 'error'])
+        self.assertEqual(self.state(), before)
+        self.assertEqual(Vendor.objects.get(pk=self.acme.pk).completed_pos, 0)
+
+        response = self.post([self.entry(self.first, 'complete'), self.entry(self.third, 'acknowledge')], atomic=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertAggregatesExact()
+
+    def test_concurrent_change_rolls_the_batch_back(self):
+        stale = PurchaseOrder.objects.get(pk=self.first.pk)
+        CommonService().transition(self.first.pk, 'cancel')
+        before = self.state()
+        real = PurchasedOrderRepository.get_purchased_orders_for_update
+
+        def with_stale_first(repo, ids):
+            return {**real(repo, ids), stale.pk: stale}
+
+        with mock.patch.object(PurchasedOrderRepository, 'get_purchased_orders_for_update', with_stale_first):
+            response = self.post([self.entry(self.third, 'acknowledge'), self.entry(self.first, 'complete')])
+        self.assertEqual(response.status_code, 409)
+        # The acknowledgment written before the conflict was rolled back too.
+        self.assertEqual(self.state(), before)
+        self.assertAggregatesExact()
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class OptimisticConcurrencyTests(TestCase):
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.url = f'/api/vendors/{self.vendor.pk}/'
+
+    def put(self, name, **headers):
+        body = {'name': name, 'address': '1 Road', 'contact_details': 'acme@example.com'}
+        return self.client.put(self.url, body, content_type='application/json', headers=headers)
+
+    def test_stale_instance_does_not_overwrite(self):
+        stale = Vendor.objects.get(pk=self.vendor.pk)
+        self.vendor.name = 'Acme Ltd'
+        self.vendor.save()
+        stale.name = 'Acme Inc'
+        with self.assertRaises(VersionConflict):
+            stale.save()
+        self.assertEqual(stale.version, 1)
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.name, self.vendor.version), ('Acme Ltd', 2))
+
+    def test_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+        # Metric updates neither bump the version nor fail the precondition.
+        PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1)
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+        response = self.put('Acme Ltd', if_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['vendor']['version'], 2)
+        self.assertEqual(response['ETag'], self.client.get(self.url)['ETag'])
+
+        response = self.put('Acme Inc', if_match=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.put('Acme Inc', if_match='"unknown"').status_code, 412)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.name, 'Acme Ltd')
+        self.assertEqual(self.put('Acme Inc', if_match='*').status_code, 200)
+
+    def test_transitions_bump_the_version(self):
+        po = PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1)
+        etag = self.client.get(f'/api/purchase_orders/{po.pk}/')['ETag']
+        self.client.post(f'/api/purchase_orders/{po.pk}/complete/')
+        response = self.client.put(f'/api/purchase_orders/{po.pk}/', {
+            'vendor': str(self.vendor.pk), 'items': [], 'quantity': 2, 'status': 'pending',
+        }, content_type='application/json', headers={'if_match': etag})
+        self.assertEqual(response.status_code, 412)
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class RecomputeVendorMetricsCommandTests(TestCase):
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.other = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+        issued = timezone.now() - timedelta(days=1)
+        for vendor in (self.vendor, self.other):
+            PurchaseOrder.objects.create(vendor=vendor, items=[], quantity=1, issue_date=issued, status='completed',
+                                         delivery_date=issued + timedelta(days=1), quality_rating=4.0)
+        self.day = performance_day(issued)
+        Vendor.objects.filter(pk=self.vendor.pk).update(completed_pos=0, fulfillment_rate=0.0)
+        VendorDailyPerformance.objects.filter(vendor=self.vendor).update(total_pos=3)
+
+    def recompute(self, *args):
+        out = io.StringIO()
+        call_command('recompute_vendor_metrics', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_without_writing(self):
+        output = self.recompute('--dry-run')
+        self.assertIn(f'vendor {self.vendor.pk}:', output)
+        self.assertIn('    completed_pos: 0 -> 1', output)
+        self.assertIn('    fulfillment_rate: 0.0 -> 100.0', output)
+        self.assertIn(f'vendor {self.vendor.pk} on {self.day}:', output)
+        self.assertIn('    total_pos: 3 -> 1', output)
+        self.assertIn('2 vendors scanned, 1 would be updated, 1 daily buckets would be updated', output)
+        self.assertNotEqual(Vendor.objects.get(pk=self.vendor.pk).verify_performance_aggregates(), {})
+        self.assertNotEqual(VendorDailyPerformance.verify(), {})
+
+    def test_repairs_vendors_and_buckets(self):
+        output = self.recompute()
+        self.assertIn('2 vendors scanned, 1 updated, 1 daily buckets updated', output)
+        self.assertEqual(Vendor.objects.get(pk=self.vendor.pk).verify_performance_aggregates(), {})
+        self.assertEqual(VendorDailyPerformance.verify(), {})
+        self.assertIn('2 vendors scanned, 0 updated, 0 daily buckets updated', self.recompute())
+
+    def test_vendor_filter(self):
+        self.assertIn('1 vendors scanned, 0 updated, 0 daily buckets updated', self.recompute('--vendor', str(self.other.pk)))
+        self.assertIn('1 vendors scanned, 1 updated, 1 daily buckets updated', self.recompute('--vendor', str(self.vendor.pk)))
+
+    def test_batches_lock_the_vendors_before_aggregating(self):
+        calls, depth = [], len(connection.atomic_blocks)
+        lock, aggregate = VendorRepository.lock_vendor_performance, PurchasedOrderRepository.get_performance_aggregates_by_vendor
+
+        def record(name, method):
+            def wrapper(repo, vendor_ids):
+                calls.append((name, len(vendor_ids), len(connection.atomic_blocks) - depth))
+                return method(repo, vendor_ids)
+            return wrapper
+
+        with mock.patch.object(VendorRepository, 'lock_vendor_performance', record('lock', lock)), \
+                mock.patch.object(PurchasedOrderRepository, 'get_performance_aggregates_by_vendor', record('aggregate', aggregate)):
+            report = VendorService().recompute_all_performance_metrics(batch_size=1)
+        # One transaction per batch, the rows locked before the purchase orders are read.
+        self.assertEqual(calls, [('lock', 1, 1), ('aggregate', 1, 1)] * 2)
+        self.assertEqual((report['scanned'], report['changed'], len(report['buckets'])), (2, 1, 1))
+        self.assertEqual(Vendor.objects.get(pk=self.vendor.pk).verify_performance_aggregates(), {})
+
+    def test_invalid_arguments(self):
+        with self.assertRaisesMessage(CommandError, '--vendor must be a vendor UUID, got not-a-uuid'):
+            self.recompute('--vendor', 'not-a-uuid')
+        with self.assertRaisesMessage(CommandError, '--batch-size must be a positive integer'):
+            self.recompute('--batch-size', '0')
+
+
+class VendorMetricsWorkerTests(SimpleTestCase):
+    """
+    Scheduling of the deferred recalculations, with `_apply` replaced by a recorder.
+    """
+
+    def setUp(self):
+        self.applied = []
+        self.failures = 0
+        self.done = threading.Event()
+        self.worker = metricsWorker.VendorMetricsWorker(debounce=0.2, max_staleness=5.0, workers=1, retry_backoff=0.05)
+        patcher = mock.patch.object(self.worker, '_apply', side_effect=self.apply)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def apply(self, vendor_id, entry):
+        if self.failures:
+            self.failures -= 1
+            raise OperationalError('database is locked')
+        self.applied.append((vendor_id, entry.delta['total_pos'], entry.snapshot))
+        self.done.set()
+
+    def delta(self, total_pos=1):
+        return {**metricsWorker.empty_performance_delta(), 'total_pos': total_pos}
+
+    def test_marks_are_debounced_and_coalesced(self):
+        for _ in range(3):
+            self.worker.mark_dirty('acme', self.delta())
+        self.worker.mark_dirty('acme', snapshot=True)
+        self.assertEqual(self.worker.pending(), 1)
+        self.assertEqual(self.applied, [])
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.applied, [('acme', 3, True)])
+        self.assertEqual(self.worker.pending(), 0)
+
+    def test_failed_recalculation_is_retried(self):
+        self.failures = 2
+        with self.assertLogs('vmsApp.metricsWorker', 'ERROR') as logs:
+            self.worker.mark_dirty('acme', self.delta(2))
+            self.assertTrue(self.done.wait(5))
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('database is locked', logs.output[0])
+        self.assertEqual(self.applied, [('acme', 2, False)])
+
+    def test_flush_applies_the_others_and_raises(self):
+        self.worker.debounce = self.worker.max_staleness = 60
+        self.worker.mark_dirty('acme', self.delta(1))
+        self.worker.mark_dirty('globex', self.delta(4))
+        self.failures = 1
+        with self.assertLogs('vmsApp.metricsWorker', 'ERROR'), self.assertRaises(OperationalError):
+            self.worker.flush()
+        # The first vendor failed and is pending again, the second one was applied.
+        self.assertEqual(self.applied, [('globex', 4, False)])
+        self.assertEqual(self.worker.pending(), 1)
+        self.worker.mark_dirty('acme', self.delta(1))
+        self.worker.flush()
+        self.assertEqual(self.applied, [('globex', 4, False), ('acme', 2, False)])
+
+
+@override_settings(VMS_CACHE_ENABLED=False, VMS_METRICS_DEFERRED=True)
+class DeferredMetricsTests(TestCase):
+
+    def test_flush_applies_the_pending_deltas(self):
+        vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        with mock.patch.object(metricsWorker, '_worker', metricsWorker.VendorMetricsWorker(debounce=60, max_staleness=60)):
+            with self.captureOnCommitCallbacks(execute=True):
+                for status in ('pending', 'completed', 'completed'):
+                    PurchaseOrder.objects.create(vendor=vendor, items=[], quantity=1, status=status,
+                                                 delivery_date=timezone.now() + timedelta(days=1))
+            self.assertEqual(Vendor.objects.get(pk=vendor.pk).total_pos, 0)
+            self.assertEqual(metricsWorker.get_metrics_worker().pending(), 1)
+            metricsWorker.get_metrics_worker().flush()
+        vendor.refresh_from_db()
+        self.assertEqual((vendor.total_pos, vendor.completed_pos), (3, 2))
+        self.assertEqual(vendor.verify_performance_aggregates(), {})
+        self.assertEqual(VendorDailyPerformance.verify(), {})
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class VendorDailyPerformanceTests(TestCase):
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.day_one = timezone.now() - timedelta(days=5)
+        self.day_two = timezone.now() - timedelta(days=2)
+
+    def bucket(self, issued):
+        return VendorDailyPerformance.objects.filter(
+            vendor=self.vendor, day=performance_day(issued),
+        ).values('total_pos', 'completed_pos', 'on_time_pos', 'quality_rating_count').first()
+
+    def test_buckets_follow_status_and_date_changes(self):
+        po = PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1, issue_date=self.day_one)
+        self.assertEqual(self.bucket(self.day_one), {'total_pos': 1, 'completed_pos': 0, 'on_time_pos': 0, 'quality_rating_count': 0})
+
+        po.status = 'completed'
+        po.delivery_date = self.day_one + timedelta(days=1)
+        po.quality_rating = 4.0
+        po.save()
+        self.assertEqual(self.bucket(self.day_one), {'total_pos': 1, 'completed_pos': 1, 'on_time_pos': 1, 'quality_rating_count': 1})
+
+        # Moving the issue date moves the contribution to the other day.
+        po.issue_date = self.day_two
+        po.delivery_date = self.day_two + timedelta(days=1)
+        po.save()
+        self.assertEqual(self.bucket(self.day_one), {'total_pos': 0, 'completed_pos': 0, 'on_time_pos': 0, 'quality_rating_count': 0})
+        self.assertEqual(self.bucket(self.day_two), {'total_pos': 1, 'completed_pos': 1, 'on_time_pos': 1, 'quality_rating_count': 1})
+        self.assertEqual(VendorDailyPerformance.verify(), {})
+
+        po.delete()
+        self.assertEqual(self.bucket(self.day_two)['total_pos'], 0)
+        self.assertEqual(VendorDailyPerformance.verify(), {})
+
+    def test_rebuild_repairs_drift(self):
+        PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1, issue_date=self.day_one, status='completed',
+                                     delivery_date=self.day_one + timedelta(days=1))
+        PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1, issue_date=self.day_two)
+        expected = self.client.get(f'/api/vendors/{self.vendor.pk}/performance/', {'window': '30d'}).json()['data']
+        VendorDailyPerformance.objects.filter(day=performance_day(self.day_one)).update(completed_pos=5)
+        VendorDailyPerformance.objects.filter(day=performance_day(self.day_two)).delete()
+
+        mismatches = VendorDailyPerformance.verify()
+        self.assertEqual(set(mismatches), {(self.vendor.pk, performance_day(self.day_one)), (self.vendor.pk, performance_day(self.day_two))})
+        self.assertEqual(mismatches[self.vendor.pk, performance_day(self.day_one)], {'completed_pos': (5, 1)})
+        self.assertEqual(VendorDailyPerformance.rebuild(dry_run=True), mismatches)
+        self.assertEqual(VendorDailyPerformance.verify(), mismatches)
+
+        self.assertEqual(VendorDailyPerformance.rebuild(), mismatches)
+        self.assertEqual(VendorDailyPerformance.verify(), {})
+        self.assertEqual(self.client.get(f'/api/vendors/{self.vendor.pk}/performance/', {'window': '30d'}).json()['data'], expected)
+
+        VendorDailyPerformance.objects.update(total_pos=9)
+        Vendor.objects.get(pk=self.vendor.pk).rebuild_performance_aggregates()
+        self.assertEqual(VendorDailyPerformance.verify(), {})
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class PerformanceHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        cls.dates = [
+            datetime(2026, 1, 1, 10, 15, tzinfo=dt_timezone.utc),
+            datetime(2026, 1, 1, 10, 45, tzinfo=dt_timezone.utc),
+            datetime(2026, 1, 1, 11, 30, tzinfo=dt_timezone.utc),
+            datetime(2026, 1, 2, 9, 0, tzinfo=dt_timezone.utc),
+            datetime(2026, 2, 3, 12, 0, tzinfo=dt_timezone.utc),
+        ]
+        for index, date in enumerate(cls.dates):
+            HistoricalPerformance.record([{
+                'vendor_id': cls.vendor.pk, 'on_time_delivery_rate': 10.0 * (index + 1), 'quality_rating_avg': 4.0,
+                'average_response_time': float(index), 'fulfillment_rate': 100.0,
+            }], date=date)
+
+    def history(self, **params):
+        response = self.client.get(f'/api/vendors/{self.vendor.pk}/performance/history/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']
+
+    def test_bucket_rollups(self):
+        hours = self.history(bucket='hour')['history']
+        self.assertEqual([row['samples'] for row in hours], [2, 1, 1, 1])
+        self.assertEqual(hours[0]['date'], '2026-01-01T10:00:00Z')
+        self.assertEqual(
+            (hours[0]['on_time_delivery_rate'], hours[0]['on_time_delivery_rate_min'], hours[0]['on_time_delivery_rate_max']),
+            (15.0, 10.0, 20.0),
+        )
+
+        days = self.history()
+        self.assertEqual(days['bucket'], 'day')
+        self.assertEqual([(row['date'], row['samples']) for row in days['history']], [
+            ('2026-01-01T00:00:00Z', 3), ('2026-01-02T00:00:00Z', 1), ('2026-02-03T00:00:00Z', 1),
+        ])
+        self.assertEqual(days['history'][0]['average_response_time'], 1.0)
+
+        months = self.history(bucket='month')['history']
+        self.assertEqual([(row['date'], row['samples']) for row in months], [('2026-01-01T00:00:00Z', 4), ('2026-02-01T00:00:00Z', 1)])
+        self.assertEqual((months[0]['on_time_delivery_rate'], months[0]['on_time_delivery_rate_max']), (25.0, 40.0))
+
+    def test_ranges(self):
+        raw = self.history(bucket='raw', **{'from': '2026-01-01T10:30:00Z', 'to': '2026-01-02T09:00:00Z'})['history']
+        self.assertEqual([row['on_time_delivery_rate'] for row in raw], [20.0, 30.0, 40.0])
+        # A rollup bucket covers the periods overlapping the range.
+        days = self.history(**{'from': '2026-01-01T12:00:00Z', 'to': '2026-01-31T00:00:00Z'})['history']
+        self.assertEqual([row['date'] for row in days], ['2026-01-01T00:00:00Z', '2026-01-02T00:00:00Z'])
+
+    def test_cursor_pages(self):
+        pages, cursor = [], None
+        while True:
+            data = self.history(bucket='raw', page_size=2, **({'cursor': cursor} if cursor else {}))
+            pages.append(([row['date'] for row in data['history']], data['prev']))
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual([len(dates) for dates, _ in pages], [2, 2, 1])
+        self.assertEqual([date for dates, _ in pages for date in dates], [date.isoformat().replace('+00:00', 'Z') for date in self.dates])
+        for (previous, _), (_, prev) in zip(pages, pages[1:]):
+            self.assertEqual([row['date'] for row in self.history(bucket='raw', page_size=2, cursor=prev)['history']], previous)
+
+    def test_errors(self):
+        url = f'/api/vendors/{self.vendor.pk}/performance/history/'
+        for params in ({'bucket': 'week'}, {'from': '2026-02-01T00:00:00Z', 'to': '2026-01-01T00:00:00Z'}, {'cursor': 'garbage'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+        response = self.client.get(f'/api/vendors/{uuid.uuid4()}/performance/history/')
+        self.assertEqual(response.status_code, 404)
+
+        # Only a missing vendor is a 404, a database error is not.
+        with mock.patch.object(PerformanceHistoryRepository, 'get_rollups', side_effect=OperationalError('database is locked')):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['message'], 'An error occurred: database is locked')
+
+    def test_compact_command(self):
+        out = io.StringIO()
+        call_command('compact_performance_history', '--raw-days', '30', '--hourly-days', '30', '--dry-run', stdout=out)
+        self.assertIn('5 snapshots, 4 hourly and 0 daily rollups, 0 window buckets would be deleted', out.getvalue())
+        self.assertEqual(HistoricalPerformance.objects.count(), 5)
+
+        out = io.StringIO()
+        call_command('compact_performance_history', '--raw-days', '30', '--hourly-days', '30', stdout=out)
+        self.assertIn('5 snapshots, 4 hourly and 0 daily rollups, 0 window buckets deleted', out.getvalue())
+        self.assertEqual(HistoricalPerformance.objects.count(), 0)
+        self.assertEqual(self.history(bucket='hour')['history'], [])
+        # The coarser rollups still summarize the deleted snapshots.
+        self.assertEqual([row['samples'] for row in self.history(bucket='month')['history']], [4, 1])
+
+        with self.assertRaises(CommandError):
+            call_command('compact_performance_history', '--raw-days', '-1')
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class PurchaseOrderLineTests(TestCase):
+
+    def setUp(self):
+        self.acme = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.globex = Vendor.objects.create(name='Globex', address='2 Road', contact_details='globex@example.com')
+
+    def lines(self, po):
+        return list(PurchaseOrderLine.objects.filter(purchase_order=po).order_by('position').values_list('sku', 'quantity', 'unit_price'))
+
+    def test_lines_follow_the_items(self):
+        po = PurchaseOrder.objects.create(vendor=self.acme, quantity=3, items=[
+            {'sku': 'A', 'qty': 2, 'price': 1.5, 'description': 'Bolt'}, {'note': 'no sku'}, {'sku': 'B', 'quantity': '1'},
+        ])
+        self.assertEqual(self.lines(po), [('A', 2, 1.5), ('B', 1, None)])
+
+        po.items.append({'sku': 'C', 'qty': 4, 'price': 2.0})
+        po.save()
+        self.assertEqual(self.lines(po), [('A', 2, 1.5), ('B', 1, None), ('C', 4, 2.0)])
+
+        response = self.client.put(f'/api/purchase_orders/{po.pk}/', {
+            'vendor': str(self.globex.pk), 'items': [{'sku': 'A', 'qty': 5, 'price': 1.0}], 'quantity': 5,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.lines(po), [('A', 5, 1.0)])
+        self.assertEqual(PurchaseOrderLine.objects.get(purchase_order=po).vendor_id, self.globex.pk)
+
+        # Saves not touching the items leave the lines alone.
+        with CaptureQueriesContext(connection) as queries:
+            PurchaseOrder.objects.get(pk=po.pk).save()
+        self.assertFalse([query for query in queries if 'purchaseorderline' in query['sql']])
+
+        # A nested change made in place to a loaded PO is seen too.
+        loaded = PurchaseOrder.objects.get(pk=po.pk)
+        loaded.items[0]['qty'] = 7
+        loaded.save()
+        self.assertEqual(self.lines(po), [('A', 7, 1.0)])
+
+        # So is a replaced list, and a vendor change without reading the items.
+        loaded = PurchaseOrder.objects.get(pk=po.pk)
+        loaded.items = [{'sku': 'D', 'qty': 1, 'price': 9.0}]
+        loaded.save()
+        self.assertEqual(self.lines(po), [('D', 1, 9.0)])
+        loaded = PurchaseOrder.objects.get(pk=po.pk)
+        loaded.vendor = self.acme
+        loaded.save()
+        self.assertEqual(PurchaseOrderLine.objects.get(purchase_order=po).vendor_id, self.acme.pk)
+
+    def test_items_are_only_compared_once_handed_out(self):
+        po = PurchaseOrder.objects.create(vendor=self.acme, quantity=1, items=[{'sku': 'A', 'qty': 1}])
+
+        def saved_queries(instance):
+            with CaptureQueriesContext(connection) as queries:
+                instance.save()
+            return [query['sql'].split(' ')[0] + (' items' if '"items" FROM' in query['sql'] else '') + (' lines' if 'purchaseorderline' in query['sql'] else '') for query in queries]
+
+        # Never read, the loaded items are still the stored ones.
+        loaded = PurchaseOrder.objects.get(pk=po.pk)
+        loaded.status = 'completed'
+        self.assertFalse({'SELECT items', 'DELETE lines', 'INSERT lines'} & set(saved_queries(loaded) + saved_queries(loaded)))
+
+        # Replaced, they are compared to the loaded ones without reading the row again.
+        loaded.items = [{'sku': 'A', 'qty': 1}]
+        self.assertFalse({'SELECT items', 'DELETE lines', 'INSERT lines'} & set(saved_queries(loaded)))
+
+        # Read, they may have been changed in place and are compared to the stored ones.
+        loaded = PurchaseOrder.objects.get(pk=po.pk)
+        loaded.items
+        queries = saved_queries(loaded)
+        self.assertIn('SELECT items', queries)
+        self.assertFalse({'DELETE lines', 'INSERT lines'} & set(queries))
+
+    def test_item_queries(self):
+        for vendor, status, items in (
+            (self.acme, 'pending', [{'sku': 'A', 'qty': 2, 'price': 1.5}, {'sku': 'B', 'qty': 1, 'price': 3.0}]),
+            (self.acme, 'completed', [{'sku': 'A', 'qty': 3, 'price': 1.5}]),
+            (self.globex, 'pending', [{'sku': 'A', 'qty': 10, 'price': 1.0}]),
+        ):
+            PurchaseOrder.objects.create(vendor=vendor, status=status, quantity=1, items=items)
+
+        response = self.client.get('/api/purchase_orders/lines/', {'sku': 'A', 'status': 'pending'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(line['quantity'] for line in response.json()['data']['lines']), [2, 10])
+
+        response = self.client.get('/api/purchase_orders/lines/summary/', {'sku': 'A', 'group_by': 'vendor'})
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()['data']['summary']
+        self.assertEqual(
+            [(group['vendor'], group['orders'], group['total_quantity'], group['total_value']) for group in summary],
+            [(str(self.globex.pk), 1, 10, 10.0), (str(self.acme.pk), 2, 5, 7.5)],
+        )
+        response = self.client.get('/api/purchase_orders/lines/summary/', {'group_by': 'warehouse'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_backfill(self):
+        orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(vendor=self.acme, quantity=1, items=[{'sku': f'SKU-{i}', 'qty': i}]) for i in range(5)
+        ])
+        out = io.StringIO()
+        call_command('backfill_order_lines', chunk_size=2, stdout=out)
+        self.assertIn('5 lines written for 5 purchase orders', out.getvalue())
+        call_command('backfill_order_lines', chunk_size=2, stdout=io.StringIO())
+        self.assertEqual(
+            sorted(PurchaseOrderLine.objects.values_list('purchase_order', 'sku')),
+            sorted((po.pk, f'SKU-{i}') for i, po in enumerate(orders)),
+        )
+
+
+@override_settings(VMS_CACHE_ENABLED=False)
+class VendorSearchTests(TestCase):
+
+    def setUp(self):
+        self.acme = Vendor.objects.create(name='Acme Supplies', address='1 Harbour Road', contact_details='sales@acme.example')
+        self.harbour = Vendor.objects.create(name='Harbour Freight', address='9 Dock Lane', contact_details='ops@harbour.example')
+        self.dock = Vendor.objects.create(name='Dockside', address='3 Harbour Road', contact_details='Ask for the supply desk')
+
+    def search(self, q, **params):
+        response = self.client.get('/api/vendors/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']
+
+    def names(self, q, **params):
+        return [vendor['name'] for vendor in self.search(q, **params)['vendor']]
+
+    def test_prefix_match_ranked_by_name_first(self):
+        self.assertTrue(VendorSearchRepository().fts_available())
+        self.assertEqual(self.names('harb'), ['Harbour Freight', 'Acme Supplies', 'Dockside'])
+        self.assertEqual(self.names('SUPPL'), ['Acme Supplies', 'Dockside'])
+        self.assertEqual(self.names('harbour road ac'), ['Acme Supplies'])
+        self.assertEqual(self.names('warehouse'), [])
+        self.assertEqual(self.client.get('/api/vendors/search/', {'q': ' -- '}).status_code, 400)
+
+    def test_pagination(self):
+        first = self.search('harbour', page_size=2, fields='name')
+        self.assertEqual([sorted(vendor) for vendor in first['vendor']], [['name', 'rank']] * 2)
+        second = self.search('harbour', page_size=2, cursor=first['next'])
+        self.assertEqual([vendor['name'] for vendor in second['vendor']], ['Dockside'])
+        self.assertIsNone(second['next'])
+        back = self.search('harbour', page_size=2, fields='name', cursor=second['prev'])
+        self.assertEqual(back['vendor'], first['vendor'])
+        self.assertEqual(self.client.get('/api/vendors/search/', {'q': 'harbour', 'cursor': 'nope'}).status_code, 400)
+
+    def test_index_follows_the_vendors(self):
+        self.client.put(f'/api/vendors/{self.dock.pk}/', {
+            'name': 'Quayside', 'address': '3 Pier Road', 'contact_details': 'Ask for the supply desk',
+        }, content_type='application/json')
+        self.assertEqual(self.names('dock'), ['Harbour Freight'])
+        self.assertEqual(self.names('quay'), ['Quayside'])
+        self.harbour.delete()
+        self.assertEqual(self.names('harbour'), ['Acme Supplies'])
+
+        # The triggers reach the index row through the uid -> docid index, not a scan.
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT uid FROM "{SEARCH_DOC_TABLE}" ORDER BY docid')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [self.acme.pk.hex, self.dock.pk.hex])
+            cursor.execute(f'SELECT count(*) FROM "{SEARCH_TABLE}"')
+            self.assertEqual(cursor.fetchone()[0], 2)
+            cursor.execute(f'EXPLAIN QUERY PLAN SELECT docid FROM "{SEARCH_DOC_TABLE}" WHERE uid = %s', [self.acme.pk.hex])
+            self.assertIn('USING COVERING INDEX', ' '.join(str(row[-1]) for row in cursor.fetchall()))
+
+    def test_fallback_without_fts(self):
+        with mock.patch.object(VendorSearchRepository, 'fts_available', return_value=False):
+            names = self.names('harbour')
+            self.assertEqual(names[0], 'Harbour Freight')
+            self.assertEqual(sorted(names[1:]), ['Acme Supplies', 'Dockside'])
+            first = self.search('road', page_size=1)
+            self.assertEqual(len(first['vendor']), 1)
+            second = self.search('road', page_size=1, cursor=first['next'])
+            self.assertEqual(len(second['vendor']), 1)
+            self.assertNotEqual(first['vendor'], second['vendor'])
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{SEARCH_TABLE}"')
+            cursor.execute(f'DELETE FROM "{SEARCH_DOC_TABLE}"')
+        self.assertEqual(self.names('acme'), [])
+        out = io.StringIO()
+        call_command('rebuild_vendor_search', stdout=out)
+        self.assertIn('3 vendors indexed', out.getvalue())
+        self.assertEqual(self.names('acme'), ['Acme Supplies'])
+
+
+@override_settings(VMS_CACHE_ENABLED=False, VMS_WRITE_COORDINATOR=True)
+class WriteCoordinatorTests(TransactionTestCase):
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='Acme', address='1 Road', contact_details='acme@example.com')
+        self.orders = [PurchaseOrder.objects.create(vendor=self.vendor, items=[], quantity=1) for _ in range(12)]
+        self.coordinator = writeCoordinator.WriteCoordinator(batch_size=64, batch_wait=0.2)
+        patcher = mock.patch.object(writeCoordinator, '_coordinator', self.coordinator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.coordinator.stop)
+
+    def test_concurrent_writes_are_committed_in_groups(self):
+        outcomes = []
+
+        def write(po_id, action):
+            try:
+                CommonService().transition(po_id, action)
+                outcomes.append((action, 'ok', _wrote.get()))
+            except InvalidTransition:
+                outcomes.append((action, 'invalid', _wrote.get()))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=write, args=(po.pk, 'complete')) for po in self.orders]
+        # The second completion of the first order fails alone, the others are committed.
+        threads.append(threading.Thread(target=write, args=(self.orders[0].pk, 'complete')))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), [('complete', 'invalid', True)] + [('complete', 'ok', True)] * 12)
+        self.assertEqual(PurchaseOrder.objects.filter(status='completed').count(), 12)
+        self.assertEqual(self.coordinator.operations, 13)
+        self.assertLess(self.coordinator.batches, 13)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.verify_performance_aggregates(), {})
+
+    @override_settings(VMS_WRITE_COORDINATOR=True, VMS_WRITE_RESULT_TIMEOUT_SECONDS=0.2)
+    def test_waiting_times_out(self):
+        # The whole batch starts at once, keep the blocking operation alone in its batch.
+        self.coordinator.batch_size = 1
+        release = threading.Event()
+        blocker = self.coordinator.submit(release.wait)
+        try:
+            with self.assertRaisesRegex(writeCoordinator.WriteCoordinatorError, 'not started within 0.2s'):
+                CommonService().transition(self.orders[0].pk, 'acknowledge')
+        finally:
+            release.set()
+        self.assertTrue(blocker.result(timeout=5))
+        self.coordinator.stop()
+        # The dropped operation never runs.
+        self.assertEqual(self.coordinator.operations, 1)
+        self.assertFalse(PurchaseOrder.objects.filter(acknowledgment_date__isnull=False).exists())
+
+    def test_dead_writer_is_restarted(self):
+        self.coordinator.submit(lambda: None).result(timeout=5)
+        self.coordinator.stop()
+        # An operation queued after the writer exited, with nothing restarting it.
+        future = writeCoordinator.Future()
+        self.coordinator._queue.put((future, lambda: 'done', (), {}))
+        with mock.patch.object(writeCoordinator, '_WRITER_CHECK_INTERVAL', 0.05):
+            self.assertEqual(self.coordinator.wait(future, timeout=5), 'done')
+
+    def test_writer_dying_fails_its_batch(self):
+        with mock.patch.object(self.coordinator, '_commit', side_effect=SystemExit):
+            future = self.coordinator.submit(lambda: None)
+            with self.assertRaisesRegex(writeCoordinator.WriteCoordinatorError, 'writer thread died'):
+                self.coordinator.wait(future, timeout=5)
+        # The next write starts a new writer.
+        self.assertEqual(self.coordinator.wait(self.coordinator.submit(lambda: 'done'), timeout=5), 'done')
+
+    def test_failed_commit_fails_the_whole_group(self):
+        error = OperationalError('disk I/O error')
+        with mock.patch('django.db.backends.base.base.BaseDatabaseWrapper.commit', side_effect=error):
+            futures = [self.coordinator.submit(CommonService().transition, po.pk, 'acknowledge') for po in self.orders[:3]]
+            for future in futures:
+                self.assertIs(future.exception(), error)
+        self.assertEqual(self.coordinator.batches, 1)
+        self.assertFalse(PurchaseOrder.objects.filter(acknowledgment_date__isnull=False).exists())
@@ -0,0 +1,229 @@
+"""
+Single-writer group commit for SQLite.
+
+SQLite lets one connection write at a time. Concurrent request threads queue on its
+write lock, and the ones that started a transaction with a read, then try to write,
+fail with "database is locked" instead of waiting. With `VMS_WRITE_COORDINATOR`
+enabled, the service write methods decorated with `coordinated_write` do not write
+from the request thread. They hand the operation to one writer thread and wait on a
+future.
+
+The writer takes the first queued operation, then waits up to
+`VMS_WRITE_BATCH_WAIT_MS` for more, up to `VMS_WRITE_BATCH_SIZE` in all. It runs the
+batch in one transaction, each operation in its own savepoint, and commits once.
+The callers get their result, or their operation's exception, after the commit. An
+operation that fails only rolls back its own savepoint. A failed commit fails the
+whole batch.
+
+A caller waits at most `VMS_WRITE_RESULT_TIMEOUT_SECONDS` for its result, then gets a
+`WriteCoordinatorError` and its operation is dropped unless it already started. A
+writer thread that died is restarted for the operations still queued, the ones it was
+running fail.
+
+Operations run in a copy of the caller's context, whose changes are copied back.
+The request still knows it wrote (`dbRouter`), and its queries count towards its
+instrumentation. A caller already inside a transaction runs the operation inline.
+The writer could not see that transaction's uncommitted rows, and would wait on
+its lock.
+"""
+import atexit
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import wraps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from .constants.appConstants import WRITE_BATCH_SIZE, WRITE_BATCH_WAIT_MS, WRITE_RESULT_TIMEOUT
+
+_STOP = object()
+# Seconds between the liveness checks of the writer thread while a caller waits.
+_WRITER_CHECK_INTERVAL = 1.0
+
+
+class WriteCoordinatorError(Exception):
+    """
+    A write operation got no result from the writer thread: it timed out or the
+    writer died running it.
+    """
+
+
+class WriteCoordinator:
+    """
+    Runs the submitted write operations on one thread, in grouped transactions.
+    """
+
+    def __init__(self, batch_size=WRITE_BATCH_SIZE, batch_wait=WRITE_BATCH_WAIT_MS / 1000):
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0.0, batch_wait)
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues `func(*args, **kwargs)` and returns the Future of its result, set once
+        the transaction it ran in committed.
+        """
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        self._ensure_writer()
+        return future
+
+    def wait(self, future, timeout=None):
+        """
+        Returns the result of a submitted operation, waiting at most `timeout` seconds
+        (forever when None). Restarts the writer thread if it died while the operation
+        was queued. On timeout the operation is cancelled unless it is already running,
+        and `WriteCoordinatorError` is raised.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            interval = _WRITER_CHECK_INTERVAL
+            if deadline is not None:
+                interval = min(interval, max(0.0, deadline - time.monotonic()))
+            try:
+                return future.result(timeout=interval)
+            except FutureTimeoutError:
+                # The operation itself may raise a TimeoutError.
+                if future.done():
+                    raise
+            if deadline is not None and time.monotonic() >= deadline:
+                if future.cancel():
+                    raise WriteCoordinatorError(f'The write was not started within {timeout}s, it was dropped')
+                raise WriteCoordinatorError(f'The write did not complete within {timeout}s, it may still commit')
+            self._ensure_writer()
+
+    def on_writer_thread(self):
+        return threading.current_thread() is self._thread
+
+    def stop(self):
+        """
+        Commits the operations already queued and stops the writer thread.
+        """
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='vms-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch = []
+        try:
+            while (batch := self._next_batch()) is not None:
+                self._commit(batch)
+        except BaseException as error:
+            # Fail the operations of the batch rather than leave their callers waiting.
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(WriteCoordinatorError(f'The writer thread died: {error!r}'))
+            raise
+        finally:
+            connections.close_all()
+
+    def _next_batch(self):
+        """
+        Returns the operations of the next transaction, None once stopped.
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Commit this batch first, stop on the next round.
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _commit(self, batch):
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as error:
+                        outcomes.append((future, None, error))
+        except Exception as error:
+            connections[DEFAULT_DB_ALIAS].close_if_unusable_or_obsolete()
+            outcomes = [(future, None, error) for future, _, _, _ in batch]
+        self.batches += 1
+        self.operations += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def write_coordinator_enabled():
+    return getattr(settings, 'VMS_WRITE_COORDINATOR', False)
+
+
+def get_write_coordinator():
+    """
+    Returns the process wide WriteCoordinator, created from settings on first use.
+    """
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = WriteCoordinator(
+                batch_size=getattr(settings, 'VMS_WRITE_BATCH_SIZE', WRITE_BATCH_SIZE),
+                batch_wait=getattr(settings, 'VMS_WRITE_BATCH_WAIT_MS', WRITE_BATCH_WAIT_MS) / 1000,
+            )
+            atexit.register(_coordinator.stop)
+        return _coordinator
+
+
+def coordinated_write(method):
+    """
+    Decorates a service method writing to the database so that it runs on the writer
+    thread when `VMS_WRITE_COORDINATOR` is enabled, see the module docstring.
+    """
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        if not write_coordinator_enabled() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return method(*args, **kwargs)
+        coordinator = get_write_coordinator()
+        if coordinator.on_writer_thread():
+            return method(*args, **kwargs)
+        context = contextvars.copy_context()
+        try:
+            future = coordinator.submit(context.run, method, *args, **kwargs)
+            return coordinator.wait(future, getattr(settings, 'VMS_WRITE_RESULT_TIMEOUT_SECONDS', WRITE_RESULT_TIMEOUT))
+        finally:
+            _restore_context(context)
+    return wrapper
+
+
+def _restore_context(context):
+    # Same as asgiref's SyncToAsync: bring the operation's context changes back.
+    for var, value in context.items():
+        try:
+            if var.get() is value:
+                continue
+        except LookupError:
+            pass
+        var.set(value)
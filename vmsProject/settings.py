@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,7 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'vmsApp.instrumentation.InstrumentationMiddleware',
+    'vmsApp.instrumentation.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'vmsApp.dbRouter.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +86,58 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# The read-only service methods are served by one of VMS_READ_REPLICAS, writes and the
+# reads following a client's own write (for VMS_REPLICA_STICKY_SECONDS) stay on 'default'.
+# VMS_SQLITE_REPLICAS=N adds N read-only SQLite copies of db.sqlite3 to try it locally,
+# kept in sync by `python manage.py replicate_sqlite --interval 1`.
+
+VMS_SQLITE_REPLICAS = int(os.environ.get('VMS_SQLITE_REPLICAS', 0))
+for index in range(1, VMS_SQLITE_REPLICAS + 1):
+    DATABASES[f'replica{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / f'db.replica{index}.sqlite3'}?mode=ro",
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['vmsApp.dbRouter.PrimaryReplicaRouter']
+VMS_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+VMS_REPLICA_STICKY_SECONDS = 5
+# Cache entries loaded from a replica may be behind the primary, keep them briefly.
+VMS_REPLICA_CACHE_TIMEOUT = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vms-read-cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Read-through cache of the vendor / purchase order read services
+# A write only invalidates the entries of the processes sharing the backend. None turns the
+# cache on only when VMS_CACHE_ALIAS is a shared backend (Redis, Memcached, database), not
+# with the per-process locmem above. True forces it on, e.g. with a single worker process.
+VMS_CACHE_ENABLED = None
+VMS_CACHE_ALIAS = 'default'
+VMS_CACHE_TIMEOUT = 300
+
+
+# Request instrumentation
+# Per endpoint latency histograms, query counts, DB / serialization time and response
+# sizes, exposed in the Prometheus text format at /api/_metrics/.
+
+VMS_INSTRUMENTATION_ENABLED = True
+
+# Log the queries a request repeats VMS_NPLUSONE_THRESHOLD times with the same shape from
+# the same line of code (N+1 queries). It inspects the stack of every query, keep it to DEBUG.
+VMS_NPLUSONE_DETECTION = DEBUG
+VMS_NPLUSONE_THRESHOLD = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -119,6 +175,46 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Cursor pagination of the list endpoints (?page_size= is capped to the maximum)
+
+VMS_PAGE_SIZE = 50
+VMS_MAX_PAGE_SIZE = 500
+
+
+# Vendor performance metrics
+# When deferred, PO changes mark the vendor dirty and a background thread pool applies
+# them, coalescing marks within the debounce window and never lagging more than the cap.
+# Failed recalculations are retried, the backoff doubling from the first value up to the max.
+
+VMS_METRICS_DEFERRED = False
+VMS_METRICS_DEBOUNCE_SECONDS = 0.5
+VMS_METRICS_MAX_STALENESS_SECONDS = 5.0
+VMS_METRICS_WORKERS = 2
+VMS_METRICS_RETRY_BACKOFF_SECONDS = 1.0
+VMS_METRICS_MAX_RETRY_BACKOFF_SECONDS = 60.0
+
+
+# Write coordinator
+# SQLite has a single writer. When enabled, the service writes are queued to one writer
+# thread committing them in groups: up to VMS_WRITE_BATCH_SIZE operations per transaction,
+# waiting at most VMS_WRITE_BATCH_WAIT_MS for the group to fill up. A caller gives up after
+# VMS_WRITE_RESULT_TIMEOUT_SECONDS, its operation is dropped unless already running.
+
+VMS_WRITE_COORDINATOR = False
+VMS_WRITE_BATCH_SIZE = 64
+VMS_WRITE_BATCH_WAIT_MS = 2
+VMS_WRITE_RESULT_TIMEOUT_SECONDS = 30
+
+
+# Vendor performance history
+# Retention in days applied by `manage.py compact_performance_history`, None keeps
+# the rows forever. Monthly rollups are always kept.
+
+VMS_HISTORY_RAW_RETENTION_DAYS = 30
+VMS_HISTORY_HOURLY_RETENTION_DAYS = 180
+VMS_HISTORY_DAILY_RETENTION_DAYS = None
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
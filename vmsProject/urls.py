@@ -18,26 +18,47 @@ from django.contrib import admin
 from django.urls import path
 
 # import vendorAPI
-from vmsApp.apis import VendorViewsAPI, VendorListAPI, VendorPerformanceView
-from vmsApp.apis import PurchaseOrderAPI, PurchasedOrderViewAPI
-from vmsApp.apis import OrderAcknowledgeAPI, CompletePurchaseOrderAPI, UpdatePurchaseOrderQualityRatingAPI
+from vmsApp.apis import VendorViewsAPI, VendorListAPI, VendorLeaderboardAPI, VendorSearchAPI, VendorPerformanceView, VendorPerformanceHistoryView
+from vmsApp.apis import PurchaseOrderAPI, PurchasedOrderViewAPI, PurchaseOrderBulkAPI, PurchaseOrderLineAPI, PurchaseOrderLineSummaryAPI
+from vmsApp.apis import OrderAcknowledgeAPI, CompletePurchaseOrderAPI, UpdatePurchaseOrderQualityRatingAPI, PurchaseOrderTransitionsAPI
+from vmsApp.apis import PurchaseOrderExportAPI, VendorExportAPI
+from vmsApp.apis import CacheStatsAPI, MetricsAPI
+from vmsApp.apis import AsyncVendorListAPI, AsyncVendorViewsAPI, AsyncVendorPerformanceView, AsyncPurchaseOrderAPI, AsyncPurchasedOrderViewAPI
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     # Vender API
     path('api/vendors/', VendorListAPI.as_view(), name='create_new_vendor & list_all_vendors'),
+    path('api/vendors/export/', VendorExportAPI.as_view(), name='export_vendors'),
+    path('api/vendors/leaderboard/', VendorLeaderboardAPI.as_view(), name='vendor_leaderboard'),
+    path('api/vendors/search/', VendorSearchAPI.as_view(), name='search_vendors'),
     path('api/vendors/<uuid:vendor_id>/', VendorViewsAPI.as_view(), name="retrieve_update_and_delete_vendor's_details"),
     path('api/vendors/<uuid:vendor_id>/performance/', VendorPerformanceView.as_view(), name='get_vendor_performance'),
+    path('api/vendors/<uuid:vendor_id>/performance/history/', VendorPerformanceHistoryView.as_view(), name='get_vendor_performance_history'),
 
     # Purchase Order API
     path('api/purchase_orders/', PurchaseOrderAPI.as_view(), name='create_new_order & list_all_purchase_orders'),
+    path('api/purchase_orders/bulk/', PurchaseOrderBulkAPI.as_view(), name='bulk_create_purchase_orders'),
+    path('api/purchase_orders/export/', PurchaseOrderExportAPI.as_view(), name='export_purchase_orders'),
+    path('api/purchase_orders/lines/', PurchaseOrderLineAPI.as_view(), name='list_purchase_order_lines'),
+    path('api/purchase_orders/lines/summary/', PurchaseOrderLineSummaryAPI.as_view(), name='summarize_purchase_order_lines'),
     path('api/purchase_orders/<uuid:po_id>/', PurchasedOrderViewAPI.as_view(), name='retrieve_update_and_delete_purchase_orders'),
 
     # Common API
     path('api/purchase_orders/<uuid:po_id>/acknowledge/', OrderAcknowledgeAPI.as_view(), name='acknowledge_purchase_orders'),
     path('api/purchase_orders/<uuid:po_id>/complete/', CompletePurchaseOrderAPI.as_view(), name='complete_purchase_order'),
     path('api/purchase_orders/<uuid:po_id>/quality_rating/', UpdatePurchaseOrderQualityRatingAPI.as_view(), name='give_quality_rating_on_purchased_order'),
+    path('api/purchase_orders/transitions/', PurchaseOrderTransitionsAPI.as_view(), name='batch_purchase_order_transitions'),
 
+    # Async read API (served natively on the event loop under ASGI)
+    path('api/async/vendors/', AsyncVendorListAPI.as_view(), name='async_list_all_vendors'),
+    path('api/async/vendors/<uuid:vendor_id>/', AsyncVendorViewsAPI.as_view(), name='async_retrieve_vendor'),
+    path('api/async/vendors/<uuid:vendor_id>/performance/', AsyncVendorPerformanceView.as_view(), name='async_get_vendor_performance'),
+    path('api/async/purchase_orders/', AsyncPurchaseOrderAPI.as_view(), name='async_list_all_purchase_orders'),
+    path('api/async/purchase_orders/<uuid:po_id>/', AsyncPurchasedOrderViewAPI.as_view(), name='async_retrieve_purchase_order'),
 
+    # Internal monitoring API
+    path('api/_cache/stats/', CacheStatsAPI.as_view(), name='cache_stats'),
+    path('api/_metrics/', MetricsAPI.as_view(), name='metrics'),
 ]